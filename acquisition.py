@@ -0,0 +1,144 @@
+import sys
+import time
+import random
+import asyncio
+import datetime
+import metrics
+
+DEFAULT_PERIOD = 2.0  # seconds between readings of a source
+
+
+class Source:
+    """One thing to read on a schedule. Subclass and implement read().
+
+    read() is a coroutine returning {metric: value} for `node`, e.g.
+    {"temperature": 24.5, "humidity": 61}. Blocking drivers can wrap their call in
+    asyncio.to_thread(). `timeout` defaults to the period, so a read never runs
+    into the next one.
+    """
+
+    def __init__(self, node, period=DEFAULT_PERIOD, timeout=None):
+        self.node = node
+        self.period = period
+        self.timeout = timeout if timeout is not None else period
+
+    async def read(self):
+        raise NotImplementedError
+
+
+class SimulatedSource(Source):
+    """Random-walk temperature and humidity with a random read latency, for load tests."""
+
+    def __init__(self, node, period=DEFAULT_PERIOD, timeout=None, latency=(0.0, 0.05), failure_rate=0.0):
+        super().__init__(node, period, timeout)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.temperature = random.uniform(20, 35)
+        self.humidity = random.uniform(40, 80)
+
+    async def read(self):
+        await asyncio.sleep(random.uniform(*self.latency))
+        if random.random() < self.failure_rate:
+            raise OSError(f"{self.node}: simulated read failure")
+        self.temperature = min(35.0, max(20.0, self.temperature + random.gauss(0, 0.1)))
+        self.humidity = min(80.0, max(40.0, self.humidity + random.gauss(0, 0.5)))
+        return {"temperature": round(self.temperature, 2), "humidity": round(self.humidity)}
+
+
+def simulate(count, period=DEFAULT_PERIOD, **kwargs):
+    """`count` simulated nodes named node1..nodeN."""
+    return [SimulatedSource(f"node{i + 1}", period, **kwargs) for i in range(count)]
+
+
+class AcquisitionEngine:
+    """Polls every source concurrently, each on its own fixed-rate schedule.
+
+    Each source gets a task that wakes on absolute ticks (start + k * period), so
+    a slow read delays only its own source and the period does not drift. Ticks
+    missed because a read overran are skipped rather than bunched up. Readings
+    are stamped with the wall-clock time the read was issued and handed to
+    sink(metric, node, dTime, value), which must not block.
+    """
+
+    def __init__(self, sources, sink):
+        self.sources = list(sources)
+        self.sink = sink
+        self.reads = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.skipped = 0
+        self.max_lag = 0.0  # seconds a read started after its tick
+
+    async def poll(self, source, phase):
+        loop = asyncio.get_running_loop()
+        tick = loop.time() + phase
+        while True:
+            delay = tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.max_lag = max(self.max_lag, loop.time() - tick)
+
+            dTime = datetime.datetime.now()
+            start = time.perf_counter()
+            try:
+                values = await asyncio.wait_for(source.read(), source.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                metrics.count("read_timeouts")
+            except Exception as e:
+                self.errors += 1
+                metrics.count("read_errors")
+                print(f"Error reading {source.node}: {e}")
+            else:
+                self.reads += 1
+                metrics.observe("read", time.perf_counter() - start)
+                for metric, value in values.items():
+                    self.sink(metric, source.node, dTime, value)
+
+            tick += source.period
+            behind = loop.time() - tick
+            if behind > source.period:
+                missed = int(behind // source.period)
+                self.skipped += missed
+                metrics.count("ticks_skipped", missed)
+                tick += missed * source.period
+
+    async def run(self):
+        # Spread the first reads over one period so thousands of sources don't fire together
+        tasks = [asyncio.create_task(self.poll(source, i * source.period / len(self.sources)))
+                 for i, source in enumerate(self.sources)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self):
+        return {
+            "sources": len(self.sources),
+            "reads": self.reads,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "skipped_ticks": self.skipped,
+            "max_lag_ms": 1000.0 * self.max_lag,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"{s['reads']} reads from {s['sources']} sources, {s['timeouts']} timeouts, "
+              f"{s['errors']} errors, {s['skipped_ticks']} skipped ticks, max lag {s['max_lag_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    # Load test of the scheduler alone: python acquisition.py [nodes] [seconds]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    received = []
+    engine = AcquisitionEngine(simulate(count), lambda metric, node, dTime, value: received.append(value))
+    start = time.perf_counter()
+    try:
+        asyncio.run(asyncio.wait_for(engine.run(), seconds))
+    except asyncio.TimeoutError:
+        pass
+    engine.report()
+    print(f"{len(received) / (time.perf_counter() - start):.0f} readings/sec")
@@ -0,0 +1,341 @@
+import sys
+import json
+import time
+import socket
+import select
+import asyncio
+import argparse
+import mariadb
+import metrics
+from schema import TABLES
+from incremental_fetch import WatermarkFetcher
+from live_source import fetch_new_data
+from series_store import SeriesStore, datetime_to_ms, ms_to_datetime
+
+DEFAULT_ADDRESS = "localhost:7070"  # or a filesystem path for a UNIX socket
+POLL_INTERVAL = 2.0  # seconds between database polls
+CAPACITY = 1800  # readings kept in memory per node (1 hour at 2 s)
+INITIAL_BACKFILL = 300  # readings loaded per node when the aggregator starts
+MAX_CLIENT_BUFFER = 4 * 1024 * 1024  # bytes queued for a client before it is dropped as too slow
+MAX_PUBLISH_BUFFER = 1024 * 1024  # bytes a publisher queues before it drops readings
+RECONNECT_INTERVAL = 5.0  # seconds between a publisher's reconnect attempts
+
+
+def parse_address(address):
+    """'host:port' for TCP, anything containing a '/' for a UNIX socket path."""
+    if "/" in address:
+        return address, None
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port)
+
+
+def encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+class Subscriber:
+    """One connected viewer and the (metric, node) series it asked for."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.interests = {}  # metric -> set of nodes, or None for every node
+
+    def wants(self, metric, node):
+        if metric not in self.interests:
+            return False
+        nodes = self.interests[metric]
+        return nodes is None or node in nodes
+
+    def send(self, data):
+        if self.writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            raise ConnectionError("client is not keeping up")
+        self.writer.write(data)
+
+
+class Aggregator:
+    """Polls the database once and fans the recent series out to every subscribed viewer.
+
+    Viewers connect over a local socket and send newline-delimited JSON requests:
+
+        {"op": "subscribe", "metric": "temperature", "nodes": ["Airflow"], "backfill": 10}
+
+    ("nodes": null subscribes to every node). The aggregator answers with the last
+    `backfill` readings of each node and then pushes new readings as they arrive:
+
+        {"metric": "temperature", "node": "Airflow", "t": [epoch ms, ...], "v": [value, ...]}
+
+    The ingestion loop can push readings the moment they are taken with
+
+        {"op": "publish", "metric": "temperature", "node": "Airflow", "t": [...], "v": [...]}
+
+    With a poll_interval of 0 the database is read once at startup, as backfill,
+    and everything after that comes from publishers.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, capacity=CAPACITY):
+        self.poll_interval = poll_interval
+        self.store = SeriesStore(capacity)
+        self.fetchers = {metric: WatermarkFetcher(metric, column, backfill=INITIAL_BACKFILL)
+                         for metric, column in TABLES.items()}
+        self.subscribers = set()
+
+    # Database side
+
+    def poll_once(self):
+        """Runs in a worker thread; returns {metric: {node: [(dTime, value), ...]}}."""
+        return fetch_new_data(self.fetchers)
+
+    async def poll_forever(self):
+        while True:
+            start = time.perf_counter()
+            try:
+                deltas = await asyncio.to_thread(self.poll_once)
+            except mariadb.Error as e:
+                print(f"Database error: {e}")
+                await asyncio.sleep(max(self.poll_interval, RECONNECT_INTERVAL))
+                continue
+
+            for metric, nodes in deltas.items():
+                for node, rows in nodes.items():
+                    self.ingest(metric, node,
+                                [datetime_to_ms(dTime) for dTime, _ in rows],
+                                [float(value) for _, value in rows])
+            if self.poll_interval <= 0:
+                print("Backfill loaded; serving pushed readings only")
+                return
+            await asyncio.sleep(max(0.0, self.poll_interval - (time.perf_counter() - start)))
+
+    def ingest(self, metric, node, times_ms, values):
+        """Stores new readings and pushes them to every subscriber of (metric, node).
+
+        Readings already stored are skipped, so a reading that arrives both by push and
+        by poll is only forwarded once. Older readings missing from the store, such as
+        ones a publisher dropped that the next poll returns, are merged in by time and
+        counted as late_readings; only readings newer than the last one are forwarded,
+        since viewers append.
+        """
+        series = self.store.get(metric, node)
+        last = series.last_time()
+        if last is not None and times_ms and min(times_ms) <= last:
+            old = [i for i, t in enumerate(times_ms) if t <= last]
+            stored = set(series.since(min(times_ms[i] for i in old))[0].tolist())
+            missing = [i for i in old if times_ms[i] not in stored]
+            if missing:
+                series.merge([times_ms[i] for i in missing], [values[i] for i in missing])
+                metrics.count("late_readings", len(missing))
+            keep = [i for i, t in enumerate(times_ms) if t > last]
+            times_ms = [times_ms[i] for i in keep]
+            values = [values[i] for i in keep]
+        if not times_ms:
+            return
+        series.extend(times_ms, values)
+        self.broadcast(metric, node, times_ms, values)
+
+    def broadcast(self, metric, node, times_ms, values):
+        data = encode({"metric": metric, "node": node, "t": times_ms, "v": values})
+        for subscriber in list(self.subscribers):
+            if subscriber.wants(metric, node):
+                try:
+                    subscriber.send(data)
+                except ConnectionError:
+                    self.drop(subscriber)
+
+    # Client side
+
+    def drop(self, subscriber):
+        self.subscribers.discard(subscriber)
+        subscriber.writer.close()
+
+    def subscribe(self, subscriber, request):
+        metric = request["metric"]
+        nodes = request.get("nodes")
+        subscriber.interests[metric] = set(nodes) if nodes is not None else None
+        backfill = int(request.get("backfill", 0))
+        if backfill <= 0:
+            return
+        for node in (nodes if nodes is not None else self.store.nodes(metric)):
+            times, values = self.store.window(metric, node, backfill)
+            if len(times):
+                subscriber.send(encode({"metric": metric, "node": node,
+                                        "t": times.tolist(), "v": values.tolist()}))
+
+    async def handle_client(self, reader, writer):
+        subscriber = Subscriber(writer)
+        self.subscribers.add(subscriber)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                op = request.get("op")
+                if op == "subscribe":
+                    self.subscribe(subscriber, request)
+                elif op == "publish":
+                    self.ingest(request["metric"], request["node"], request["t"], request["v"])
+                await writer.drain()
+        except (ConnectionError, ValueError, KeyError) as e:
+            print(f"Dropping client: {e}")
+        finally:
+            self.drop(subscriber)
+
+    async def serve(self, address=DEFAULT_ADDRESS):
+        path, port = parse_address(address)
+        if port is None:
+            server = await asyncio.start_unix_server(self.handle_client, path)
+        else:
+            server = await asyncio.start_server(self.handle_client, path, port)
+        print(f"Serving sensor series on {address}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.poll_forever())
+
+
+class AggregatorClient:
+    """Blocking client for viewers; the aggregator side of live_source.LiveSource.
+
+    Each fetch returns the readings received since the previous one. Readings at or
+    before the newest one already returned for a node are dropped, so the backfill
+    replayed after a reconnect does not duplicate points.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, subscriptions=None, backfill=10):
+        self.address = address
+        self.subscriptions = subscriptions if subscriptions is not None else {metric: None for metric in TABLES}
+        self.backfill = backfill
+        self.sock = None
+        self.buffer = b""
+        self.last_seen = {}
+
+    def connect(self):
+        path, port = parse_address(self.address)
+        if port is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((path, port), timeout=5)
+        self.buffer = b""
+        for metric, nodes in self.subscriptions.items():
+            self.sock.sendall(encode({"op": "subscribe", "metric": metric, "nodes": nodes,
+                                      "backfill": self.backfill}))
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def read_messages(self, timeout=0.0):
+        """Returns the messages that have fully arrived, waiting at most `timeout` seconds for the first."""
+        if self.sock is None:
+            self.connect()
+        messages = []
+        while True:
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if not readable:
+                break
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                self.close()
+                raise ConnectionError("aggregator closed the connection")
+            self.buffer += chunk
+            timeout = 0.0
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            messages.append(json.loads(line))
+        return messages
+
+    def fetch(self, timeout=0.0):
+        """Returns {metric: {node: [(dTime, value), ...]}} of the readings received since the last call."""
+        try:
+            messages = self.read_messages(timeout)
+        except OSError:
+            self.close()
+            raise
+        deltas = {}
+        for message in messages:
+            key = (message["metric"], message["node"])
+            last = self.last_seen.get(key)
+            rows = [(ms_to_datetime(t), v) for t, v in zip(message["t"], message["v"])
+                    if last is None or t > last]
+            if rows:
+                self.last_seen[key] = message["t"][-1]
+                deltas.setdefault(message["metric"], {}).setdefault(message["node"], []).extend(rows)
+        return deltas
+
+
+class Publisher:
+    """Best-effort, non-blocking push of readings from the ingestion loop to the aggregator.
+
+    Ingestion never waits on it. While the aggregator is unreachable, or its socket
+    buffer is full, readings are left out of the live stream (they still reach
+    MariaDB) and a reconnect is attempted at most every RECONNECT_INTERVAL seconds.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address = address
+        self.sock = None
+        self.pending = b""
+        self.next_attempt = 0.0
+        self.published = 0
+        self.dropped = 0
+
+    def try_connect(self):
+        if time.monotonic() < self.next_attempt:
+            return False
+        self.next_attempt = time.monotonic() + RECONNECT_INTERVAL
+        path, port = parse_address(self.address)
+        try:
+            if port is None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(0.2)
+                sock.connect(path)
+            else:
+                sock = socket.create_connection((path, port), timeout=0.2)
+        except OSError:
+            return False
+        sock.setblocking(False)
+        self.sock = sock
+        self.pending = b""
+        return True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.pending = b""  # a partly sent line cannot be resumed on a new connection
+
+    def publish(self, metric, node, dTime, value):
+        if self.sock is None and not self.try_connect():
+            self.dropped += 1
+            return
+        if len(self.pending) > MAX_PUBLISH_BUFFER:
+            self.dropped += 1
+        else:
+            self.pending += encode({"op": "publish", "metric": metric, "node": node,
+                                    "t": [datetime_to_ms(dTime)], "v": [float(value)]})
+            self.published += 1
+        self.flush()
+
+    def flush(self):
+        if self.sock is None or not self.pending:
+            return
+        try:
+            sent = self.sock.send(self.pending)
+            self.pending = self.pending[sent:]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll the sensor database once and serve the series to local viewers.")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS, help="host:port or UNIX socket path")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="seconds between database polls")
+    parser.add_argument("--push-only", action="store_true",
+                        help="read the database once as backfill, then serve only readings pushed by publishers")
+    args = parser.parse_args()
+    try:
+        asyncio.run(Aggregator(poll_interval=0 if args.push_only else args.interval).serve(args.listen))
+    except KeyboardInterrupt:
+        print("Aggregator stopped by user.")
+        sys.exit(0)
@@ -0,0 +1,337 @@
+import sys
+import time
+import datetime
+from collections import namedtuple
+import numpy as np
+import metrics
+
+ROLLING_WINDOW = 30  # readings per node in the rolling mean/stddev (1 minute at 2 s)
+RESYNC_INTERVAL = 1000  # rounds between exact recomputations of the running sums
+STALE_AFTER = 30.0  # seconds without a reading before a node is reported stale
+
+# One alarm state change: raised=True when the rule starts firing, False when it clears
+Alarm = namedtuple("Alarm", "metric node rule raised dTime value")
+
+
+class Rule:
+    """A condition on one metric, evaluated for a whole batch of readings at once.
+
+    check() gets the node indices, times (Unix seconds) and values of the batch,
+    with `state` still holding every node's statistics from before these readings,
+    and returns a boolean array that is True where the reading is in alarm.
+    `nodes` limits the rule to some nodes; None applies it to all of them.
+    """
+
+    stale = False
+
+    def __init__(self, metric, name, nodes=None):
+        self.metric = metric
+        self.name = name
+        self.nodes = set(nodes) if nodes is not None else None
+
+    def applies(self, node):
+        return self.nodes is None or node in self.nodes
+
+    def check(self, state, idx, t, v):
+        raise NotImplementedError
+
+
+class Threshold(Rule):
+    """Value below `low` or above `high`; either may be None."""
+
+    def __init__(self, metric, low=None, high=None, nodes=None, name="threshold"):
+        super().__init__(metric, name, nodes)
+        self.low = low
+        self.high = high
+
+    def check(self, state, idx, t, v):
+        alarm = np.zeros(len(v), dtype=bool)
+        if self.low is not None:
+            alarm |= v < self.low
+        if self.high is not None:
+            alarm |= v > self.high
+        return alarm
+
+
+class RateOfChange(Rule):
+    """Change since the node's previous reading faster than max_rate units per second."""
+
+    def __init__(self, metric, max_rate, nodes=None, name="rate"):
+        super().__init__(metric, name, nodes)
+        self.max_rate = max_rate
+
+    def check(self, state, idx, t, v):
+        dt = t - state.last_time[idx]
+        dv = np.abs(v - state.last_value[idx])
+        seen = (state.count[idx] > 0) & (dt > 0)
+        return seen & (dv > self.max_rate * np.where(seen, dt, 1.0))
+
+
+class Deviation(Rule):
+    """Reading more than `sigmas` standard deviations from the node's rolling mean.
+
+    Fires only once the window holds min_samples readings. min_std keeps a
+    flat signal (stddev near 0) from alarming on its first small step.
+    """
+
+    def __init__(self, metric, sigmas=4.0, min_std=0.0, min_samples=ROLLING_WINDOW, nodes=None, name="deviation"):
+        super().__init__(metric, name, nodes)
+        self.sigmas = sigmas
+        self.min_std = min_std
+        self.min_samples = min_samples
+
+    def check(self, state, idx, t, v):
+        n, mean, std = state.stats(idx)
+        return (n >= self.min_samples) & (np.abs(v - mean) > self.sigmas * np.maximum(std, self.min_std))
+
+
+class Stale(Rule):
+    """No reading for max_age seconds. Raised by AlarmEngine.check_stale(), cleared by the next reading."""
+
+    stale = True
+
+    def __init__(self, metric, max_age=STALE_AFTER, nodes=None, name="stale"):
+        super().__init__(metric, name, nodes)
+        self.max_age = max_age
+
+    def check(self, state, idx, t, v):
+        return np.zeros(len(v), dtype=bool)
+
+
+# Default rules; adjust the limits to the site
+RULES = [
+    Threshold("temperature", low=15.0, high=32.0),
+    RateOfChange("temperature", max_rate=0.5),
+    Deviation("temperature", sigmas=4.0, min_std=0.2),
+    Stale("temperature"),
+    Threshold("humidity", low=30, high=75),
+    RateOfChange("humidity", max_rate=2.0),
+    Deviation("humidity", sigmas=4.0, min_std=1.0),
+    Stale("humidity"),
+]
+
+
+def _grow(array, capacity):
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class MetricState:
+    """Rolling statistics of one metric, one array row per node.
+
+    Each node keeps its last `window` values in a ring plus their running sum and
+    sum of squares, so mean and stddev update in O(1) per reading and every
+    operation is a NumPy expression over the nodes of a batch.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.index = {}
+        self.nodes = []
+        self.last_time = np.zeros(0)
+        self.last_value = np.zeros(0)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.sum = np.zeros(0)
+        self.sumsq = np.zeros(0)
+        self.ring = np.zeros((0, window))
+        self.rounds = 0
+
+    def node_ids(self, nodes):
+        """Row index of each node name, adding rows for nodes not seen before."""
+        index = self.index
+        for node in nodes:
+            if node not in index:
+                index[node] = len(self.nodes)
+                self.nodes.append(node)
+        if len(self.nodes) > len(self.count):
+            capacity = max(16, 2 * len(self.nodes))
+            for name in ("last_time", "last_value", "count", "sum", "sumsq", "ring"):
+                setattr(self, name, _grow(getattr(self, name), capacity))
+        return np.fromiter((index[node] for node in nodes), dtype=np.int64, count=len(nodes))
+
+    def stats(self, idx):
+        """(samples in window, mean, stddev) of the given rows."""
+        n = np.minimum(self.count[idx], self.window)
+        safe = np.maximum(n, 1)
+        mean = self.sum[idx] / safe
+        var = np.maximum(self.sumsq[idx] / safe - mean * mean, 0.0)
+        return n, mean, np.sqrt(var)
+
+    def update(self, idx, t, v):
+        """Adds one reading to each of the rows in idx, which must be unique."""
+        pos = self.count[idx] % self.window
+        old = np.where(self.count[idx] >= self.window, self.ring[idx, pos], 0.0)
+        self.sum[idx] += v - old
+        self.sumsq[idx] += v * v - old * old
+        self.ring[idx, pos] = v
+        self.last_time[idx] = t
+        self.last_value[idx] = v
+        self.count[idx] += 1
+
+        # Adding and subtracting accumulates rounding error; start over from the ring now and then
+        self.rounds += 1
+        if self.rounds % RESYNC_INTERVAL == 0:
+            self.sum = self.ring.sum(axis=1)
+            self.sumsq = np.square(self.ring).sum(axis=1)
+
+
+def describe(alarm):
+    state = "ALARM" if alarm.raised else "cleared"
+    value = "" if alarm.value is None else f" ({alarm.value:g})"
+    return f"{alarm.dTime:%Y-%m-%d %H:%M:%S} {state}: {alarm.metric} {alarm.node} {alarm.rule}{value}"
+
+
+def log_alarm(alarm):
+    print(describe(alarm))
+
+
+class AlarmEngine:
+    """Evaluates rules on every reading as it arrives, without looking back at stored history.
+
+    Readings are handed over in batches (feed(), feed_delta() or process()); each
+    rule runs once per batch over all its nodes. on_alarm(Alarm) is called for
+    every raise and clear.
+    """
+
+    def __init__(self, rules=RULES, window=ROLLING_WINDOW, on_alarm=log_alarm):
+        self.rules = list(rules)
+        self.window = window
+        self.on_alarm = on_alarm
+        self.states = {}
+        self.active = [np.zeros(0, dtype=bool) for _ in self.rules]  # per rule, per node row
+        self.masks = [np.zeros(0, dtype=bool) for _ in self.rules]  # rule.applies() per node row
+        self.covered = [0 for _ in self.rules]  # node rows each mask has been filled in for
+
+    def state(self, metric):
+        if metric not in self.states:
+            self.states[metric] = MetricState(self.window)
+        return self.states[metric]
+
+    def _rows(self, i, state):
+        """Active flags and applicability mask of rule i, extended to nodes added since the last call."""
+        if len(self.active[i]) < len(state.count):
+            self.active[i] = _grow(self.active[i], len(state.count))
+        if len(self.masks[i]) < len(state.count):
+            self.masks[i] = _grow(self.masks[i], len(state.count))
+        covered = self.covered[i]
+        if covered < len(state.nodes):
+            rule = self.rules[i]
+            self.masks[i][covered:len(state.nodes)] = [rule.applies(node) for node in state.nodes[covered:]]
+            self.covered[i] = len(state.nodes)
+        return self.active[i], self.masks[i]
+
+    def process(self, metric, nodes, times, values):
+        """Evaluates a batch of readings of one metric. Returns the Alarm changes it caused.
+
+        nodes is a sequence of names, times Unix seconds. Several readings of the
+        same node are applied in arrival order, one round each, so the rolling
+        state sees them one at a time; at a steady cadence a batch is one round.
+        """
+        if not len(nodes):
+            return []
+        state = self.state(metric)
+        idx = state.node_ids(nodes)
+        t = np.asarray(times, dtype=np.float64)
+        v = np.asarray(values, dtype=np.float64)
+
+        # Occurrence number of each reading among the readings of its node
+        order = np.argsort(idx, kind="stable")
+        sorted_idx = idx[order]
+        starts = np.flatnonzero(np.r_[True, sorted_idx[1:] != sorted_idx[:-1]])
+        rank = np.arange(len(idx)) - np.repeat(starts, np.diff(np.r_[starts, len(idx)]))
+
+        changes = []
+        rules = [i for i, rule in enumerate(self.rules) if rule.metric == metric]
+        for r in range(rank.max() + 1):
+            sel = np.sort(order[rank == r])
+            ri, rt, rv = idx[sel], t[sel], v[sel]
+            for i in rules:
+                active, mask = self._rows(i, state)
+                alarm = self.rules[i].check(state, ri, rt, rv) & mask[ri]
+                changed = np.flatnonzero(alarm != active[ri])
+                if len(changed):
+                    active[ri] = alarm
+                    changes.extend(self._alarm(metric, state.nodes[ri[j]], self.rules[i].name,
+                                               alarm[j], rt[j], rv[j]) for j in changed)
+            state.update(ri, rt, rv)
+        return changes
+
+    def check_stale(self, now=None):
+        """Raises the stale rules for nodes whose last reading is older than max_age. Returns the changes."""
+        now = time.time() if now is None else now
+        changes = []
+        for i, rule in enumerate(self.rules):
+            if not rule.stale or rule.metric not in self.states:
+                continue
+            state = self.states[rule.metric]
+            active, mask = self._rows(i, state)
+            n = len(state.nodes)
+            stale = mask[:n] & (state.count[:n] > 0) & (now - state.last_time[:n] > rule.max_age)
+            raised = np.flatnonzero(stale & ~active[:n])
+            active[raised] = True
+            changes.extend(self._alarm(rule.metric, state.nodes[j], rule.name, True, state.last_time[j], None)
+                           for j in raised)
+        return changes
+
+    def _alarm(self, metric, node, rule, raised, t, value):
+        alarm = Alarm(metric, node, rule, bool(raised), datetime.datetime.fromtimestamp(t),
+                      None if value is None else float(value))
+        metrics.count("alarms_raised" if raised else "alarms_cleared")
+        if self.on_alarm is not None:
+            self.on_alarm(alarm)
+        return alarm
+
+    def feed(self, readings):
+        """Evaluates (metric, node, dTime, value) tuples, as queued by the acquisition engine."""
+        grouped = {}
+        for metric, node, dTime, value in readings:
+            batch = grouped.setdefault(metric, ([], [], []))
+            batch[0].append(node)
+            batch[1].append(dTime.timestamp())
+            batch[2].append(value)
+        changes = []
+        for metric, (nodes, times, values) in grouped.items():
+            changes.extend(self.process(metric, nodes, times, values))
+        return changes
+
+    def feed_delta(self, metric, delta):
+        """Evaluates a viewer fetch, {node: [(dTime, value), ...]}."""
+        nodes = [node for node, rows in delta.items() for _ in rows]
+        times = [dTime.timestamp() for rows in delta.values() for dTime, _ in rows]
+        values = [value for rows in delta.values() for _, value in rows]
+        return self.process(metric, nodes, times, values)
+
+    def alarmed(self, metric):
+        """Names of the nodes of `metric` with at least one active alarm."""
+        if metric not in self.states:
+            return set()
+        state = self.states[metric]
+        n = len(state.nodes)
+        alarmed = np.zeros(n, dtype=bool)
+        for i, rule in enumerate(self.rules):
+            if rule.metric == metric and len(self.active[i]):
+                alarmed |= self.active[i][:n]
+        return {state.nodes[j] for j in np.flatnonzero(alarmed)}
+
+    def active_count(self):
+        return int(sum(active.sum() for active in self.active))
+
+
+if __name__ == "__main__":
+    # Cost of evaluating the default rules: python alarms.py [nodes] [rounds]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    nodes = [f"node{i + 1}" for i in range(count)]
+    rng = np.random.default_rng(0)
+    temperature = rng.uniform(20, 30, count)
+    engine = AlarmEngine(on_alarm=None)
+    now = time.time()
+    elapsed = 0.0
+    for r in range(rounds):
+        temperature += rng.normal(0, 0.1, count)
+        start = time.perf_counter()
+        engine.process("temperature", nodes, np.full(count, now + 2.0 * r), temperature)
+        elapsed += time.perf_counter() - start
+    print(f"{count} nodes x {rounds} rounds: {1e6 * elapsed / (count * rounds):.2f} us per reading, "
+          f"{1000 * elapsed / rounds:.2f} ms per round, {engine.active_count()} active alarms")
@@ -0,0 +1,263 @@
+import os
+import shutil
+import datetime
+import argparse
+from urllib.parse import quote, unquote
+import numpy as np
+import db
+import tscodec
+from schema import TABLES, partitions, partition_name, table_exists
+from rollup import get_watermark
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_AFTER_DAYS = 30  # whole days older than this move out of MariaDB
+DELETE_BATCH = 10000  # rows per DELETE transaction, so the hot tables are never locked for long
+# Write each node's day as one tscodec block (.tsc, about a third of the size) instead of
+# two .npy files. Both are read, but only .npy days are memory-mapped: a .tsc day is
+# decoded whole on every read, which history views panning through it pay for each chunk.
+COMPRESS = False
+SUFFIXES = (".tsc", ".t.npy", ".v.npy")
+
+
+def day_dir(table, day, root=ARCHIVE_DIR):
+    return os.path.join(root, table, f"{day:%Y-%m-%d}")
+
+
+def node_paths(directory, node):
+    """Time (int64 Unix ms) and value (float32) arrays of one node for one day."""
+    name = quote(node, safe="")
+    return os.path.join(directory, f"{name}.t.npy"), os.path.join(directory, f"{name}.v.npy")
+
+
+def block_path(directory, node):
+    """Both arrays of one node for one day, encoded by tscodec."""
+    return os.path.join(directory, f"{quote(node, safe='')}.tsc")
+
+
+def file_node(name):
+    """Quoted node name of an archive file name, or None for other files."""
+    for suffix in SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return None
+
+
+def archived_days(table, root=ARCHIVE_DIR):
+    directory = os.path.join(root, table)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(datetime.date.fromisoformat(name) for name in os.listdir(directory)
+                  if not name.endswith((".tmp", ".old")))
+
+
+def recover_day(final):
+    """Finishes a replacement of one day directory interrupted by a crash (see write_day).
+
+    A <day>.old left without its <day> is the only copy of that day and is moved
+    back; one left next to a complete <day> is removed.
+    """
+    backup = final + ".old"
+    if not os.path.isdir(backup):
+        return
+    if os.path.isdir(final):
+        shutil.rmtree(backup)
+    else:
+        os.replace(backup, final)
+        print(f"{final}: restored after an interrupted archive run")
+
+
+def recover(root=ARCHIVE_DIR):
+    for table in TABLES:
+        directory = os.path.join(root, table)
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.endswith(".old"):
+                    recover_day(os.path.join(directory, name[:-len(".old")]))
+
+
+def archived_nodes(table, root=ARCHIVE_DIR):
+    nodes = set()
+    for day in archived_days(table, root):
+        nodes.update(unquote(file_node(name)) for name in os.listdir(day_dir(table, day, root))
+                     if file_node(name) is not None)
+    return sorted(nodes)
+
+
+def read_node_day(table, node, day, root=ARCHIVE_DIR):
+    """One node's day as (t_ms, values), or None when it is not archived.
+
+    A .tsc block is decoded whole; .npy files are memory-mapped.
+    """
+    directory = day_dir(table, day, root)
+    path = block_path(directory, node)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return tscodec.decode(f.read())
+    t_path, v_path = node_paths(directory, node)
+    if not os.path.exists(t_path):
+        return None
+    return np.load(t_path, mmap_mode="r"), np.load(v_path, mmap_mode="r")
+
+
+def write_node_day(directory, node, t, v, compress=COMPRESS):
+    if compress:
+        with open(block_path(directory, node), "wb") as f:
+            f.write(tscodec.encode(t, v))  # lossless: archived readings must read back exactly
+    else:
+        t_path, v_path = node_paths(directory, node)
+        np.save(t_path, t)
+        np.save(v_path, v)
+
+
+def read_range(table, node, t0, t1, root=ARCHIVE_DIR):
+    """Archived readings of `node` with t0 <= t < t1 (Unix seconds) as (t seconds, values) float64 arrays.
+
+    Only the days overlapping the range are read, and only the slice inside the
+    range is copied out of them.
+    """
+    first = datetime.date.fromtimestamp(t0)
+    last = datetime.date.fromtimestamp(t1)
+    lo_ms, hi_ms = int(t0 * 1000), int(t1 * 1000)
+    times, values = [], []
+    for i in range((last - first).days + 1):
+        arrays = read_node_day(table, node, first + datetime.timedelta(days=i), root)
+        if arrays is None:
+            continue
+        t, v = arrays
+        a, b = np.searchsorted(t, [lo_ms, hi_ms])
+        if b > a:
+            times.append(t[a:b] / 1000.0)
+            values.append(np.asarray(v[a:b], dtype=np.float64))
+    if not times:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(times), np.concatenate(values)
+
+
+def fetch_node_day(cursor, table, column, node, lo, hi):
+    cursor.execute(f"SELECT dTime, {column} FROM {table} "
+                   f"WHERE node = ? AND dTime >= ? AND dTime < ? ORDER BY dTime", (node, lo, hi))
+    rows = cursor.fetchall()
+    t = np.fromiter((round(dTime.timestamp() * 1000) for dTime, _ in rows), dtype=np.int64, count=len(rows))
+    v = np.fromiter((value for _, value in rows), dtype=np.float32, count=len(rows))
+    return t, v
+
+
+def write_day(cursor, table, column, day, root=ARCHIVE_DIR, compress=COMPRESS):
+    """Writes one day of every node to its archive directory. Returns the rows archived.
+
+    Rows already archived for that day (e.g. from an earlier run, before late
+    readings were replayed into the database) are merged in, so re-running is safe.
+    The day is written to a temporary directory and renamed into place. An existing
+    day is first renamed to <day>.old and removed only after the new one is in
+    place, so a crash never leaves the day without a complete copy; recover()
+    puts a stranded backup back (recover_day).
+    """
+    lo = datetime.datetime.combine(day, datetime.time())
+    hi = lo + datetime.timedelta(days=1)
+    final = day_dir(table, day, root)
+    tmp = final + ".tmp"
+    recover_day(final)
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    cursor.execute(f"SELECT DISTINCT node FROM {table} WHERE dTime >= ? AND dTime < ?", (lo, hi))
+    nodes = [row[0] for row in cursor.fetchall()]
+    if not nodes and not os.path.isdir(final):
+        os.rmdir(tmp)
+        return 0
+    count = 0
+    for node in nodes:
+        t, v = fetch_node_day(cursor, table, column, node, lo, hi)
+        count += len(t)
+        existing = read_node_day(table, node, day, root)
+        if existing is not None:
+            t = np.concatenate((existing[0], t))
+            v = np.concatenate((existing[1], v))
+            t, first = np.unique(t, return_index=True)  # sorted, one reading per timestamp
+            v = v[first]
+        write_node_day(tmp, node, t, v, compress)
+
+    # Nodes archived earlier that have no new rows this time; rewritten nodes drop their old-format files
+    rewritten = {quote(node, safe="") for node in nodes}
+    if os.path.isdir(final):
+        for name in os.listdir(final):
+            if file_node(name) not in rewritten and not os.path.exists(os.path.join(tmp, name)):
+                shutil.copy2(os.path.join(final, name), tmp)
+
+    for name in os.listdir(tmp):
+        with open(os.path.join(tmp, name), "rb") as f:
+            os.fsync(f.fileno())
+    backup = final + ".old"
+    if os.path.isdir(final):
+        os.replace(final, backup)
+    os.replace(tmp, final)
+    shutil.rmtree(backup, ignore_errors=True)
+    return count
+
+
+def delete_day(conn, table, day):
+    """Removes one archived day from MariaDB: a partition drop when the day is a partition, else batched DELETEs."""
+    lo = datetime.datetime.combine(day, datetime.time())
+    hi = lo + datetime.timedelta(days=1)
+    cursor = conn.cursor()
+    try:
+        if partition_name(day) in [name for name, _ in partitions(cursor, table)]:
+            cursor.execute(f"ALTER TABLE {table} DROP PARTITION {partition_name(day)}")
+            return
+        while True:
+            cursor.execute(f"DELETE FROM {table} WHERE dTime >= ? AND dTime < ? LIMIT ?", (lo, hi, DELETE_BATCH))
+            deleted = cursor.rowcount
+            conn.commit()
+            if deleted < DELETE_BATCH:
+                return
+    finally:
+        cursor.close()
+
+
+def archive(conn, after_days=ARCHIVE_AFTER_DAYS, root=ARCHIVE_DIR, compress=COMPRESS):
+    """Archives and deletes every whole day older than after_days. Returns {table: rows archived}.
+
+    Days not yet folded into the rollup tables are left alone, since the rollups
+    are what the history views read at coarse zoom levels. A reading inserted into
+    a day between its export and its delete is lost, so keep after_days well past
+    anything the ingestion spool might still replay.
+    """
+    recover(root)
+    cutoff = datetime.date.today() - datetime.timedelta(days=after_days)
+    archived = {}
+    cursor = conn.cursor()
+    try:
+        for table, column in TABLES.items():
+            cursor.execute(f"SELECT MIN(dTime) FROM {table}")
+            oldest = cursor.fetchone()[0]
+            if oldest is None:
+                continue
+            limit = cutoff
+            if table_exists(cursor, "rollup_watermark"):
+                rolled = get_watermark(cursor, table)
+                limit = min(cutoff, rolled.date()) if rolled is not None else oldest.date()
+            day = oldest.date()
+            archived[table] = 0
+            while day < limit:
+                count = write_day(cursor, table, column, day, root, compress)
+                delete_day(conn, table, day)
+                print(f"{table} {day}: {count} rows archived")
+                archived[table] += count
+                day += datetime.timedelta(days=1)
+    finally:
+        cursor.close()
+    return archived
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old readings from MariaDB into per-day archive files.")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive whole days older than this")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="archive root directory")
+    parser.add_argument("--compress", action="store_true",
+                        help="write compact .tsc blocks instead of memory-mappable .npy files")
+    args = parser.parse_args()
+    conn = db.connect_writer()
+    try:
+        archive(conn, args.days, args.dir, COMPRESS or args.compress)
+    finally:
+        conn.close()
@@ -0,0 +1,179 @@
+import time
+import datetime
+import mariadb
+import metrics
+
+# Adapt these SQL queries to your table structure
+TEMPERATURE_QUERY = "INSERT INTO temperature (dTime, node, temperature) VALUES (?, ?, ?)"
+HUMIDITY_QUERY = "INSERT INTO humidity (dTime, node, humidity) VALUES (?, ?, ?)"
+
+
+class BatchWriter:
+    """Queues readings and writes them with executemany in one transaction.
+
+    A flush happens when max_rows readings are queued or when the oldest queued
+    reading is older than max_age seconds, whichever comes first. An optional
+    publisher (aggregator.Publisher) receives every reading as soon as it is queued.
+
+    With a spool (spool.Spool), a batch that cannot be written is appended to disk
+    instead of being lost, and the connection is dropped (conn becomes None) for
+    the caller to re-establish. While conn is None or the spool holds a backlog,
+    batches go to the spool so readings are replayed in the order they were taken.
+    Without a spool, readings stay queued while conn is None.
+    """
+
+    def __init__(self, conn, max_rows=500, max_age=1.0, publisher=None, spool=None):
+        self.conn = conn
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.publisher = publisher
+        self.spool = spool
+
+        self.temperature_rows = []
+        self.humidity_rows = []
+        self.first_queued = None  # monotonic time of the oldest queued reading
+
+        # Counters for sizing the writer
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.rows_spooled = 0
+        self.flush_count = 0
+        self.flush_time = 0.0  # total seconds spent inside flush()
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.started = time.monotonic()
+
+    def add(self, metric, node_name, value, dTime=None):
+        """Queues one reading of `metric` ("temperature" or "humidity")."""
+        rows = self.temperature_rows if metric == "temperature" else self.humidity_rows
+        self._queue(rows, metric, node_name, value, dTime)
+
+    def _queue(self, rows, metric, node_name, value, dTime):
+        if dTime is None:
+            dTime = datetime.datetime.now()
+        if self.publisher is not None:
+            self.publisher.publish(metric, node_name, dTime, value)
+        if self.first_queued is None:
+            self.first_queued = time.monotonic()
+        rows.append((dTime, node_name, value))
+        if self.should_flush():
+            self.flush()
+
+    def pending(self):
+        """Number of readings waiting to be written."""
+        return len(self.temperature_rows) + len(self.humidity_rows)
+
+    def should_flush(self):
+        if self.first_queued is None:
+            return False
+        if self.pending() >= self.max_rows:
+            return True
+        return time.monotonic() - self.first_queued >= self.max_age
+
+    def flush(self):
+        """Writes all queued readings in a single transaction. Returns the row count."""
+        count = self.pending()
+        if count == 0:
+            return 0
+        if self.conn is None and self.spool is None:
+            return 0  # nowhere to write them yet; they stay queued until conn is set
+
+        temperature_rows, self.temperature_rows = self.temperature_rows, []
+        humidity_rows, self.humidity_rows = self.humidity_rows, []
+        self.first_queued = None
+
+        start = time.perf_counter()
+        if self.spool is not None and (self.conn is None or self.spool.pending()):
+            # Behind a backlog: queue on disk so replay() keeps the readings in order
+            self.spool_rows(temperature_rows, humidity_rows)
+            self.record_latency(start)
+            return 0
+
+        cursor = None
+        try:
+            cursor = self.conn.cursor()
+            if temperature_rows:
+                cursor.executemany(TEMPERATURE_QUERY, temperature_rows)
+            if humidity_rows:
+                cursor.executemany(HUMIDITY_QUERY, humidity_rows)
+            self.conn.commit()  # One commit (and one fsync) for the whole batch
+            self.rows_written += count
+            metrics.count("rows_written", count)
+        except mariadb.Error as e:
+            print(f"Error inserting batch of {count} rows: {e}")
+            if self.spool is not None:
+                self.spool_rows(temperature_rows, humidity_rows)
+                self.disconnect()
+            else:
+                self.conn.rollback()  # Rollback in case of error to maintain data integrity
+                self.rows_failed += count
+                metrics.count("rows_failed", count)
+            count = 0
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except mariadb.Error:
+                    pass
+
+        self.record_latency(start)
+        return count
+
+    def spool_rows(self, temperature_rows, humidity_rows):
+        self.spool.append("temperature", temperature_rows)
+        self.spool.append("humidity", humidity_rows)
+        self.rows_spooled += len(temperature_rows) + len(humidity_rows)
+        metrics.count("rows_spooled", len(temperature_rows) + len(humidity_rows))
+
+    def replay(self, max_rows=None):
+        """Writes up to max_rows of the spool backlog through the current connection. Returns the rows replayed."""
+        if self.spool is None or self.conn is None:
+            return 0
+        try:
+            replayed = self.spool.replay(self.conn, max_rows=max_rows)
+        except mariadb.Error as e:
+            print(f"Error replaying spool: {e}")
+            self.disconnect()
+            return 0
+        self.rows_written += replayed
+        metrics.count("rows_written", replayed)
+        metrics.count("rows_replayed", replayed)
+        return replayed
+
+    def disconnect(self):
+        try:
+            self.conn.rollback()
+            self.conn.close()
+        except mariadb.Error:
+            pass
+        self.conn = None
+
+    def record_latency(self, start):
+        latency = time.perf_counter() - start
+        metrics.observe("flush", latency)  # insert + commit, or the spool append
+        self.flush_count += 1
+        self.flush_time += latency
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+
+    def stats(self):
+        """Returns throughput and flush latency figures as a dict."""
+        elapsed = time.monotonic() - self.started
+        return {
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "rows_spooled": self.rows_spooled,
+            "pending": self.pending(),
+            "flushes": self.flush_count,
+            "inserts_per_sec": self.rows_written / elapsed if elapsed > 0 else 0.0,
+            "avg_flush_ms": 1000.0 * self.flush_time / self.flush_count if self.flush_count else 0.0,
+            "last_flush_ms": 1000.0 * self.last_flush_latency,
+            "max_flush_ms": 1000.0 * self.max_flush_latency,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"{s['rows_written']} rows written ({s['inserts_per_sec']:.1f} inserts/sec), "
+              f"{s['flushes']} flushes, flush latency avg {s['avg_flush_ms']:.2f} ms / "
+              f"last {s['last_flush_ms']:.2f} ms / max {s['max_flush_ms']:.2f} ms, "
+              f"{s['rows_failed']} failed, {s['rows_spooled']} spooled, {s['pending']} pending")
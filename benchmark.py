@@ -0,0 +1,534 @@
+import os
+import sys
+import json
+import pickle
+import time
+import sqlite3
+import datetime
+import platform
+import argparse
+import subprocess
+import numpy as np
+
+# Sizes swept by each suite; --quick runs the smallest of each
+DEFAULT_SUITES = ["ingest", "fetch", "transform", "render", "startup", "codec"]
+TABLE_SIZES = [10000, 100000, 1000000]
+NODE_COUNTS = [3, 30, 300]
+TRANSFORM_ROWS = [10, 1000, 100000, 1000000, 10000000]
+RENDER_SERIES = [(3, 10), (3, 300), (30, 300)]  # (nodes, points per node)
+REPEATS = 5
+RENDER_FRAMES = 50
+STARTUP_RUNS = 3  # cold starts of the dashboard per backend
+STARTUP_TIMEOUT = 60  # seconds before a dashboard that never draws data is given up on
+CODEC_POINTS = [43200, 1000000]  # readings per encoded series; 43200 is one node-day at 2 s
+PERIOD = 2  # seconds between simulated readings of a node
+
+_EPOCH = datetime.datetime(2025, 1, 1)
+
+
+# SQLite stand-in for MariaDB
+
+def _adapt_datetime(value):
+    return value.isoformat(sep=" ")
+
+
+def _convert_datetime(value):
+    return datetime.datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime.datetime, _adapt_datetime)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+
+
+class StandInConnection:
+    """The parts of a mariadb connection the repo uses, backed by one shared SQLite database.
+
+    close() is a no-op so modules that open and close a connection per call keep
+    seeing the same data.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, buffered=True):
+        return self.db.cursor()
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def ping(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def create_database(path=":memory:"):
+    db = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    for table in ("temperature", "humidity"):
+        # Same keys as schema.py creates on MariaDB
+        db.execute(f"CREATE TABLE {table} (node TEXT NOT NULL, dTime DATETIME NOT NULL, "
+                   f"{table} REAL NOT NULL, PRIMARY KEY (node, dTime))")
+        db.execute(f"CREATE INDEX idx_{table}_dTime ON {table} (dTime)")
+    return db
+
+
+def install_stand_in(db):
+    """Points every mariadb.connect() at db; registers a mariadb module if none is installed."""
+    try:
+        import mariadb
+    except ImportError:
+        mariadb = type(sys)("mariadb")
+        mariadb.Error = sqlite3.Error
+        sys.modules["mariadb"] = mariadb
+    mariadb.connect = lambda **kwargs: StandInConnection(db)
+    if "db" in sys.modules:
+        sys.modules["db"].reset()  # drop pooled connections to the previous stand-in
+
+
+def fill(db, rows, nodes):
+    """Inserts `rows` readings per table, round-robin over `nodes`, ending now."""
+    end = datetime.datetime.now().replace(microsecond=0)
+    ticks = rows // nodes + 1
+    for table in ("temperature", "humidity"):
+        db.executemany(f"INSERT INTO {table} VALUES (?, ?, ?)",
+                       ((f"node{n + 1}", end - datetime.timedelta(seconds=PERIOD * (ticks - i)), 20 + (i % 100) * 0.1)
+                        for i in range(ticks) for n in range(nodes) if i * nodes + n < rows))
+    db.commit()
+
+
+def timed(fn, repeats=REPEATS):
+    """Runs fn repeats times; returns (median ms, min ms, last result)."""
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return 1000.0 * float(np.median(times)), 1000.0 * min(times), result
+
+
+def skipped(suite, name, reason):
+    return {"suite": suite, "name": name, "skipped": reason}
+
+
+# Suites
+
+def insert_temperature_data(conn, node_name, temperature):
+    """The original random_insertData path: one INSERT and one commit per reading, timestamped on insert."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT INTO temperature (dTime, node, temperature) VALUES (?, ?, ?)",
+                       (datetime.datetime.now(), node_name, temperature))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def bench_ingest(args):
+    db = create_database()
+    install_stand_in(db)
+    from batch_writer import BatchWriter
+
+    results = []
+    rows = args.ingest_rows
+    for batch in (1, 100, 500, 5000):
+        db.execute("DELETE FROM temperature")
+        conn = StandInConnection(db)
+        writer = BatchWriter(conn, max_rows=batch, max_age=3600)
+        start = time.perf_counter()
+        for i in range(rows):
+            writer.add("temperature", f"node{i % 100}", 25.0, _EPOCH + datetime.timedelta(milliseconds=i))
+        writer.flush()
+        elapsed = time.perf_counter() - start
+        results.append({"suite": "ingest", "name": "BatchWriter", "batch_rows": batch, "rows": rows,
+                        "rows_per_sec": rows / elapsed})
+
+    # The original one-commit-per-row path, for reference
+    db.execute("DELETE FROM temperature")
+    conn = StandInConnection(db)
+    count = min(rows, 20000)
+    start = time.perf_counter()
+    for i in range(count):
+        insert_temperature_data(conn, f"node{i}", 25.0)
+    elapsed = time.perf_counter() - start
+    results.append({"suite": "ingest", "name": "insert_temperature_data", "batch_rows": 1, "rows": count,
+                    "rows_per_sec": count / elapsed})
+    return results
+
+
+def bench_fetch(args):
+    from incremental_fetch import WatermarkFetcher
+    from live_source import LiveSource
+
+    results = []
+    for size in args.table_sizes:
+        for nodes in args.node_counts:
+            db = create_database()
+            fill(db, size, nodes)
+            install_stand_in(db)
+            params = {"table_rows": size, "nodes": nodes}
+            node_names = [f"node{n + 1}" for n in range(nodes)]
+
+            # What pGraph and plotGraph send each tick: both tables, one pooled read
+            subscriptions = {"temperature": node_names, "humidity": node_names}
+            median, best, _ = timed(lambda: LiveSource(subscriptions).fetch())
+            results.append({"suite": "fetch", "name": "LiveSource backfill", **params,
+                            "median_ms": median, "min_ms": best})
+            source = LiveSource(subscriptions)
+            source.fetch()
+            median, best, _ = timed(source.fetch)
+            results.append({"suite": "fetch", "name": "LiveSource delta", **params,
+                            "median_ms": median, "min_ms": best})
+
+            cursor = db.cursor()
+            median, best, _ = timed(lambda: WatermarkFetcher("temperature", "temperature", node_names,
+                                                             backfill=10).fetch(cursor))
+            results.append({"suite": "fetch", "name": "WatermarkFetcher backfill", **params,
+                            "median_ms": median, "min_ms": best})
+            fetcher = WatermarkFetcher("temperature", "temperature", node_names, backfill=10)
+            fetcher.fetch(cursor)
+            median, best, _ = timed(lambda: fetcher.fetch(cursor))
+            results.append({"suite": "fetch", "name": "WatermarkFetcher delta", **params,
+                            "median_ms": median, "min_ms": best})
+            db.close()
+    return results
+
+
+def make_rows(rows, nodes=30):
+    ticks = rows // nodes + 1
+    times = [_EPOCH + datetime.timedelta(seconds=PERIOD * i) for i in range(ticks)]
+    return [(times[i // nodes], f"node{i % nodes}", 20.0 + (i % 100) * 0.1) for i in range(rows)]
+
+
+def bench_transform(args):
+    try:
+        import plotGraph
+    except ImportError as e:
+        return [skipped("transform", "all", str(e))]
+    from ring_buffer import RingBuffer
+
+    results = []
+    for rows in args.transform_rows:
+        if rows <= args.max_tuple_rows:
+            data = make_rows(rows)
+            # Row tuples as a cursor returns them
+            median, best, _ = timed(lambda: plotGraph.pivot_readings(data), repeats=3 if rows > 100000 else REPEATS)
+            results.append({"suite": "transform", "name": "pivot_readings", "rows": rows,
+                            "median_ms": median, "min_ms": best, "rows_per_sec": rows / (best / 1000.0)})
+            del data
+        nodes = 30
+        times = (np.datetime64(_EPOCH, "ms") + (np.arange(rows) // nodes) * np.timedelta64(PERIOD * 1000, "ms"))
+        node_column = np.array([f"node{n}" for n in range(nodes)])[np.arange(rows) % nodes]
+        values = 20.0 + (np.arange(rows) % 100) * 0.1
+        median, best, _ = timed(lambda: plotGraph.pivot_columns(times, node_column, values),
+                                repeats=3 if rows > 100000 else REPEATS)
+        results.append({"suite": "transform", "name": "pivot_columns", "rows": rows,
+                        "median_ms": median, "min_ms": best, "rows_per_sec": rows / (best / 1000.0)})
+
+        # What SensorPlotter.process_data gets: one pair of ring buffers per node
+        wall_us = times.astype("datetime64[us]").astype(np.int64)
+        buffers = {}
+        for n in range(nodes):
+            node_times, node_values = RingBuffer(rows // nodes + 1, dtype=np.int64), RingBuffer(rows // nodes + 1)
+            node_times.extend(wall_us[n::nodes])
+            node_values.extend(values[n::nodes])
+            buffers[f"node{n}"] = (node_times, node_values)
+        median, best, _ = timed(lambda: plotGraph.pivot_buffers(buffers), repeats=3 if rows > 100000 else REPEATS)
+        results.append({"suite": "transform", "name": "SensorPlotter.process_data", "rows": rows,
+                        "median_ms": median, "min_ms": best, "rows_per_sec": rows / (best / 1000.0)})
+    return results
+
+
+def frame_stats(name, nodes, points, frame_times):
+    frame_times = np.array(frame_times[1:]) * 1000.0  # the first frame includes one-off layout
+    return {"suite": "render", "name": name, "nodes": nodes, "points": points,
+            "mean_ms": float(frame_times.mean()), "p95_ms": float(np.percentile(frame_times, 95))}
+
+
+def series(nodes, points, frames):
+    total = points + frames
+    t_ms = 1735732800000 + np.arange(total, dtype=np.int64) * PERIOD * 1000
+    values = 25 + np.cumsum(np.random.default_rng(0).normal(0, 0.05, (nodes, total)), axis=1)
+    return t_ms, values
+
+
+def render_qtcharts(app, nodes, points, frames):
+    from PySide6.QtCharts import QChart, QChartView, QLineSeries, QDateTimeAxis, QValueAxis
+    from PySide6.QtCore import Qt, QPointF, QDateTime
+    from PySide6.QtGui import QImage, QPainter
+
+    chart = QChart()
+    axis_x, axis_y = QDateTimeAxis(), QValueAxis()
+    chart.addAxis(axis_x, Qt.AlignBottom)
+    chart.addAxis(axis_y, Qt.AlignLeft)
+    lines = []
+    for _ in range(nodes):
+        line = QLineSeries()
+        chart.addSeries(line)
+        line.attachAxis(axis_x)
+        line.attachAxis(axis_y)
+        lines.append(line)
+    view = QChartView(chart)
+    view.resize(1800, 450)
+    image = QImage(1800, 450, QImage.Format_ARGB32_Premultiplied)
+    t_ms, values = series(nodes, points, frames)
+
+    frame_times = []
+    for f in range(frames):
+        start = time.perf_counter()
+        for i, line in enumerate(lines):
+            line.replace([QPointF(t, v) for t, v in zip(t_ms[f:f + points].tolist(), values[i, f:f + points].tolist())])
+        axis_x.setRange(QDateTime.fromMSecsSinceEpoch(int(t_ms[f])),
+                        QDateTime.fromMSecsSinceEpoch(int(t_ms[f + points - 1])))
+        axis_y.setRange(float(values[:, f:f + points].min()), float(values[:, f:f + points].max()))
+        painter = QPainter(image)
+        view.render(painter)
+        painter.end()
+        frame_times.append(time.perf_counter() - start)
+    return frame_stats("QtCharts (showG)", nodes, points, frame_times)
+
+
+def render_pyqtgraph(app, nodes, points, frames):
+    import pyqtgraph as pg
+    from PySide6.QtGui import QImage, QPainter
+
+    plot = pg.PlotWidget(axisItems={'bottom': pg.DateAxisItem()})
+    plot.resize(1800, 450)
+    plot.setClipToView(True)
+    plot.setDownsampling(auto=True, mode='peak')
+    curves = [plot.plot([], [], skipFiniteCheck=True) for _ in range(nodes)]
+    image = QImage(1800, 450, QImage.Format_ARGB32_Premultiplied)
+    t_ms, values = series(nodes, points, frames)
+    t = t_ms / 1000.0
+
+    frame_times = []
+    for f in range(frames):
+        start = time.perf_counter()
+        for i, curve in enumerate(curves):
+            curve.setData(t[f:f + points], values[i, f:f + points])
+        painter = QPainter(image)
+        plot.render(painter)
+        painter.end()
+        frame_times.append(time.perf_counter() - start)
+    return frame_stats("pyqtgraph (plotGraph)", nodes, points, frame_times)
+
+
+def render_matplotlib(app, nodes, points, frames):
+    import blit_benchmark
+    results = []
+    for mode in ("full", "blit"):
+        result = blit_benchmark.run(mode, nodes, points, frames)
+        results.append({"suite": "render", "name": f"matplotlib {mode} (pGraph)", "nodes": nodes, "points": points,
+                        "mean_ms": result["mean_ms"], "p95_ms": result["p95_ms"]})
+    return results
+
+
+def bench_render(args):
+    try:
+        from PySide6.QtWidgets import QApplication
+    except ImportError as e:
+        return [skipped("render", "all", str(e))]
+    app = QApplication.instance() or QApplication([])
+
+    results = []
+    for name, fn in (("QtCharts (showG)", render_qtcharts), ("pyqtgraph (plotGraph)", render_pyqtgraph),
+                     ("matplotlib (pGraph)", render_matplotlib)):
+        for nodes, points in RENDER_SERIES:
+            try:
+                result = fn(app, nodes, points, args.frames)
+            except ImportError as e:
+                results.append(skipped("render", name, str(e)))
+                break
+            results.extend(result if isinstance(result, list) else [result])
+    return results
+
+
+# Each run is a fresh interpreter: fill a stand-in database, start the dashboard and
+# let it exit after its first frame with data
+STARTUP_SCRIPT = """
+import sys, benchmark
+db = benchmark.create_database()
+benchmark.fill(db, 900, 3)
+benchmark.install_stand_in(db)
+import dashboard
+dashboard.main(["--backend", sys.argv[1], "--no-alarms", "--startup"])
+"""
+
+
+def bench_startup(args):
+    """Process start to the dashboard's first frame, per backend."""
+    import dashboard
+    results = []
+    for backend in dashboard.BACKENDS:
+        process_ms, first_frame, first_data = [], [], []
+        for _ in range(args.startup_runs):
+            start = time.perf_counter()
+            try:
+                run = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, backend], capture_output=True, text=True,
+                                     timeout=STARTUP_TIMEOUT, cwd=os.path.dirname(os.path.abspath(__file__)))
+            except subprocess.TimeoutExpired:
+                run = None
+            elapsed = 1000.0 * (time.perf_counter() - start)
+            lines = [line for line in run.stdout.splitlines() if line.startswith("{")] if run is not None else []
+            if not lines:
+                reason = run.stderr.strip().splitlines()[-1] if run is not None and run.stderr.strip() else "no frame"
+                results.append(skipped("startup", backend, reason))
+                break
+            probe = json.loads(lines[-1])
+            process_ms.append(elapsed)
+            first_frame.append(probe["first_frame_ms"])
+            first_data.append(probe["first_data_ms"])
+        else:
+            # process_ms includes interpreter start and the stand-in setup, so it is an upper bound
+            results.append({"suite": "startup", "name": backend, "median_ms": float(np.median(process_ms)),
+                            "first_frame_ms": float(np.median(first_frame)),
+                            "first_data_ms": float(np.median(first_data))})
+    return results
+
+
+def codec_series(kind, points, rng):
+    """(epoch ms, float32 values) shaped like acquisition.py readings: a clamped random walk, read with jitter."""
+    t = (_EPOCH.timestamp() * 1000 + np.arange(points, dtype=np.int64) * PERIOD * 1000
+         + rng.integers(0, 50, points)).astype(np.int64)
+    if kind == "humidity":
+        v = np.clip(60 + np.cumsum(rng.normal(0, 0.5, points)), 40, 80)
+    else:
+        v = np.clip(27 + np.cumsum(rng.normal(0, 0.1, points)), 20, 35)
+    if kind == "temperature_2dp":
+        v = np.round(v, 2)
+    return t, v.astype(np.float32)
+
+
+def bench_codec(args):
+    """Bytes per point and decode throughput of tscodec against the plain representations."""
+    import tscodec
+    rng = np.random.default_rng(0)
+    results = []
+    for points in args.codec_points:
+        for kind in ("temperature", "temperature_2dp", "humidity"):
+            t, v = codec_series(kind, points, rng)
+            plain = t.tobytes() + v.tobytes()  # archive .npy / SeriesStore layout
+            encodings = [
+                ("int64+float32 arrays", lambda: t.tobytes() + v.tobytes(),
+                 lambda data: (np.frombuffer(data, np.int64, points).copy(),
+                               np.frombuffer(data, np.float32, points, 8 * points).copy())),
+                ("tscodec xor", lambda: tscodec.encode(t, v), tscodec.decode),
+            ]
+            if kind == "temperature_2dp":
+                encodings.append(("tscodec step=0.01", lambda: tscodec.encode(t, v, 0.01), tscodec.decode))
+            if points <= args.max_tuple_rows // 10:
+                # What pGraph-style lists of (datetime, float) cost when pickled between processes
+                rows = list(zip((_EPOCH + datetime.timedelta(milliseconds=int(ms - t[0])) for ms in t), v.tolist()))
+                encodings.append(("pickled rows", lambda: pickle.dumps(rows, pickle.HIGHEST_PROTOCOL), pickle.loads))
+
+            for name, encode, decode in encodings:
+                encode_ms, _, data = timed(encode)
+                median, best, _ = timed(lambda: decode(data))
+                results.append({"suite": "codec", "name": name, "series": kind, "points": points,
+                                "bytes_per_point": len(data) / points, "ratio": len(plain) / len(data),
+                                "encode_ms": encode_ms, "median_ms": median, "min_ms": best,
+                                "points_per_sec": points / (best / 1000.0)})
+    return results
+
+
+SUITES = {
+    "ingest": bench_ingest,
+    "fetch": bench_fetch,
+    "transform": bench_transform,
+    "render": bench_render,
+    "startup": bench_startup,
+    "codec": bench_codec,
+}
+
+
+# Output
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def result_key(result):
+    return tuple(sorted((k, v) for k, v in result.items()
+                        if k not in ("rows_per_sec", "median_ms", "min_ms", "mean_ms", "p95_ms",
+                                      "first_frame_ms", "first_data_ms", "bytes_per_point", "ratio",
+                                      "encode_ms", "points_per_sec")))
+
+
+def compare(results, baseline_path):
+    """Prints the change of each timing against a previous run's JSON file."""
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    for result in results:
+        before = baseline.get(result_key(result))
+        if before is None or "skipped" in result:
+            continue
+        label = ", ".join(f"{k}={v}" for k, v in result_key(result) if k not in ("suite", "name"))
+        for metric in ("median_ms", "mean_ms", "rows_per_sec"):
+            if metric in result and before.get(metric):
+                change = 100.0 * (result[metric] / before[metric] - 1)
+                print(f"{result['suite']:9s} {result['name']:28s} {label:30s} {metric:12s} "
+                      f"{before[metric]:12.2f} -> {result[metric]:12.2f} ({change:+.0f}%)", file=sys.stderr)
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, query, transform, render and encoding paths without a server.")
+    parser.add_argument("suites", nargs="*", help=f"any of {', '.join(DEFAULT_SUITES)} (default: all)")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--quick", action="store_true", help="small sizes only, for a smoke test")
+    args = parser.parse_args()
+    for suite in args.suites:
+        if suite not in SUITES:
+            parser.error(f"unknown suite {suite!r}")
+    args.suites = args.suites or DEFAULT_SUITES
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # render without a display
+    install_stand_in(create_database())  # the viewer modules import mariadb at load time
+
+    args.ingest_rows = 20000 if args.quick else 200000
+    args.table_sizes = TABLE_SIZES[:1] if args.quick else TABLE_SIZES
+    args.node_counts = NODE_COUNTS[:2] if args.quick else NODE_COUNTS
+    args.transform_rows = TRANSFORM_ROWS[:3] if args.quick else TRANSFORM_ROWS
+    args.max_tuple_rows = 1000000  # row tuples past this size need several GB; the columnar path covers 10M
+    args.frames = 10 if args.quick else RENDER_FRAMES
+    args.startup_runs = 1 if args.quick else STARTUP_RUNS
+    args.codec_points = CODEC_POINTS[:1] if args.quick else CODEC_POINTS
+
+    results = []
+    for suite in args.suites:
+        print(f"Running {suite}...", file=sys.stderr)
+        results.extend(SUITES[suite](args))
+
+    report = {
+        "meta": {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import sys
+import time
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from blit_renderer import BlitRenderer, date_axis
+
+# Same figure size and layout as pGraph.MainWindow (1800x900 window, two stacked figures)
+WIDTH_PX = 1800
+HEIGHT_PX = 450
+DPI = 100
+
+
+def make_figure(nodes):
+    fig = Figure(figsize=(WIDTH_PX / DPI, HEIGHT_PX / DPI), dpi=DPI)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    lines = [ax.plot([], [], label=f"node{i + 1}")[0] for i in range(nodes)]
+    ax.set_ylabel("Temperature")
+    ax.legend(loc='upper right')
+    date_axis(ax)
+    fig.subplots_adjust(left=0.05, right=0.95, bottom=0.1, top=0.9)
+    return canvas, ax, lines
+
+
+def make_frames(nodes, points, frames, period_ms=2000):
+    """Sliding windows of `points` readings per node, one new reading per frame."""
+    total = points + frames
+    times = (np.datetime64('2025-01-01T12:00:00', 'ms')
+             + np.arange(total) * np.timedelta64(period_ms, 'ms'))
+    values = 25 + np.cumsum(np.random.default_rng(0).normal(0, 0.05, (nodes, total)), axis=1)
+    return times, values
+
+
+def run(mode, nodes, points, frames):
+    canvas, ax, lines = make_figure(nodes)
+    times, values = make_frames(nodes, points, frames)
+    renderer = BlitRenderer(canvas, ax, lines) if mode == "blit" else None
+
+    frame_times = []
+    for f in range(frames):
+        start = time.perf_counter()
+        for i, line in enumerate(lines):
+            line.set_data(times[f:f + points], values[i, f:f + points])
+        if renderer is not None:
+            renderer.update()
+        else:
+            ax.relim()
+            ax.autoscale_view()
+            canvas.draw()
+        frame_times.append(time.perf_counter() - start)
+
+    frame_times = np.array(frame_times[1:]) * 1000.0  # first frame is a full draw either way
+    result = {
+        "mode": mode,
+        "nodes": nodes,
+        "points": points,
+        "mean_ms": float(frame_times.mean()),
+        "p95_ms": float(np.percentile(frame_times, 95)),
+    }
+    if renderer is not None:
+        result["full_draws"] = renderer.full_draws
+        result["blits"] = renderer.blits
+    return result
+
+
+def main(frames=200):
+    """Compares frame times of the full-redraw and blit paths at pGraph's figure size."""
+    for nodes, points in ((3, 10), (3, 300), (30, 300)):
+        full = run("full", nodes, points, frames)
+        blit = run("blit", nodes, points, frames)
+        print(f"{nodes:3d} nodes x {points:4d} points: full redraw {full['mean_ms']:7.2f} ms "
+              f"(p95 {full['p95_ms']:7.2f}), blit {blit['mean_ms']:7.2f} ms (p95 {blit['p95_ms']:7.2f}), "
+              f"{blit['full_draws']} background renders in {frames} frames, "
+              f"speedup {full['mean_ms'] / blit['mean_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
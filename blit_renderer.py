@@ -0,0 +1,113 @@
+import math
+import numpy as np
+import matplotlib.dates as mdates
+
+
+def nice_step(x):
+    """Smallest 1, 2 or 5 times a power of ten that is >= x."""
+    if x <= 0 or not math.isfinite(x):
+        return 1.0
+    base = 10 ** math.floor(math.log10(x))
+    for m in (1, 2, 5, 10):
+        if m * base >= x:
+            return m * base
+    return 10 * base
+
+
+def snapped_limits(lo, hi, headroom=0.25):
+    """Axis limits around [lo, hi], snapped outward to a step of about headroom * span.
+
+    The limits only move when the data crosses a step boundary, so between those
+    moments the cached background stays valid.
+    """
+    span = hi - lo
+    if span <= 0:
+        span = abs(hi) * 0.1 or 1.0
+    step = nice_step(span * headroom)
+    lower = math.floor(lo / step) * step
+    upper = math.ceil(hi / step) * step
+    if upper <= hi:
+        upper += step
+    if lower >= lo:
+        lower -= step
+    return lower, upper
+
+
+class BlitRenderer:
+    """Redraws only the line artists of one axes on top of a cached background.
+
+    The background (frame, ticks, labels, legend) is rendered by a full canvas.draw()
+    only when the snapped axis limits change or the canvas is redrawn for another
+    reason such as a resize; every other update restores the cached pixels, draws
+    the lines and blits the axes area.
+    """
+
+    def __init__(self, canvas, ax, lines, x_headroom=0.25, y_headroom=0.25):
+        self.canvas = canvas
+        self.ax = ax
+        self.lines = list(lines)
+        self.x_headroom = x_headroom
+        self.y_headroom = y_headroom
+        self.background = None
+        self.full_draws = 0
+        self.blits = 0
+        for line in self.lines:
+            line.set_animated(True)
+        self.cid = canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        # Any full draw (ours, resize, window expose) refreshes the cached background
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_lines()
+
+    def draw_lines(self):
+        for line in self.lines:
+            self.ax.draw_artist(line)
+
+    def data_limits(self):
+        xs = []
+        ys = []
+        for line in self.lines:
+            x = line.get_xdata()
+            if len(x) == 0:
+                continue
+            # Convert datetimes with the axis units so limits are plain floats
+            xs.append(np.asarray(self.ax.xaxis.convert_units(x), dtype=np.float64))
+            ys.append(np.asarray(line.get_ydata(), dtype=np.float64))
+        if not xs:
+            return None
+        x = np.concatenate(xs)
+        y = np.concatenate(ys)
+        y = y[np.isfinite(y)]
+        if len(y) == 0:
+            return None
+        return (snapped_limits(x.min(), x.max(), self.x_headroom),
+                snapped_limits(y.min(), y.max(), self.y_headroom))
+
+    def update(self):
+        """Renders the current line data, re-rendering the background only if needed."""
+        limits = self.data_limits()
+        if limits is not None:
+            xlim, ylim = limits
+            if xlim != tuple(self.ax.get_xlim()) or ylim != tuple(self.ax.get_ylim()):
+                self.ax.set_xlim(xlim)
+                self.ax.set_ylim(ylim)
+                self.background = None
+
+        if self.background is None:
+            self.full_draws += 1
+            self.canvas.draw()  # on_draw captures the new background and draws the lines
+            return
+
+        self.blits += 1
+        self.canvas.restore_region(self.background)
+        self.draw_lines()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+
+def date_axis(ax, maxticks=8):
+    """Bounded tick count on a date axis, whatever the visible span."""
+    locator = mdates.AutoDateLocator(minticks=3, maxticks=maxticks)
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
@@ -0,0 +1,210 @@
+import time
+
+STARTED = time.perf_counter()  # taken before the heavy imports; --startup reports against it
+
+import sys
+import json
+import argparse
+import colorsys
+import importlib
+from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout
+from PySide6.QtCore import QEvent, QObject, QTimer
+from series_store import SeriesStore
+from fetch_worker import BackgroundFetcher, StreamSubscriber
+from live_source import LiveSource
+from alarms import AlarmEngine
+from metrics_overlay import MetricsOverlay
+import metrics
+
+# Renderer backends and the module implementing each; only the selected one is imported
+BACKENDS = {
+    "qtcharts": "render_qtcharts",
+    "pyqtgraph": "render_pyqtgraph",
+    "matplotlib": "render_matplotlib",
+}
+DEFAULT_BACKEND = "qtcharts"
+
+# One panel per metric: (table, value column, title, y label)
+PANELS = [
+    ("temperature", "temperature", "Temperature Sensors", "Temperature (°C)"),
+    ("humidity", "humidity", "Humidity Sensors", "Humidity (%)"),
+]
+
+NODES = None  # None shows every node in the tables, e.g. ['Airflow', 'Cooler_Ambient', 'Cooler_Discharge']
+DISPLAY_POINTS = 300  # readings shown per node (10 minutes at 2 s)
+HISTORY_CAPACITY = 7200  # readings kept in memory per node (4 hours at 2 s)
+REFRESH_MS = 2000
+AGGREGATOR_ADDRESS = None  # e.g. "localhost:7070" to read from aggregator.py instead of MariaDB
+STREAM = False  # with an aggregator, draw each pushed batch as it arrives instead of polling
+ALARMS = True  # evaluate the alarm rules in alarms.py and thicken alarmed lines
+METRICS_PORT = None  # e.g. 9103 to serve per-tick timings at http://127.0.0.1:9103/metrics
+DEBUG_OVERLAY = False  # show the timing overlay at startup (F12 toggles it)
+
+
+def node_color(index):
+    """(r, g, b) of the index-th series; golden-ratio hue steps stay distinct for any node count."""
+    r, g, b = colorsys.hsv_to_rgb((index * 0.618033988749895) % 1.0, 0.85, 0.95)
+    return round(255 * r), round(255 * g), round(255 * b)
+
+
+def load_backend(name):
+    """Imports the renderer module of one backend, and with it that backend's plotting stack."""
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}; choose from {', '.join(BACKENDS)}")
+    return importlib.import_module(BACKENDS[name])
+
+
+class StartupProbe(QObject):
+    """Records when a widget first paints, and first paints with data, relative to STARTED."""
+
+    def __init__(self, widget, done=None):
+        super().__init__(widget)
+        self.first_frame = None
+        self.first_data = None
+        self.has_data = False
+        self.done = done
+        # Graphics views (QtCharts, pyqtgraph) paint in their viewport
+        target = widget.viewport() if hasattr(widget, "viewport") else widget
+        target.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            elapsed = 1000.0 * (time.perf_counter() - STARTED)
+            if self.first_frame is None:
+                self.first_frame = elapsed
+            if self.has_data and self.first_data is None:
+                self.first_data = elapsed
+                if self.done is not None:
+                    QTimer.singleShot(0, self.done)  # after this paint has finished
+        return False
+
+
+class Dashboard(QWidget):
+    """Live view of every metric panel, drawn by the selected renderer backend.
+
+    The data side (incremental fetch on a worker thread, per-node ring buffers,
+    alarm evaluation) is shared; a backend only turns {node: (times, values)}
+    windows into pixels.
+    """
+
+    def __init__(self, backend=DEFAULT_BACKEND, nodes=NODES, title="Sensor Dashboard"):
+        super().__init__()
+        self.title = title
+        self.setWindowTitle(title)
+        renderer = load_backend(backend).Renderer
+
+        self.store = SeriesStore(HISTORY_CAPACITY)
+        self.alarms = AlarmEngine() if ALARMS else None
+        # From MariaDB (pooled, a replica when there is one) or the shared aggregator
+        self.source = LiveSource({metric: nodes for metric, _, _, _ in PANELS}, backfill=DISPLAY_POINTS,
+                                 aggregator_address=AGGREGATOR_ADDRESS)
+
+        layout = QVBoxLayout()
+        self.panels = []
+        for metric, _, panel_title, ylabel in PANELS:
+            panel = renderer(panel_title, ylabel, node_color)
+            layout.addWidget(panel.widget)
+            self.panels.append((metric, panel))
+        self.setLayout(layout)
+        self.overlay = MetricsOverlay(self, visible=DEBUG_OVERLAY)
+        self.probe = None
+
+        # Queries run on a worker thread; this thread only renders
+        if STREAM and self.source.aggregator is not None:
+            self.fetcher = None
+            self.subscriber = StreamSubscriber(self.source.receive)
+            self.subscriber.received.connect(self.on_data)
+            self.subscriber.failed.connect(self.on_fetch_error)
+        else:
+            self.subscriber = None
+            self.fetcher = BackgroundFetcher(self.source.fetch)
+            self.fetcher.finished.connect(self.on_data)
+            self.fetcher.failed.connect(self.on_fetch_error)
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.tick)
+            self.timer.start(REFRESH_MS)
+            self.fetcher.submit()
+
+        self.resize(1800, 900)
+
+    def probe_startup(self, done=None):
+        """Watches the last panel for the first frame and the first frame with data."""
+        self.probe = StartupProbe(self.panels[-1][1].widget, done)
+        return self.probe
+
+    def tick(self):
+        if not self.fetcher.submit():
+            metrics.count("ticks_coalesced")  # the previous fetch is still queued or backing off
+
+    def on_data(self, data):
+        for metric, delta in data.items():
+            for node, rows in delta.items():
+                self.store.extend_rows(metric, node, rows)
+            if self.alarms is not None:
+                self.alarms.feed_delta(metric, delta)
+
+        title = self.title
+        if self.alarms is not None:
+            self.alarms.check_stale()
+            alarmed = sorted(set().union(*(self.alarms.alarmed(metric) for metric, _ in self.panels)))
+            if alarmed:
+                title += f" - ALARM: {', '.join(alarmed)}"
+        self.setWindowTitle(title)
+        self.update_plots()
+
+    def on_fetch_error(self, message):
+        self.setWindowTitle(f"{self.title} - database unavailable, retrying ({message})")
+
+    def update_plots(self):
+        with metrics.timer("update_plots"):
+            for metric, panel in self.panels:
+                series = {node: self.store.window(metric, node, DISPLAY_POINTS) for node in self.store.nodes(metric)}
+                alarmed = self.alarms.alarmed(metric) if self.alarms is not None else set()
+                panel.draw(series, alarmed)
+                if series and self.probe is not None:
+                    self.probe.has_data = True
+
+    def closeEvent(self, event):
+        if self.fetcher is not None:
+            self.fetcher.stop()
+        if self.subscriber is not None:
+            self.subscriber.stop()
+        super().closeEvent(event)
+
+
+def main(argv=None):
+    global AGGREGATOR_ADDRESS, STREAM, ALARMS, DEBUG_OVERLAY
+    parser = argparse.ArgumentParser(description="Live sensor dashboard.")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND, help="renderer to use")
+    parser.add_argument("--node", action="append", help="repeatable; default: every node")
+    parser.add_argument("--aggregator", help="poll this aggregator.py address instead of MariaDB")
+    parser.add_argument("--subscribe", help="draw readings pushed by this aggregator.py address")
+    parser.add_argument("--no-alarms", action="store_true", help="don't evaluate the alarm rules")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="serve Prometheus metrics on this port")
+    parser.add_argument("--debug", action="store_true", help="show the timing overlay")
+    parser.add_argument("--startup", action="store_true",
+                        help="print the time to the first frame and the first frame with data as JSON, then exit")
+    args = parser.parse_args(argv)
+
+    AGGREGATOR_ADDRESS = args.subscribe or args.aggregator or AGGREGATOR_ADDRESS
+    STREAM = STREAM or bool(args.subscribe)
+    ALARMS = ALARMS and not args.no_alarms
+    DEBUG_OVERLAY = DEBUG_OVERLAY or args.debug
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = Dashboard(args.backend, args.node)
+    if args.startup:
+        def report():
+            print(json.dumps({"backend": args.backend, "first_frame_ms": window.probe.first_frame,
+                              "first_data_ms": window.probe.first_data}), flush=True)
+            window.close()
+            app.quit()
+        window.probe_startup(report)
+    window.show()
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+import os
+import sys
+import time
+import queue
+import threading
+from contextlib import contextmanager
+import mariadb
+
+# Database Configuration, shared by every component. The environment overrides it:
+#   TH_DB_USER, TH_DB_PASSWORD, TH_DB_NAME
+#   TH_DB_PRIMARY=host[:port]                  where writes go (default: DB_CONFIG's host)
+#   TH_DB_REPLICAS=host[:port],host[:port]...  where viewer and export reads go (default: the primary)
+DB_CONFIG = {
+    "user": "username",             # Replace with your own username and password
+    "password": "password",
+    "host": "localhost",
+    "database": "sensor_databases"
+}
+REPLICAS = []  # e.g. ["replica1", "replica2:3307"]
+
+POOL_SIZE = 4  # connections kept per server
+CONNECT_TIMEOUT = 2  # seconds; a dead server fails fast instead of stalling a tick
+ACQUIRE_TIMEOUT = 10  # seconds to wait for a free pooled connection
+HEALTH_CHECK_AFTER = 5.0  # seconds idle before a pooled connection is pinged on checkout
+REPLICA_RETRY = 30.0  # seconds a failed replica is skipped before it is tried again
+
+
+class PoolTimeout(mariadb.Error):
+    pass
+
+
+class ReplicaLost(mariadb.Error):
+    """A replica stopped answering during a read; it is skipped until REPLICA_RETRY has passed."""
+
+
+def server_config(address, base=None):
+    """DB_CONFIG (or base) pointed at "host" or "host:port"."""
+    config = dict(base if base is not None else DB_CONFIG)
+    host, _, port = address.partition(":")
+    config["host"] = host
+    if port:
+        config["port"] = int(port)
+    return config
+
+
+def environment_config():
+    """(primary config, [replica configs]) from DB_CONFIG, REPLICAS and the TH_DB_* variables."""
+    base = dict(DB_CONFIG)
+    for key, variable in (("user", "TH_DB_USER"), ("password", "TH_DB_PASSWORD"), ("database", "TH_DB_NAME")):
+        if os.environ.get(variable):
+            base[key] = os.environ[variable]
+    primary = server_config(os.environ.get("TH_DB_PRIMARY") or base["host"], base)
+    replicas = os.environ["TH_DB_REPLICAS"].split(",") if os.environ.get("TH_DB_REPLICAS") else REPLICAS
+    return primary, [server_config(address.strip(), base) for address in replicas if address.strip()]
+
+
+def describe(config):
+    return f"{config['host']}:{config.get('port', 3306)}"
+
+
+def alive(conn):
+    try:
+        conn.ping()
+        return True
+    except mariadb.Error:
+        return False
+
+
+class Pool:
+    """Bounded pool of connections to one server.
+
+    Connections are opened on demand up to `size` and reused most-recently-used
+    first. One idle for longer than HEALTH_CHECK_AFTER is pinged before it is handed
+    out and replaced if the server dropped it, so callers only see a dead
+    connection when the server itself is down.
+    """
+
+    def __init__(self, config, size=POOL_SIZE):
+        self.config = config
+        self.name = describe(config)
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.opened = 0
+
+    def open(self):
+        return mariadb.connect(connect_timeout=CONNECT_TIMEOUT, **self.config)
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        while True:
+            try:
+                conn, last_used = self.idle.get_nowait()
+            except queue.Empty:
+                with self.lock:
+                    can_open = self.opened < self.size
+                    if can_open:
+                        self.opened += 1
+                if can_open:
+                    try:
+                        return self.open()
+                    except mariadb.Error:
+                        with self.lock:
+                            self.opened -= 1
+                        raise
+                try:
+                    conn, last_used = self.idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise PoolTimeout(f"no free connection to {self.name} after {timeout} s") from None
+
+            if time.monotonic() - last_used < HEALTH_CHECK_AFTER:
+                return conn
+            try:
+                conn.ping()
+                return conn
+            except mariadb.Error:
+                self.discard(conn)  # dropped while idle; open a fresh one
+
+    def release(self, conn):
+        self.idle.put((conn, time.monotonic()))
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except mariadb.Error:
+            pass
+        with self.lock:
+            self.opened -= 1
+
+    def connection(self):
+        """A pooled connection for the duration of a `with` block."""
+        return self.using(self.acquire())
+
+    @contextmanager
+    def using(self, conn):
+        """Gives an acquired connection back to the pool when the block ends.
+
+        After an error the connection is rolled back and pinged: it goes back to
+        the pool if the server still answers, otherwise it is closed.
+        """
+        try:
+            yield conn
+        except mariadb.Error:
+            try:
+                conn.rollback()
+                conn.ping()
+            except mariadb.Error:
+                self.discard(conn)
+            else:
+                self.release(conn)
+            raise  # the error from the block, not the one from the rollback
+        except BaseException:
+            self.discard(conn)
+            raise
+        self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(conn)
+
+
+class Router:
+    """Writes go to the primary; reads go round-robin to the replicas, falling back to the primary.
+
+    A replica that refuses connections is skipped for REPLICA_RETRY seconds, then
+    tried again. Without replicas every read uses the primary's pool.
+    """
+
+    def __init__(self, primary, replicas=(), pool_size=POOL_SIZE):
+        self.primary = Pool(primary, pool_size)
+        self.replicas = [Pool(config, pool_size) for config in replicas]
+        self.failed = {}  # replica pool -> time.monotonic() of its last failure
+        self.turn = 0
+        self.lock = threading.Lock()
+
+    def read_pools(self):
+        """Replicas to try for the next read, in order, then the primary."""
+        with self.lock:
+            now = time.monotonic()
+            healthy = [pool for pool in self.replicas if now - self.failed.get(pool, -REPLICA_RETRY) >= REPLICA_RETRY]
+            if healthy:
+                self.turn = (self.turn + 1) % len(healthy)
+                healthy = healthy[self.turn:] + healthy[:self.turn]
+        return healthy + [self.primary]
+
+    def mark_failed(self, pool, error):
+        with self.lock:
+            if pool not in self.failed or time.monotonic() - self.failed[pool] >= REPLICA_RETRY:
+                print(f"Replica {pool.name} unavailable ({error}); reading elsewhere for {REPLICA_RETRY:.0f} s",
+                      file=sys.stderr)
+            self.failed[pool] = time.monotonic()
+
+    def acquire_reader(self):
+        """(pool, connection) of the first server that accepts a connection."""
+        pools = self.read_pools()
+        for pool in pools[:-1]:
+            try:
+                return pool, pool.acquire()
+            except PoolTimeout:
+                continue  # busy, not down
+            except mariadb.Error as e:
+                self.mark_failed(pool, e)
+        return self.primary, self.primary.acquire()
+
+    @contextmanager
+    def reader(self):
+        """A pooled read connection for a `with` block.
+
+        A pooled connection to a replica that died since its last use fails on its
+        first query rather than on checkout. When that happens the replica is marked
+        failed and its idle connections are closed, so the next read goes elsewhere,
+        and ReplicaLost is raised; read() retries on the next server.
+        """
+        pool, conn = self.acquire_reader()
+        with pool.using(conn) as conn:
+            try:
+                yield conn
+            except mariadb.Error as e:
+                if pool is self.primary or alive(conn):
+                    raise  # a query error, not a lost server
+                self.mark_failed(pool, e)
+                pool.close()
+                raise ReplicaLost(f"replica {pool.name} lost during a read: {e}") from e
+
+    def read(self, fn):
+        """Returns fn(conn) run on a pooled read connection, retried once on the next server if the replica dies.
+
+        fn must be safe to run twice.
+        """
+        try:
+            with self.reader() as conn:
+                return fn(conn)
+        except ReplicaLost:
+            with self.reader() as conn:
+                return fn(conn)
+
+    @contextmanager
+    def writer(self):
+        with self.primary.connection() as conn:
+            yield conn
+
+    def open_reader(self):
+        """A dedicated (unpooled) connection for long reads such as exports and history chunks."""
+        for pool in self.read_pools()[:-1]:
+            try:
+                return pool.open()
+            except mariadb.Error as e:
+                self.mark_failed(pool, e)
+        return self.primary.open()
+
+    def open_writer(self):
+        """A dedicated connection to the primary for long-lived writers (ingestion, rollups, migrations)."""
+        return self.primary.open()
+
+    def close(self):
+        for pool in [self.primary] + self.replicas:
+            pool.close()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def router():
+    """The process-wide router, built from the configuration on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            primary, replicas = environment_config()
+            _router = Router(primary, replicas)
+        return _router
+
+
+def reset():
+    """Closes the pooled connections; the next call builds a new router from the current configuration."""
+    global _router
+    with _router_lock:
+        if _router is not None:
+            _router.close()
+        _router = None
+
+
+def reading():
+    """Pooled read connection: a replica if one is up, else the primary. Use as `with db.reading() as conn:`."""
+    return router().reader()
+
+
+def read(fn):
+    """fn(conn) on a pooled read connection, failing over once if a replica dies mid-read. See Router.read()."""
+    return router().read(fn)
+
+
+def writing():
+    """Pooled connection to the primary. Use as `with db.writing() as conn:`."""
+    return router().writer()
+
+
+def connect_reader():
+    return router().open_reader()
+
+
+def connect_writer():
+    return router().open_writer()
+
+
+def check():
+    """Connects to every configured server and prints its role and state; returns False if the primary is down."""
+    primary, replicas = environment_config()
+    ok = True
+    for role, config in [("primary", primary)] + [("replica", config) for config in replicas]:
+        start = time.perf_counter()
+        try:
+            conn = mariadb.connect(connect_timeout=CONNECT_TIMEOUT, **config)
+        except mariadb.Error as e:
+            print(f"{role:8s} {describe(config):24s} DOWN: {e}")
+            ok = ok and role != "primary"
+            continue
+        try:
+            connect_ms = 1000 * (time.perf_counter() - start)
+            cursor = conn.cursor()
+            cursor.execute("SELECT @@hostname, @@read_only")
+            hostname, read_only = cursor.fetchone()
+            cursor.close()
+            print(f"{role:8s} {describe(config):24s} up ({hostname}, read_only={read_only}), "
+                  f"connect {connect_ms:.1f} ms")
+        finally:
+            conn.close()
+    return ok
+
+
+if __name__ == "__main__":
+    # python db.py: health of the primary and the replicas, e.g.
+    #   TH_DB_PRIMARY=127.0.0.1:3306 TH_DB_REPLICAS=127.0.0.1:3307 python db.py
+    sys.exit(0 if check() else 1)
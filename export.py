@@ -0,0 +1,148 @@
+import sys
+import csv
+import time
+import datetime
+import argparse
+import db
+import archive
+from schema import TABLES
+
+FETCH_ROWS = 10000  # rows per fetchmany(); also the size of each Parquet row group
+PROGRESS_INTERVAL = 5.0  # seconds between progress lines on stderr
+
+
+class CsvOutput:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="") if path != "-" else sys.stdout
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["metric", "node", "dTime", "value"])
+
+    def write(self, metric, node, rows):
+        self.writer.writerows((metric, node, dTime.isoformat(sep=" "), value) for dTime, value in rows)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetOutput:
+    """Writes each batch as its own row group, so nothing accumulates in memory."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([("metric", pa.string()), ("node", pa.string()),
+                                 ("dTime", pa.timestamp("ms")), ("value", pa.float32())])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, metric, node, rows):
+        pa = self.pa
+        self.writer.write_batch(pa.record_batch([
+            pa.array([metric] * len(rows), pa.string()),
+            pa.array([node] * len(rows), pa.string()),
+            pa.array([dTime for dTime, _ in rows], pa.timestamp("ms")),
+            pa.array([value for _, value in rows], pa.float32()),
+        ], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def stream_node(conn, table, column, node, start, end, batch_rows=FETCH_ROWS):
+    """Yields lists of (dTime, value) for one node, oldest first, batch_rows at a time.
+
+    The cursor is unbuffered, so the server streams the range and only one batch is
+    held in memory. The (node, dTime) primary key serves the ORDER BY without a sort.
+    """
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(f"SELECT dTime, {column} FROM {table} "
+                       f"WHERE node = ? AND dTime >= ? AND dTime < ? ORDER BY dTime", (node, start, end))
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def stream_archived(table, node, start, end, batch_rows=FETCH_ROWS):
+    """Same as stream_node() for the days archive.py moved out of the database."""
+    t0, t1 = start.timestamp(), end.timestamp()
+    day = start.date()
+    while day <= end.date():
+        day_start = datetime.datetime.combine(day, datetime.time())
+        lo = max(t0, day_start.timestamp())
+        hi = min(t1, (day_start + datetime.timedelta(days=1)).timestamp())
+        t, v = archive.read_range(table, node, lo, hi)
+        for i in range(0, len(t), batch_rows):
+            yield [(datetime.datetime.fromtimestamp(ts), float(value))
+                   for ts, value in zip(t[i:i + batch_rows].tolist(), v[i:i + batch_rows].tolist())]
+        day += datetime.timedelta(days=1)
+
+
+def list_nodes(conn, table):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT DISTINCT node FROM {table}")
+        return sorted(row[0] for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def export(conn, output, metrics, nodes, start, end, include_archive=False):
+    """Streams every (metric, node) range into output. Returns the rows written."""
+    written = 0
+    started = time.perf_counter()
+    last_progress = started
+    for metric in metrics:
+        table, column = metric, TABLES[metric]
+        metric_nodes = nodes if nodes else list_nodes(conn, table)
+        if include_archive and not nodes:
+            metric_nodes = sorted(set(metric_nodes) | set(archive.archived_nodes(table)))
+        for node in metric_nodes:
+            sources = [stream_node(conn, table, column, node, start, end)]
+            if include_archive:
+                sources.insert(0, stream_archived(table, node, start, end))  # archived days are older
+            for source in sources:
+                for rows in source:
+                    output.write(metric, node, rows)
+                    written += len(rows)
+                    if time.perf_counter() - last_progress >= PROGRESS_INTERVAL:
+                        last_progress = time.perf_counter()
+                        print(f"{written} rows, {written / (last_progress - started):.0f} rows/sec "
+                              f"({metric} {node})", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    print(f"Exported {written} rows in {elapsed:.1f} s ({written / elapsed if elapsed > 0 else 0:.0f} rows/sec)",
+          file=sys.stderr)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a time range of sensor readings to CSV or Parquet.")
+    parser.add_argument("start", type=datetime.datetime.fromisoformat, help="start time, e.g. 2024-01-01")
+    parser.add_argument("end", type=datetime.datetime.fromisoformat, help="end time (exclusive)")
+    parser.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (CSV only)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="default: from the output file extension")
+    parser.add_argument("--metric", action="append", choices=list(TABLES), help="repeatable; default: all")
+    parser.add_argument("--node", action="append", help="repeatable; default: every node")
+    parser.add_argument("--archive", action="store_true", help="include days moved out by archive.py")
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    if fmt == "parquet" and args.output == "-":
+        parser.error("Parquet output needs a file name")
+    output = ParquetOutput(args.output) if fmt == "parquet" else CsvOutput(args.output)
+    conn = db.connect_reader()
+    try:
+        export(conn, output, args.metric or list(TABLES), args.node, args.start, args.end, args.archive)
+    except KeyboardInterrupt:
+        print("Export stopped by user.", file=sys.stderr)
+    finally:
+        output.close()
+        conn.close()
@@ -0,0 +1,120 @@
+import threading
+from PySide6.QtCore import QObject, QThread, QTimer, Signal, Slot
+
+
+class _Worker(QObject):
+    """Runs the fetch function inside the worker thread."""
+
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, fetch, retry_delay, max_retry_delay):
+        super().__init__()
+        self.fetch = fetch
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.delay = retry_delay
+        self.pending = threading.Event()  # set while a request is queued and not yet started
+        self.retry_timer = None
+
+    @Slot()
+    def run(self):
+        if self.retry_timer is not None and self.retry_timer.isActive():
+            return  # backing off; the retry will serve this request
+        self.pending.clear()
+        try:
+            result = self.fetch()
+        except Exception as e:
+            self.failed.emit(f"{type(e).__name__}: {e}")
+            self.schedule_retry()
+            return
+        self.delay = self.retry_delay
+        self.finished.emit(result)
+
+    def schedule_retry(self):
+        if self.retry_timer is None:
+            self.retry_timer = QTimer(self)
+            self.retry_timer.setSingleShot(True)
+            self.retry_timer.timeout.connect(self.run)
+        self.pending.set()
+        self.retry_timer.start(int(self.delay * 1000))
+        self.delay = min(self.delay * 2, self.max_retry_delay)
+
+
+class BackgroundFetcher(QObject):
+    """Runs a blocking fetch function on a QThread and delivers results via signals.
+
+    Call submit() from the GUI thread (e.g. from a timer). While a request is queued
+    or the worker is backing off after a failure, further submits are coalesced into
+    it. Failures are retried with exponential backoff. Results arrive on `finished`
+    and errors on `failed`, both in the GUI thread.
+    """
+
+    finished = Signal(object)
+    failed = Signal(str)
+    _request = Signal()
+
+    def __init__(self, fetch, retry_delay=1.0, max_retry_delay=60.0, parent=None):
+        super().__init__(parent)
+        self.thread = QThread()
+        self.worker = _Worker(fetch, retry_delay, max_retry_delay)
+        self.worker.moveToThread(self.thread)
+        self._request.connect(self.worker.run)
+        self.worker.finished.connect(self.finished)
+        self.worker.failed.connect(self.failed)
+        self.thread.start()
+
+    def submit(self):
+        """Asks for a fetch; returns False if it was coalesced into one already queued."""
+        if self.worker.pending.is_set():
+            return False
+        self.worker.pending.set()
+        self._request.emit()
+        return True
+
+    def stop(self):
+        self.thread.quit()
+        self.thread.wait()
+
+
+class StreamSubscriber(QObject):
+    """Waits for pushed data on a QThread and emits each batch the moment it arrives.
+
+    `receive(timeout)` blocks for at most `timeout` seconds and returns a batch, or
+    None when nothing arrived. Errors are reported on `failed` and retried with
+    exponential backoff.
+    """
+
+    received = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, receive, retry_delay=1.0, max_retry_delay=30.0, parent=None):
+        super().__init__(parent)
+        self.receive = receive
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.thread = QThread()
+        self.thread.run = self.run
+        self.thread.start()
+
+    def run(self):
+        delay = self.retry_delay
+        while not self.thread.isInterruptionRequested():
+            try:
+                batch = self.receive(0.5)
+            except Exception as e:
+                self.failed.emit(f"{type(e).__name__}: {e}")
+                # Sleep in short steps so stop() is not held up by the backoff
+                for _ in range(int(delay * 10)):
+                    if self.thread.isInterruptionRequested():
+                        return
+                    QThread.msleep(100)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            delay = self.retry_delay
+            if batch is not None:
+                self.received.emit(batch)
+
+    def stop(self):
+        self.thread.requestInterruption()
+        self.thread.wait()
@@ -0,0 +1,361 @@
+import math
+import time
+import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import mariadb
+from PySide6.QtCore import QObject, QTimer, Signal
+from rollup import choose_rollup, rollup_table, get_watermark
+from schema import table_exists
+import archive
+import metrics
+
+BASE_BUCKET = 2  # seconds between raw readings
+CHUNK_BUCKETS = 512  # buckets per chunk, at every level
+MAX_LEVEL = 16  # coarsest bucket: 2 s * 2**16, about 1.5 days
+CACHE_BYTES = 64 * 1024 * 1024  # memory bound of the chunk cache
+USE_ROLLUPS = True  # read coarse levels from the rollup tables maintained by rollup.py
+USE_ARCHIVE = True  # also read raw rows moved out of MariaDB by archive.py
+LIVE_CHUNK_TTL = 10  # seconds before a chunk that reaches past now is reloaded with the newer readings
+DISCOVER_RETRY_MS = 5000  # delay before retrying a failed node discovery
+
+
+def bucket_seconds(level):
+    return BASE_BUCKET * 2 ** level
+
+
+def chunk_seconds(level):
+    return bucket_seconds(level) * CHUNK_BUCKETS
+
+
+def choose_level(span, pixels):
+    """Coarsest level whose bucket is still no wider than one pixel of the view."""
+    per_pixel = span / max(pixels, 1)
+    if per_pixel < 2 * BASE_BUCKET:
+        return 0
+    return min(MAX_LEVEL, int(math.floor(math.log2(per_pixel / BASE_BUCKET))))
+
+
+def chunk_indices(level, t0, t1):
+    """Indices of the time-aligned chunks covering [t0, t1] (Unix seconds)."""
+    width = chunk_seconds(level)
+    return list(range(int(math.floor(t0 / width)), int(math.floor(t1 / width)) + 1))
+
+
+def decimate_minmax(t, vmin, vmax, t0, t1, pixels):
+    """Reduces to at most one min and one max point per pixel column of [t0, t1]."""
+    if len(t) == 0:
+        return t, vmin
+    if len(t) <= pixels:
+        if vmin is vmax:
+            return t, vmin
+        return np.repeat(t, 2), np.column_stack((vmin, vmax)).ravel()
+
+    column = np.floor((t - t0) * (pixels / (t1 - t0))).astype(np.int64)
+    np.clip(column, -1, pixels, out=column)  # keep one column either side for continuity
+    starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    mins = np.minimum.reduceat(vmin, starts)
+    maxs = np.maximum.reduceat(vmax, starts)
+    return np.repeat(t[starts], 2), np.column_stack((mins, maxs)).ravel()
+
+
+def bucket_minmax(t, v, bucket):
+    """Aggregates sorted raw readings to (bucket start, min, max) per bucket of `bucket` seconds."""
+    if len(t) == 0:
+        return t, v, v
+    b = np.floor(t / bucket)
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    return b[starts] * bucket, np.minimum.reduceat(v, starts), np.maximum.reduceat(v, starts)
+
+
+def merge_archived(table, node, start, end, t, vmin, vmax, bucket=None):
+    """Adds the archived readings of [start, end) to a chunk loaded from the database."""
+    at, av = archive.read_range(table, node, start, end)
+    if len(at) == 0:
+        return t, vmin, vmax
+    if bucket is None:
+        at, amin, amax = at, av, av
+    else:
+        at, amin, amax = bucket_minmax(at, av, bucket)
+    # Archived days are deleted from MariaDB, so the two sources never overlap
+    order = np.argsort(np.concatenate((at, t)), kind="stable")
+    t = np.concatenate((at, t))[order]
+    merged_min = np.concatenate((amin, vmin))[order]
+    merged_max = merged_min if (amin is amax and vmin is vmax) else np.concatenate((amax, vmax))[order]
+    return t, merged_min, merged_max
+
+
+def rollup_watermark(cursor, table):
+    """Unix time up to which rollup.py has folded `table` into its rollups; None if it never has."""
+    if not table_exists(cursor, "rollup_watermark"):
+        return None
+    watermark = get_watermark(cursor, table)
+    return watermark.timestamp() if watermark is not None else None
+
+
+def load_chunk(cursor, table, column, node, level, index):
+    """Loads one chunk as (times, minimums, maximums); times are Unix seconds.
+
+    Level 0 returns raw rows; coarser levels are aggregated by the server to one
+    row per bucket, so a chunk is never more than CHUNK_BUCKETS rows. Coarse levels
+    are aggregated from the coarsest rollup table that is still fine enough, up to
+    the rollup watermark, and from raw rows after it.
+    Raw rows that have been archived are read from the memory-mapped archive.
+    """
+    start = index * chunk_seconds(level)
+    end = start + chunk_seconds(level)
+    lo = datetime.datetime.fromtimestamp(start)
+    hi = datetime.datetime.fromtimestamp(end)
+    if level == 0:
+        cursor.execute(f"SELECT dTime, {column} FROM {table} "
+                       f"WHERE node = ? AND dTime >= ? AND dTime < ? ORDER BY dTime", (node, lo, hi))
+        rows = cursor.fetchall()
+        t = np.array([dTime.timestamp() for dTime, _ in rows], dtype=np.float64)
+        v = np.array([value for _, value in rows], dtype=np.float64)
+        if USE_ARCHIVE:
+            return merge_archived(table, node, start, end, t, v, v)
+        return t, v, v
+
+    bucket = bucket_seconds(level)
+    rollup = choose_rollup(bucket) if USE_ROLLUPS else None
+    # The rollup tables only exist once rollup.py has run, and trail the raw rows by up
+    # to SETTLE_SECONDS plus its interval: buckets past the watermark are read raw
+    split = start
+    if rollup is not None:
+        watermark = rollup_watermark(cursor, table)
+        if watermark is not None:
+            split = min(end, max(start, math.floor(watermark / bucket) * bucket))
+    rows = []
+    if split > start:
+        source = rollup_table(table, rollup[0])
+        cursor.execute(f"SELECT FLOOR(UNIX_TIMESTAMP(bucket) / ?) AS b, MIN(vmin), MAX(vmax) "
+                       f"FROM {source} WHERE node = ? AND bucket >= ? AND bucket < ? "
+                       f"GROUP BY b ORDER BY b", (bucket, node, lo, datetime.datetime.fromtimestamp(split)))
+        rows += cursor.fetchall()
+    if split < end:
+        cursor.execute(f"SELECT FLOOR(UNIX_TIMESTAMP(dTime) / ?) AS b, MIN({column}), MAX({column}) "
+                       f"FROM {table} WHERE node = ? AND dTime >= ? AND dTime < ? "
+                       f"GROUP BY b ORDER BY b", (bucket, node, datetime.datetime.fromtimestamp(split), hi))
+        rows += cursor.fetchall()
+    t = np.array([b for b, _, _ in rows], dtype=np.float64) * bucket
+    vmin = np.array([lo_ for _, lo_, _ in rows], dtype=np.float64)
+    vmax = np.array([hi_ for _, _, hi_ in rows], dtype=np.float64)
+    if USE_ARCHIVE and split < end:
+        # Rollups outlive the raw rows; past them archived days come from the files
+        return merge_archived(table, node, split, end, t, vmin, vmax, bucket)
+    return t, vmin, vmax
+
+
+class ChunkCache:
+    """LRU cache of loaded chunks, bounded by the bytes held in their arrays."""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.chunks = OrderedDict()
+        self.expires = {}  # monotonic expiry time of chunks that are still filling up
+        self.nbytes = 0
+
+    def __contains__(self, key):
+        """True for cached chunks that have not expired; expired ones are still returned by get()."""
+        if key not in self.chunks:
+            return False
+        expires = self.expires.get(key)
+        return expires is None or time.monotonic() < expires
+
+    def get(self, key):
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def put(self, key, chunk, expires=None):
+        if key in self.chunks:
+            self.nbytes -= self.chunk_bytes(self.chunks.pop(key))
+        self.chunks[key] = chunk
+        self.nbytes += self.chunk_bytes(chunk)
+        if expires is not None:
+            self.expires[key] = expires
+        else:
+            self.expires.pop(key, None)
+        while self.nbytes > self.max_bytes and len(self.chunks) > 1:
+            evicted_key, evicted = self.chunks.popitem(last=False)
+            self.expires.pop(evicted_key, None)
+            self.nbytes -= self.chunk_bytes(evicted)
+
+    @staticmethod
+    def chunk_bytes(chunk):
+        t, vmin, vmax = chunk
+        return t.nbytes + vmin.nbytes + (vmax.nbytes if vmax is not vmin else 0)
+
+
+class HistoryView(QObject):
+    """Level-of-detail history browsing for one pyqtgraph PlotWidget.
+
+    On every pan or zoom the view picks the level whose bucket fits a pixel, draws
+    the chunks already cached, loads the missing ones on worker threads and
+    prefetches the neighbouring chunks either side of the visible range. The chunk
+    holding "now" is reloaded every LIVE_CHUNK_TTL seconds. Load errors are counted
+    and reported on `failed`; failed chunks are retried on the next refresh.
+    """
+
+    chunk_loaded = Signal(object, object)
+    nodes_found = Signal(object)
+    discover_failed = Signal()
+    failed = Signal(str)
+
+    def __init__(self, plot, table, column, connect, nodes=None, label="", color=None,
+                 cache_bytes=CACHE_BYTES, workers=2):
+        super().__init__()
+        self.plot = plot
+        self.table = table
+        self.column = column
+        self.open_connection = connect
+        self.label = label
+        self.color = color
+        self.nodes = []
+        self.curves = {}
+        self.cache = ChunkCache(cache_bytes)
+        self.futures = {}
+        self.local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        # Data arrives decimated to the pixel grid, so pyqtgraph need not downsample again
+        plot.setDownsampling(auto=False)
+        plot.setClipToView(False)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(50)  # debounce pan/zoom and chunk arrivals
+        self.refresh_timer.timeout.connect(self.refresh)
+        plot.sigXRangeChanged.connect(lambda *args: self.refresh_timer.start())
+        self.chunk_loaded.connect(self.on_chunk)
+        self.nodes_found.connect(self.set_nodes)
+        self.discover_failed.connect(lambda: QTimer.singleShot(DISCOVER_RETRY_MS, self.discover))
+
+        # Reloads expired live chunks, and retries failed ones
+        self.live_timer = QTimer(self)
+        self.live_timer.setInterval(LIVE_CHUNK_TTL * 1000)
+        self.live_timer.timeout.connect(self.refresh)
+        self.live_timer.start()
+
+        if nodes is None:
+            self.discover()
+        else:
+            self.set_nodes(nodes)
+
+    def cursor(self):
+        # One connection per worker thread
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self.open_connection()
+        return conn.cursor()
+
+    def drop_connection(self):
+        """Closes this worker thread's connection after an error; the next cursor() reconnects."""
+        conn = getattr(self.local, "conn", None)
+        self.local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except mariadb.Error:
+                pass
+
+    def report(self, message):
+        metrics.count("history_load_errors")
+        self.failed.emit(message)
+
+    def discover(self):
+        self.executor.submit(self._discover)
+
+    def _discover(self):
+        try:
+            cursor = self.cursor()
+            try:
+                cursor.execute(f"SELECT DISTINCT node FROM {self.table}")
+                nodes = {row[0] for row in cursor.fetchall()}
+            finally:
+                cursor.close()
+            if USE_ARCHIVE:
+                nodes.update(archive.archived_nodes(self.table))
+        except Exception as e:
+            self.drop_connection()
+            self.report(f"Error listing {self.table} nodes: {e}")
+            self.discover_failed.emit()
+            return
+        self.nodes_found.emit(sorted(nodes))
+
+    def _load(self, key):
+        node, level, index = key
+        chunk = None
+        try:
+            cursor = self.cursor()
+            try:
+                chunk = load_chunk(cursor, self.table, self.column, node, level, index)
+            finally:
+                cursor.close()
+        except Exception as e:
+            self.drop_connection()
+            self.report(f"Error loading {self.table} chunk {key}: {e}")
+        self.chunk_loaded.emit(key, chunk)
+
+    def set_nodes(self, nodes):
+        for node in nodes:
+            if node not in self.curves:
+                pen = self.color(len(self.curves)) if self.color is not None else None
+                self.curves[node] = self.plot.plot([], [], pen=pen, name=f"{self.label} {node}".strip())
+        self.nodes = list(nodes)
+        self.refresh_timer.start()
+
+    def on_chunk(self, key, chunk):
+        self.futures.pop(key, None)
+        if chunk is not None:
+            _, level, index = key
+            # Readings keep arriving in the chunk that reaches past now, so it expires
+            live = (index + 1) * chunk_seconds(level) > time.time()
+            self.cache.put(key, chunk, expires=time.monotonic() + LIVE_CHUNK_TTL if live else None)
+            self.refresh_timer.start()
+
+    def request(self, key):
+        if key in self.cache or key in self.futures or key[2] < 0:
+            return
+        self.futures[key] = self.executor.submit(self._load, key)
+
+    def refresh(self):
+        (t0, t1), _ = self.plot.viewRange()
+        if t1 <= t0:
+            return
+        pixels = max(int(self.plot.getViewBox().width()), 1)
+        level = choose_level(t1 - t0, pixels)
+        indices = chunk_indices(level, t0, t1)
+
+        # Visible chunks first, then one neighbour either side as prefetch
+        wanted = [(node, level, i) for node in self.nodes for i in indices]
+        wanted += [(node, level, i) for node in self.nodes for i in (indices[0] - 1, indices[-1] + 1)]
+
+        # Drop queued loads that panned out of interest before they started
+        keep = set(wanted)
+        for key, future in list(self.futures.items()):
+            if key not in keep and future.cancel():
+                del self.futures[key]
+        for key in wanted:
+            self.request(key)
+
+        for node, curve in self.curves.items():
+            chunks = [self.cache.get((node, level, i)) for i in indices]
+            chunks = [c for c in chunks if c is not None]
+            if not chunks:
+                continue
+            t = np.concatenate([c[0] for c in chunks])
+            vmin = np.concatenate([c[1] for c in chunks])
+            vmax = vmin if all(c[1] is c[2] for c in chunks) else np.concatenate([c[2] for c in chunks])
+            x, y = decimate_minmax(t, vmin, vmax, t0, t1, pixels)
+            curve.setData(x, y)
+
+    def close(self):
+        self.live_timer.stop()
+        self.refresh_timer.stop()
+        for future in self.futures.values():
+            future.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,57 @@
+import db
+import metrics
+from incremental_fetch import WatermarkFetcher
+from schema import TABLES
+
+
+def fetch_new_data(fetchers):
+    """Rows newer than each fetcher's watermarks, {metric: {node: [(dTime, value), ...]}}, in one pooled read.
+
+    A failed attempt leaves every watermark where it was, so neither db.read()'s
+    retry nor the next tick skips the rows of the metrics fetched before the error.
+    """
+    def fetch(conn):
+        saved = {metric: dict(fetcher.watermarks) for metric, fetcher in fetchers.items()}
+        cursor = conn.cursor()
+        try:
+            return {metric: fetcher.fetch(cursor) for metric, fetcher in fetchers.items()}
+        except BaseException:
+            for metric, fetcher in fetchers.items():
+                fetcher.watermarks = saved[metric]
+            raise
+        finally:
+            cursor.close()
+    return db.read(fetch)
+
+
+class LiveSource:
+    """Where a live viewer's readings come from: MariaDB, polled by watermark, or aggregator.py.
+
+    subscriptions is {metric: [node, ...] or None for every node}. fetch() runs on a
+    BackgroundFetcher worker and receive() on a StreamSubscriber thread; both return
+    the readings since the previous call as {metric: {node: [(dTime, value), ...]}}.
+    """
+
+    def __init__(self, subscriptions, backfill=10, aggregator_address=None):
+        self.fetchers = {metric: WatermarkFetcher(metric, TABLES[metric], nodes, backfill=backfill)
+                         for metric, nodes in subscriptions.items()}
+        self.aggregator = None
+        if aggregator_address:
+            from aggregator import AggregatorClient
+            self.aggregator = AggregatorClient(aggregator_address, subscriptions, backfill=backfill)
+
+    def fetch(self):
+        with metrics.timer("fetch"):
+            if self.aggregator is not None:
+                data = self.aggregator.fetch()
+            else:
+                data = fetch_new_data(self.fetchers)
+        rows = sum(len(r) for delta in data.values() for r in delta.values())
+        metrics.count("rows_fetched", rows)
+        metrics.gauge("rows_per_tick", rows)
+        return data
+
+    def receive(self, timeout):
+        """None when nothing was pushed within the timeout."""
+        data = self.aggregator.fetch(timeout)
+        return data if any(data.values()) else None
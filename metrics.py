@@ -0,0 +1,133 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WINDOW = 1024  # most recent observations kept per timer for the percentiles
+QUANTILES = (0.5, 0.9, 0.99)
+PREFIX = "th_monitoring_"
+
+
+class Timer:
+    """Rolling window of durations plus lifetime count and sum."""
+
+    def __init__(self, window=WINDOW):
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.recent.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, qs=QUANTILES):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return {q: 0.0 for q in qs}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in qs}
+
+
+class Registry:
+    """Thread-safe timers, counters and gauges, cheap enough to update on every tick."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name, seconds):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Timer()
+            timer.observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        """{"timers": {name: (count, sum, {q: seconds})}, "counters": {...}, "gauges": {...}}"""
+        with self.lock:
+            return {
+                "timers": {name: (t.count, t.total, t.quantiles()) for name, t in self.timers.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+    def prometheus(self):
+        """The registry in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines = []
+        for name, (count, total, quantiles) in sorted(snap["timers"].items()):
+            metric = f"{PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for q, value in quantiles.items():
+                lines.append(f'{metric}{{quantile="{q}"}} {value:.6f}')
+            lines.append(f"{metric}_sum {total:.6f}")
+            lines.append(f"{metric}_count {count}")
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            lines.append(f"{PREFIX}{name}_total {value}")
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(f"{PREFIX}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self):
+        """Short human-readable lines for the on-screen overlay."""
+        snap = self.snapshot()
+        lines = []
+        for name, (count, _, quantiles) in sorted(snap["timers"].items()):
+            p50, p90, p99 = (1000.0 * quantiles[q] for q in QUANTILES)
+            lines.append(f"{name}: p50 {p50:.1f} / p90 {p90:.1f} / p99 {p99:.1f} ms ({count})")
+        lines.extend(f"{name}: {value}" for name, value in sorted(snap["counters"].items()))
+        lines.extend(f"{name}: {value:g}" for name, value in sorted(snap["gauges"].items()))
+        return lines
+
+
+# Process-wide registry used by the viewers and the ingester
+registry = Registry()
+observe = registry.observe
+timer = registry.timer
+count = registry.count
+gauge = registry.gauge
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the console
+
+
+def serve(port, host="127.0.0.1", registry=registry):
+    """Serves /metrics on a daemon thread; returns the server (call shutdown() to stop it)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
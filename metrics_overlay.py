@@ -0,0 +1,44 @@
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QKeySequence, QShortcut
+from PySide6.QtWidgets import QLabel
+import metrics
+
+REFRESH_MS = 500
+
+
+class MetricsOverlay(QLabel):
+    """Semi-transparent panel in the top-left corner of `parent` showing the metrics registry.
+
+    F12 toggles it. It only refreshes while visible.
+    """
+
+    def __init__(self, parent, registry=metrics.registry, visible=False):
+        super().__init__(parent)
+        self.registry = registry
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: #9f9; padding: 6px; "
+                           "font-family: monospace; font-size: 11px;")
+        self.setTextFormat(Qt.PlainText)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        QShortcut(QKeySequence("F12"), parent, self.toggle)
+        self.setVisible(visible)
+        if visible:
+            self.timer.start()
+            self.refresh()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+        if self.isVisible():
+            self.refresh()
+            self.raise_()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        self.setText("\n".join(self.registry.summary_lines()) or "no metrics yet")
+        self.adjustSize()
+        self.move(8, 8)
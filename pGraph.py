@@ -1,95 +1,52 @@
 import sys
-from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QMessageBox
+import argparse
+from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import mariadb
-import matplotlib.dates as mdates
-import matplotlib.ticker as ticker
-
-ticker.Locator.MAXTICKS = 2000  # Increase the limit
-
-# Database Configuration
-DB_CONFIG = {
-    "user": "rpscada",
-    "password": "0820216694",
-    "host": "localhost",
-    "database": "sensor_databases"
-}
+from series_store import SeriesStore
+from fetch_worker import BackgroundFetcher, StreamSubscriber
+from live_source import LiveSource
+from blit_renderer import BlitRenderer
+from trend_figure import trend_axes, node_lines, set_series, LINE_WIDTH
+from metrics_overlay import MetricsOverlay
+from alarms import AlarmEngine
+import metrics
 
 temperature_nodes = ['Airflow', 'Cooler_Ambient', 'Cooler_Discharge']
 humidity_nodes = ['Airflow', 'Cooler_Ambient', 'Cooler_Discharge']
 
-# Connect to MariaDB
-def connect_database():
-    try:
-        conn = mariadb.connect(**DB_CONFIG)
-        return conn
-    except mariadb.Error as e:
-        QMessageBox.critical(None, "Database Error", f"Error connecting to database: {e}")
-        sys.exit(1)
-
-# Fetch the last record for each sensor type
-def fetch_data():
-    conn = connect_database()
-    cursor = conn.cursor()
-    
-    humidity_data = []
-    temperature_data = []
-
-    for node in humidity_nodes:
-        sql_cmd = "SELECT dTime, humidity FROM humidity WHERE node = '" + node + "' ORDER BY dTime DESC LIMIT 1"
-        cursor.execute(sql_cmd)
-        data = cursor.fetchone()
-        if data is None:
-            continue
-        else:
-            # convert datetime to int
-            # humidity_data.append(int(time.mktime(data[0].timetuple())))
-            humidity_data.append(data[0])
-            humidity_data.append(data[1])
-
-    for node in temperature_nodes:
-        sql_cmd = "SELECT dTime, temperature FROM temperature WHERE node = '" + node + "' ORDER BY dTime DESC LIMIT 1"
-        cursor.execute(sql_cmd)
-        data = cursor.fetchone()
-        if data is None:
-            continue
-        else:
-            # convert datetime to int
-            temperature_data.append(data[0])
-            temperature_data.append(data[1])
-    conn.close()
-    
-    return humidity_data, temperature_data
+DISPLAY_POINTS = 10  # readings shown per node
+HISTORY_CAPACITY = 7200  # readings kept in memory per node (4 hours at 2 s)
+AGGREGATOR_ADDRESS = None  # e.g. "localhost:7070" to read from aggregator.py instead of MariaDB
+STREAM = False  # with an aggregator, draw each pushed batch as it arrives instead of polling
+USE_BLIT = True  # redraw only the lines, re-render axes only when their limits change
+ALARMS = True  # evaluate the alarm rules in alarms.py on fetched readings and thicken alarmed lines
+ALARM_LINE_WIDTH = 4.0
+METRICS_PORT = None  # e.g. 9101 to serve per-tick timings at http://127.0.0.1:9101/metrics
+DEBUG_OVERLAY = False  # show the timing overlay at startup (F12 toggles it)
 
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
 
         self.setWindowTitle("Temperature and Humidity Plotter")
-        # Data initialization
-        self.temperature1 = []
-        self.temperature2 = []
-        self.temperature3 = []
-        self.temperature1_time = []
-        self.temperature2_time = []
-        self.temperature3_time = []
-        
-        self.humidity1 = []
-        self.humidity2 = []
-        self.humidity3 = []
-        self.humidity1_time = []
-        self.humidity2_time = []
-        self.humidity3_time = []
-
-        # Create Matplotlib figures and canvases
+        # Data initialization: one ring-buffered series per (metric, node)
+        self.store = SeriesStore(HISTORY_CAPACITY)
+
+        self.alarms = AlarmEngine() if ALARMS else None
+
+        # Only the rows added since the last tick, from MariaDB or the shared aggregator
+        self.source = LiveSource({"temperature": temperature_nodes, "humidity": humidity_nodes},
+                                 backfill=DISPLAY_POINTS, aggregator_address=AGGREGATOR_ADDRESS)
+
+        # Create Matplotlib figures and canvases; the layout is shared with report.py
         self.fig_temp = Figure()
         self.canvas_temp = FigureCanvas(self.fig_temp)
-        self.ax_temp = self.fig_temp.add_subplot(111)
+        self.ax_temp = trend_axes(self.fig_temp, "Temperature")
 
         self.fig_humidity = Figure()
         self.canvas_humidity = FigureCanvas(self.fig_humidity)
-        self.ax_humidity = self.fig_humidity.add_subplot(111)
+        self.ax_humidity = trend_axes(self.fig_humidity, "Humidity")
 
 
         # Layout
@@ -106,147 +63,141 @@ class MainWindow(QWidget):
 
         self.setLayout(v_layout)
 
-        # Initialize plots
-        self.line_temp1, = self.ax_temp.plot([], [], label='Airflow')
-        self.line_temp2, = self.ax_temp.plot([], [], label='Cooler-Ambient')
-        self.line_temp3, = self.ax_temp.plot([], [], label='Cooler-Discharge')
-
-
-        self.line_humidity1, = self.ax_humidity.plot([], [], label='Airflow')
-        self.line_humidity2, = self.ax_humidity.plot([], [], label='Cooler-Ambient')
-        self.line_humidity3, = self.ax_humidity.plot([], [], label='Cooler-Discharge')
-
+        # Initialize plots, one line per node
+        self.temperature_lines = node_lines(self.ax_temp, temperature_nodes)
+        self.humidity_lines = node_lines(self.ax_humidity, humidity_nodes)
 
-        # self.ax_temp.set_xlabel("Time")
-        self.ax_temp.set_ylabel("Temperature")
-        self.ax_temp.legend()
-        self.ax_temp.legend(loc='upper right')
+        if USE_BLIT:
+            self.temp_renderer = BlitRenderer(self.canvas_temp, self.ax_temp, self.temperature_lines.values())
+            self.humidity_renderer = BlitRenderer(self.canvas_humidity, self.ax_humidity, self.humidity_lines.values())
 
-        # self.ax_humidity.set_xlabel("Time")
-        self.ax_humidity.set_ylabel("Humidity")
-        self.ax_humidity.legend()
-        # set legend on top of the plot
-        self.ax_humidity.legend(loc='upper right')
-        
+        self.timer = self.startTimer(20000)  # Update every 20 seconds
+        self.overlay = MetricsOverlay(self, visible=DEBUG_OVERLAY)
 
-        self.timer = self.startTimer(20000)  # Update every 10 seconds
-
-        # Adjust plot margins
-        self.fig_temp.subplots_adjust(left=0.05, right=0.95, bottom=0.1, top=0.9)
-        self.fig_humidity.subplots_adjust(left=0.05, right=0.95, bottom=0.1, top=0.9)
-
-        self.generate_data()
-        self.update_plots()
+        # Queries run on a worker thread; this thread only renders
+        if STREAM and self.source.aggregator is not None:
+            self.fetcher = None
+            self.subscriber = StreamSubscriber(self.source.receive)
+            self.subscriber.received.connect(self.on_data)
+            self.subscriber.failed.connect(self.on_fetch_error)
+            self.update_plots()
+        else:
+            self.subscriber = None
+            self.fetcher = BackgroundFetcher(self.source.fetch)
+            self.fetcher.finished.connect(self.on_data)
+            self.fetcher.failed.connect(self.on_fetch_error)
+            self.update_plots()
+            self.fetcher.submit()
 
         self.resize(1800, 900)
         self.show()
 
     def timerEvent(self, event):
-        self.generate_data()
+        if self.fetcher is not None and not self.fetcher.submit():
+            metrics.count("ticks_coalesced")  # the previous fetch is still queued or backing off
+
+    def closeEvent(self, event):
+        if self.fetcher is not None:
+            self.fetcher.stop()
+        if self.subscriber is not None:
+            self.subscriber.stop()
+        super().closeEvent(event)
+
+    def on_data(self, data):
+        self.generate_data(data)
+        title = "Temperature and Humidity Plotter"
+        if self.alarms is not None:
+            self.alarms.check_stale()
+            alarmed = sorted(self.alarms.alarmed("temperature") | self.alarms.alarmed("humidity"))
+            if alarmed:
+                title += f" - ALARM: {', '.join(alarmed)}"
+        self.setWindowTitle(title)
         self.update_plots()
+
+    def on_fetch_error(self, message):
+        self.setWindowTitle(f"Temperature and Humidity Plotter - database unavailable, retrying ({message})")
     
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self.canvas_temp.draw_idle()
         self.canvas_humidity.draw_idle()
 
-    def generate_data(self):
-        # get data from the database
-        humidity_data, temperature_data = fetch_data()
-        
-        # check condition if the data is empty do nothing
-        if len(humidity_data) == 6:
-            if self.humidity1 == [] and self.humidity2 == [] and self.humidity3 == []:
-                self.humidity1.append(humidity_data[1])
-                self.humidity1_time.append(humidity_data[0])
-                self.humidity2.append(humidity_data[3])
-                self.humidity2_time.append(humidity_data[2])
-                self.humidity3.append(humidity_data[5])
-                self.humidity3_time.append(humidity_data[4])
-            else:
-                # append the data to the list
-                if humidity_data[0] != self.humidity1_time[-1]:
-                    self.humidity1.append(humidity_data[1])
-                    self.humidity1_time.append(humidity_data[0])
-                if humidity_data[2] != self.humidity2_time[-1]:
-                    self.humidity2.append(humidity_data[3])
-                    self.humidity2_time.append(humidity_data[2])
-                if humidity_data[4] != self.humidity3_time[-1]:
-                    self.humidity3.append(humidity_data[5])
-                    self.humidity3_time.append(humidity_data[4])
-                    
-        if len(temperature_data) == 6:
-            if self.temperature1 == [] and self.temperature2 == [] and self.temperature3 == []:
-                self.temperature1.append(temperature_data[1])
-                self.temperature1_time.append(temperature_data[0])
-                self.temperature2.append(temperature_data[3])
-                self.temperature2_time.append(temperature_data[2])
-                self.temperature3.append(temperature_data[5])
-                self.temperature3_time.append(temperature_data[4])
-            else:
-                # append the data to the list
-                if temperature_data[0] != self.temperature1_time[-1]:
-                    self.temperature1.append(temperature_data[1])
-                    self.temperature1_time.append(temperature_data[0])
-                if temperature_data[2] != self.temperature2_time[-1]:
-                    self.temperature2.append(temperature_data[3])
-                    self.temperature2_time.append(temperature_data[2])
-                if temperature_data[4] != self.temperature3_time[-1]:
-                    self.temperature3.append(temperature_data[5])
-                    self.temperature3_time.append(temperature_data[4])
-
-        # Limit data points to 20
-        self.temperature1 = self.temperature1[-10:]
-        self.temperature2 = self.temperature2[-10:]
-        self.temperature3 = self.temperature3[-10:]
-        
-        self.temperature1_time = self.temperature1_time[-10:]
-        self.temperature2_time = self.temperature2_time[-10:]
-        self.temperature3_time = self.temperature3_time[-10:]
-        
-        self.humidity1 = self.humidity1[-10:]
-        self.humidity2 = self.humidity2[-10:]
-        self.humidity3 = self.humidity3[-10:]
-
-        self.humidity1_time = self.humidity1_time[-10:]
-        self.humidity2_time = self.humidity2_time[-10:]
-        self.humidity3_time = self.humidity3_time[-10:]
+    def generate_data(self, data):
+        # {metric: {node: rows}} added since the last tick, as fetched by the worker thread
+        with metrics.timer("generate_data"):
+            evicted = 0
+            for metric, delta in data.items():
+                for node, rows in delta.items():
+                    before = len(self.store.get(metric, node))
+                    self.store.extend_rows(metric, node, rows)
+                    evicted += before + len(rows) - len(self.store.get(metric, node))
+                if self.alarms is not None:
+                    self.alarms.feed_delta(metric, delta)
+        if evicted:
+            metrics.count("points_evicted", evicted)  # oldest readings pushed out of the ring buffers
+
+    def set_line_data(self, line, metric, node):
+        times, values = self.store.window(metric, node, DISPLAY_POINTS)
+        set_series(line, times, values)
+
+    def highlight(self, lines, metric):
+        # Alarmed nodes get a thicker line; with blitting the width change shows on the next update
+        if self.alarms is None:
+            return
+        alarmed = self.alarms.alarmed(metric)
+        for node, line in lines.items():
+            line.set_linewidth(ALARM_LINE_WIDTH if node in alarmed else LINE_WIDTH)
 
     def update_plots(self):
-        formatter = mdates.DateFormatter('%H:%M')  # Specify the HH:MM:SS format
-        # Update temperature plot
-        # xdata = np.arange(len(self.temperature1))  # Use a common x-axis
-        self.line_temp1.set_data(self.temperature1_time, self.temperature1)
-        self.line_temp2.set_data(self.temperature2_time, self.temperature2)
-        self.line_temp3.set_data(self.temperature3_time, self.temperature3)
-        self.ax_temp.xaxis.set_major_formatter(formatter)
-        self.ax_temp.xaxis.set_major_locator(mdates.MinuteLocator(interval=1))
+        with metrics.timer("update_plots"):
+            self._update_plots()
 
-        self.ax_temp.relim()
-        self.ax_temp.autoscale_view()
+    def _update_plots(self):
+        # Update temperature plot
+        for node, line in self.temperature_lines.items():
+            self.set_line_data(line, "temperature", node)
 
         # Update humidity plot
-        self.line_humidity1.set_data(self.humidity1_time, self.humidity1)
-        self.line_humidity2.set_data(self.humidity2_time, self.humidity2)
-        self.line_humidity3.set_data(self.humidity3_time, self.humidity3)
-        
-        # Format the x-axis to show HH:MM:SS
-        self.ax_humidity.xaxis.set_major_formatter(formatter)
+        for node, line in self.humidity_lines.items():
+            self.set_line_data(line, "humidity", node)
 
-        # Set the tick locator to control the frequency of ticks (optional)
-        self.ax_humidity.xaxis.set_major_locator(mdates.MinuteLocator(interval=1)) # Or MinuteLocator, HourLocator, etc.
+        self.highlight(self.temperature_lines, "temperature")
+        self.highlight(self.humidity_lines, "humidity")
 
+        if USE_BLIT:
+            with metrics.timer("draw"):
+                self.temp_renderer.update()
+                self.humidity_renderer.update()
+            return
 
-        
+        # Full redraw of both figures
+        self.ax_temp.relim()
+        self.ax_temp.autoscale_view()
         self.ax_humidity.relim()
         self.ax_humidity.autoscale_view()
 
-        self.canvas_temp.draw()
-        self.canvas_humidity.draw()
+        with metrics.timer("draw"):
+            self.canvas_temp.draw()
+            self.canvas_humidity.draw()
 
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Live temperature and humidity plots (Matplotlib).")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--aggregator", help="poll this aggregator.py address instead of MariaDB")
+    group.add_argument("--subscribe", help="draw readings pushed by this aggregator.py address")
+    parser.add_argument("--no-alarms", action="store_true", help="don't evaluate the alarm rules")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="serve Prometheus metrics on this port")
+    parser.add_argument("--debug", action="store_true", help="show the timing overlay")
+    args = parser.parse_args()
+
+    AGGREGATOR_ADDRESS = args.subscribe or args.aggregator or AGGREGATOR_ADDRESS
+    STREAM = STREAM or bool(args.subscribe)
+    ALARMS = ALARMS and not args.no_alarms
+    DEBUG_OVERLAY = DEBUG_OVERLAY or args.debug
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    app = QApplication(sys.argv[:1])
     window = MainWindow()
     sys.exit(app.exec())
@@ -1,50 +1,138 @@
 import sys
-import mariadb
+import argparse
+import db
 import numpy as np
 import pyqtgraph as pg
-from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QMessageBox
+from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
 from PySide6.QtCore import Qt, QTimer
-import numpy as np
 import datetime
+from operator import itemgetter
+from ring_buffer import RingBuffer
+from fetch_worker import BackgroundFetcher, StreamSubscriber
+from live_source import LiveSource
+from history import HistoryView
+from metrics_overlay import MetricsOverlay
+from alarms import AlarmEngine
+from dashboard import node_color
+import metrics
+
+POINTS_PER_NODE = 10  # readings kept on screen for each node
+LIVE_CAPACITY = 3600  # readings kept per node in live mode (2 hours at 2 s)
+REFRESH_MS = 5000  # refresh interval
+AGGREGATOR_ADDRESS = None  # e.g. "localhost:7070" to read from aggregator.py instead of MariaDB
+STREAM = False  # with an aggregator, draw each pushed batch as it arrives instead of polling
+HISTORY_SPAN = 24 * 3600  # seconds shown when history mode opens
+ALARMS = True  # evaluate the alarm rules in alarms.py on fetched readings and thicken alarmed curves
+PEN_WIDTH = 1
+ALARM_PEN_WIDTH = 4
+METRICS_PORT = None  # e.g. 9102 to serve per-tick timings at http://127.0.0.1:9102/metrics
+DEBUG_OVERLAY = False  # show the timing overlay at startup (F12 toggles it)
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def factorize(column):
+    """Return (unique values in first-seen order, int codes) for a sequence of hashable values"""
+    if isinstance(column, np.ndarray):
+        uniques, first_index, codes = np.unique(column, return_index=True, return_inverse=True)
+        order = np.argsort(first_index)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return uniques[order].tolist(), rank[codes.ravel()]
+    first_seen = {}
+    first = np.fromiter(map(first_seen.setdefault, column, range(len(column))), dtype=np.intp, count=len(column))
+    _, codes = np.unique(first, return_inverse=True)
+    return list(first_seen), codes.ravel()
+
+def to_epoch_us(times):
+    """Convert naive datetimes or '%Y-%m-%d %H:%M:%S' strings to int64 wall-clock microseconds"""
+    if isinstance(times, np.ndarray) and np.issubdtype(times.dtype, np.datetime64):
+        return times.astype("datetime64[us]").astype(np.int64)
+    if len(times) and isinstance(times[0], datetime.datetime):
+        # Plain timedelta arithmetic is much faster than NumPy's datetime object conversion
+        one_us = datetime.timedelta(microseconds=1)
+        return np.fromiter(((t - _EPOCH) // one_us for t in times), dtype=np.int64, count=len(times))
+    return np.array(times, dtype="datetime64[us]").astype(np.int64)
+
+def wall_to_unix(wall_us):
+    """Convert sorted wall-clock microseconds (local time) to Unix seconds, like datetime.timestamp()"""
+    if len(wall_us) == 0:
+        return np.empty(0, dtype=np.float64)
+    first = _EPOCH + datetime.timedelta(microseconds=int(wall_us[0]))
+    last = _EPOCH + datetime.timedelta(microseconds=int(wall_us[-1]))
+    first_offset = first.timestamp() - (first - _EPOCH).total_seconds()
+    last_offset = last.timestamp() - (last - _EPOCH).total_seconds()
+    if first_offset == last_offset:
+        # No DST change inside the window: one constant offset for every timestamp
+        return wall_us / 1e6 + first_offset
+    return np.array([(_EPOCH + datetime.timedelta(microseconds=int(t))).timestamp() for t in wall_us],
+                    dtype=np.float64)
+
+def pivot_columns(times, nodes, values):
+    """Align readings given as columns into sorted Unix timestamps and a node x time grid (NaN fill)"""
+    if len(times) == 0:
+        return np.empty(0, dtype=np.float64), {}
 
-# Database Configuration
-DB_CONFIG = {
-    "user": "username",             # Replace with your own username and password
-    "password": "password",
-    "host": "localhost",
-    "database": "sensor_databases"
-}
-
-
-# Connect to MariaDB
-def connect_database():
-    try:
-        conn = mariadb.connect(**DB_CONFIG)
-        return conn
-    except mariadb.Error as e:
-        QMessageBox.critical(None, "Database Error", f"Error connecting to database: {e}")
-        sys.exit(1)
-
-# Fetch the last 10 records for each sensor type
-def fetch_data():
-    conn = connect_database()
-    cursor = conn.cursor()
-
-    # Fetch last 10 humidity readings
-    cursor.execute("SELECT dTime, node, humidity FROM humidity ORDER BY dTime DESC LIMIT 10")
-    humidity_data = cursor.fetchall()
-
-    # Fetch last 10 temperature readings
-    cursor.execute("SELECT dTime, node, temperature FROM temperature ORDER BY dTime DESC LIMIT 10")
-    temperature_data = cursor.fetchall()
-
-    conn.close()
-    
-    return humidity_data, temperature_data
+    first = times[0]
+    if isinstance(first, datetime.datetime) and first.tzinfo is not None:
+        # Aware datetimes already pin down the instant
+        epoch_us = np.array([round(t.timestamp() * 1e6) for t in times], dtype=np.int64)
+        unique_us, time_index = np.unique(epoch_us, return_inverse=True)
+        timestamps_numeric = unique_us / 1e6
+    elif isinstance(times, np.ndarray):
+        unique_us, time_index = np.unique(to_epoch_us(times), return_inverse=True)
+        timestamps_numeric = wall_to_unix(unique_us)
+    else:
+        # Convert each distinct timestamp once, then sort the distinct values
+        unique_times, codes = factorize(times)
+        wall_us = to_epoch_us(unique_times)
+        order = np.argsort(wall_us, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        unique_us = wall_us[order]
+        time_index = rank[codes]
+        timestamps_numeric = wall_to_unix(unique_us)
+
+    # Node codes in order of first appearance
+    node_names, node_index = factorize(nodes)
+
+    grid = np.full((len(node_names), len(unique_us)), np.nan, dtype=np.float64)
+    grid[node_index, time_index.ravel()] = np.asarray(values, dtype=np.float64)
+
+    sensor_data = {node: grid[i] for i, node in enumerate(node_names)}
+    return timestamps_numeric, sensor_data
+
+def pivot_readings(data):
+    """Align (dTime, node, value) rows into sorted Unix timestamps and a node x time grid (NaN fill)"""
+    if len(data) == 0:
+        return np.empty(0, dtype=np.float64), {}
+    times = list(map(itemgetter(0), data))
+    nodes = list(map(itemgetter(1), data))
+    values = np.fromiter(map(itemgetter(2), data), dtype=np.float64, count=len(data))
+    return pivot_columns(times, nodes, values)
+
+def pivot_buffers(buffers):
+    """pivot_columns for per-node (wall-clock us, value) ring buffers, without a node column to factorize"""
+    columns = [(node, times.view(), values.view()) for node, (times, values) in buffers.items() if len(times)]
+    if not columns:
+        return np.empty(0, dtype=np.float64), {}
+    unique_us = np.unique(np.concatenate([times for _, times, _ in columns]))
+    # Nodes in order of their first reading, as pivot_columns orders them on time-sorted rows
+    order = np.argsort([times.min() for _, times, _ in columns], kind="stable")
+
+    grid = np.full((len(columns), len(unique_us)), np.nan, dtype=np.float64)
+    sensor_data = {}
+    for row, i in enumerate(order):
+        node, times, values = columns[i]
+        grid[row, np.searchsorted(unique_us, times)] = values
+        sensor_data[node] = grid[row]
+    return wall_to_unix(unique_us), sensor_data
 
 class SensorPlotter(QMainWindow):
-    def __init__(self):
+    def __init__(self, live=True, history=False):
         super().__init__()
+        self.live = live
+        self.history = history
 
         self.setWindowTitle("Sensor Data Visualization")
         self.setGeometry(100, 100, 800, 600)
@@ -56,22 +144,52 @@ class SensorPlotter(QMainWindow):
         central_widget.setLayout(layout)
 
         # Create plots
-        self.temp_plot = pg.PlotWidget(title="Temperature Sensors")
-        self.humidity_plot = pg.PlotWidget(title="Humidity Sensors")
+        self.temp_plot = pg.PlotWidget(title="Temperature Sensors", axisItems={'bottom': pg.DateAxisItem()})
+        self.humidity_plot = pg.PlotWidget(title="Humidity Sensors", axisItems={'bottom': pg.DateAxisItem()})
 
         layout.addWidget(self.temp_plot)
         layout.addWidget(self.humidity_plot)
 
+        # Only the rows added since the last tick, from MariaDB or the shared aggregator
+        self.source = LiveSource({"humidity": None, "temperature": None}, backfill=POINTS_PER_NODE,
+                                 aggregator_address=AGGREGATOR_ADDRESS)
+
+        # Most recent readings per node as (wall-clock us, value) ring buffers
+        self.humidity_rows = {}
+        self.temperature_rows = {}
+
+        # Alarm rules run on the rows as they arrive; alarmed nodes are drawn thicker
+        self.alarms = AlarmEngine() if ALARMS and not history else None
+
+        # Live mode: one persistent curve per node, fed from (x, y) ring buffers
+        self.temp_curves = {}
+        self.humidity_curves = {}
+
         # Setup plots
         self.setup_plots()
+        self.overlay = MetricsOverlay(self, visible=DEBUG_OVERLAY)
+
+        self.subscriber = None
+        if history:
+            self.setup_history()
+            return
+
+        if STREAM and self.source.aggregator is not None:
+            self.setup_stream()
+            return
 
-        # Timer to refresh data every 5 seconds
+        # Queries run on a worker thread; this thread only renders
+        self.fetcher = BackgroundFetcher(self.source.fetch)
+        self.fetcher.finished.connect(self.update_plots)
+        self.fetcher.failed.connect(self.on_fetch_error)
+
+        # Timer to refresh data
         self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_plots)
-        self.timer.start(5000)  # Refresh every 5 seconds
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(REFRESH_MS)
 
         # Initial plot
-        self.update_plots()
+        self.fetcher.submit()
 
     def setup_plots(self):
         """Setup graph properties"""
@@ -85,59 +203,161 @@ class SensorPlotter(QMainWindow):
         self.humidity_plot.addLegend()
         self.humidity_plot.showGrid(x=True, y=True)
 
-    def update_plots(self):
-        """Fetch data and update the plots"""
-        humidity_data, temperature_data = fetch_data()
+        # Only draw what is visible, and decimate when there are more points than pixels
+        for plot in (self.temp_plot, self.humidity_plot):
+            plot.setClipToView(True)
+            plot.setDownsampling(auto=True, mode='peak')
+
+    def setup_history(self):
+        """Browse stored history: chunks load lazily as the view pans and zooms"""
+        self.fetcher = None
+        self.history_views = [
+            HistoryView(self.temp_plot, "temperature", "temperature", db.connect_reader,
+                        label="Temp Sensor", color=node_color),
+            HistoryView(self.humidity_plot, "humidity", "humidity", db.connect_reader,
+                        label="Hum Sensor", color=node_color),
+        ]
+        for view in self.history_views:
+            view.failed.connect(self.on_fetch_error)
+        now = datetime.datetime.now().timestamp()
+        for plot in (self.temp_plot, self.humidity_plot):
+            plot.setXRange(now - HISTORY_SPAN, now, padding=0)
+            plot.enableAutoRange(axis='y')
+        self.humidity_plot.setXLink(self.temp_plot)
+
+    def setup_stream(self):
+        """Push mode: redraw as soon as the aggregator forwards new readings"""
+        self.fetcher = None
+        self.subscriber = StreamSubscriber(self.source.receive)
+        self.subscriber.received.connect(self.update_plots)
+        self.subscriber.failed.connect(self.on_fetch_error)
+
+    def tick(self):
+        if not self.fetcher.submit():
+            metrics.count("ticks_coalesced")  # the previous fetch is still queued or backing off
 
-        # Sort by timestamp (oldest first)
-        humidity_data = sorted(humidity_data, key=lambda x: x[0])
-        temperature_data = sorted(temperature_data, key=lambda x: x[0])
+    def on_fetch_error(self, message):
+        self.statusBar().showMessage(f"Database unavailable, retrying: {message}")
+
+    def closeEvent(self, event):
+        if self.fetcher is not None:
+            self.fetcher.stop()
+        if self.subscriber is not None:
+            self.subscriber.stop()
+        if self.history:
+            for view in self.history_views:
+                view.close()
+        super().closeEvent(event)
+
+    def update_plots(self, data):
+        """Update the plots with the rows fetched by the worker"""
+        with metrics.timer("update_plots"):
+            self._update_plots(data)
+
+    def _update_plots(self, data):
+        self.statusBar().clearMessage()
+        humidity_delta = data.get("humidity", {})
+        temperature_delta = data.get("temperature", {})
+        if self.alarms is not None:
+            self.alarms.feed_delta("temperature", temperature_delta)
+            self.alarms.feed_delta("humidity", humidity_delta)
+            self.alarms.check_stale()
+            alarmed = sorted(self.alarms.alarmed("temperature") | self.alarms.alarmed("humidity"))
+            if alarmed:
+                self.statusBar().showMessage(f"ALARM: {', '.join(alarmed)}")
+        if self.live:
+            self.update_curves(self.temp_plot, self.temp_curves, temperature_delta, "Temp Sensor")
+            self.update_curves(self.humidity_plot, self.humidity_curves, humidity_delta, "Hum Sensor")
+            self.highlight(self.temp_curves, "temperature")
+            self.highlight(self.humidity_curves, "humidity")
+            return
+
+        self.append_rows(self.humidity_rows, humidity_delta)
+        self.append_rows(self.temperature_rows, temperature_delta)
+
+        if not self.humidity_rows or not self.temperature_rows:
+            return
 
         # Convert data for plotting
-        temp_timestamps, temp_sensors = self.process_data(temperature_data)
-        hum_timestamps, hum_sensors = self.process_data(humidity_data)
+        temp_timestamps, temp_sensors = self.process_data(self.temperature_rows)
+        hum_timestamps, hum_sensors = self.process_data(self.humidity_rows)
 
         # Clear previous plots
         self.temp_plot.clear()
         self.humidity_plot.clear()
 
         # Plot temperature sensors
-        colors = ['r', 'g', 'b']  # Colors for different sensors
         for i, node in enumerate(temp_sensors.keys()):
-            self.temp_plot.plot(temp_timestamps, temp_sensors[node], pen=colors[i], name=f"Temp Sensor {node}")
+            self.temp_plot.plot(temp_timestamps, temp_sensors[node], pen=self.pen(i, "temperature", node),
+                                name=f"Temp Sensor {node}")
 
         # Plot humidity sensors
         for i, node in enumerate(hum_sensors.keys()):
-            self.humidity_plot.plot(hum_timestamps, hum_sensors[node], pen=colors[i], name=f"Hum Sensor {node}")
-
-    def process_data(self, data):
-        """Process fetched data into aligned timestamps and sensor values"""
-        timestamps = sorted(set(dTime for dTime, _, _ in data))  # Unique, sorted timestamps
-        sensor_data = {}
+            self.humidity_plot.plot(hum_timestamps, hum_sensors[node], pen=self.pen(i, "humidity", node),
+                                    name=f"Hum Sensor {node}")
 
-        # Convert timestamps to datetime only if they are strings
-        if isinstance(timestamps[0], str):  
-            timestamps_dt = [datetime.datetime.strptime(t, "%Y-%m-%d %H:%M:%S") for t in timestamps]
-        else:
-            timestamps_dt = timestamps  # Already in datetime format
+    def pen(self, index, metric, node):
+        alarmed = self.alarms is not None and node in self.alarms.alarmed(metric)
+        return pg.mkPen(node_color(index), width=ALARM_PEN_WIDTH if alarmed else PEN_WIDTH)
 
-        # Convert to float (Unix timestamps)
-        timestamps_numeric = np.array([t.timestamp() for t in timestamps_dt], dtype=np.float64)
+    def highlight(self, curves, metric):
+        """Thicker pen for alarmed nodes; only curves whose state changed are touched"""
+        alarmed = self.alarms.alarmed(metric) if self.alarms is not None else set()
+        for node, (_, _, curve) in curves.items():
+            width = ALARM_PEN_WIDTH if node in alarmed else PEN_WIDTH
+            pen = pg.mkPen(curve.opts['pen'])
+            if pen.width() != width:
+                pen.setWidth(width)
+                curve.setPen(pen)
 
-        # Initialize sensor_data with NaN values
-        for _, node, _ in data:
-            if node not in sensor_data:
-                sensor_data[node] = np.full(len(timestamps), np.nan, dtype=np.float64)
+    def update_curves(self, plot, curves, delta, label):
+        """Append new rows to each node's ring buffers and push them to its persistent curve"""
+        for node, rows in delta.items():
+            if node not in curves:
+                curve = plot.plot([], [], pen=node_color(len(curves)), name=f"{label} {node}",
+                                  skipFiniteCheck=True)
+                curves[node] = (RingBuffer(LIVE_CAPACITY), RingBuffer(LIVE_CAPACITY), curve)
+            x, y, curve = curves[node]
+            evicted = len(x) + len(rows) - LIVE_CAPACITY
+            if evicted > 0:
+                metrics.count("points_evicted", evicted)  # oldest readings pushed out of the ring buffers
+            x.extend(wall_to_unix(to_epoch_us([dTime for dTime, _ in rows])))
+            y.extend([value for _, value in rows])
+            curve.setData(x.view(), y.view())
 
-        # Fill actual values
-        for dTime, node, value in data:
-            index = timestamps.index(dTime)  # Find correct timestamp index
-            sensor_data[node][index] = np.float64(value)  # Ensure numerical values
+    def append_rows(self, buffers, delta):
+        """Append fetched rows to the per-node ring buffers, dropping the oldest ones"""
+        for node, rows in delta.items():
+            if node not in buffers:
+                buffers[node] = (RingBuffer(POINTS_PER_NODE, dtype=np.int64), RingBuffer(POINTS_PER_NODE))
+            times, values = buffers[node]
+            times.extend(to_epoch_us([dTime for dTime, _ in rows]))
+            values.extend([value for _, value in rows])
 
-        return timestamps_numeric, sensor_data  # X-axis in float format, Y-axis as dict of NumPy arrays
+    def process_data(self, buffers):
+        """Process the per-node ring buffers into aligned timestamps and sensor values"""
+        # X-axis in float format, Y-axis as dict of NumPy arrays
+        with metrics.timer("process_data"):
+            return pivot_buffers(buffers)
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = SensorPlotter()
+    parser = argparse.ArgumentParser(description="Live or historical sensor plots (pyqtgraph).")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--aggregator", help="poll this aggregator.py address instead of MariaDB")
+    group.add_argument("--subscribe", help="draw readings pushed by this aggregator.py address")
+    parser.add_argument("--history", action="store_true", help="browse stored history instead of live data")
+    parser.add_argument("--no-alarms", action="store_true", help="don't evaluate the alarm rules")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="serve Prometheus metrics on this port")
+    parser.add_argument("--debug", action="store_true", help="show the timing overlay")
+    args = parser.parse_args()
+
+    AGGREGATOR_ADDRESS = args.subscribe or args.aggregator or AGGREGATOR_ADDRESS
+    STREAM = STREAM or bool(args.subscribe)
+    ALARMS = ALARMS and not args.no_alarms
+    DEBUG_OVERLAY = DEBUG_OVERLAY or args.debug
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    app = QApplication(sys.argv[:1])
+    window = SensorPlotter(history=args.history)
     window.show()
     sys.exit(app.exec())
@@ -1,94 +1,135 @@
+import queue
+import asyncio
+import argparse
+import threading
 import mariadb
+import db
 import time
-import datetime
-import random  # For example data, remove or adapt as needed
-
-# Database credentials
-DB_HOST = "localhost"  # Replace with your database host
-DB_USER = "username"  # Replace with your database user
-DB_PASSWORD = "password"  # Replace with your database password
-DB_NAME = "sensor_databases"  # Replace with your database name
-
-
-def generate_sample_data():
-    """Generates sample data for demonstration. Replace with your actual data source."""
-    # Example: Generating random temperature and humidity
-    temperature = round(random.uniform(20, 35), 2)  # Temperature between 20 and 35
-    humidity = random.randint(40, 80)  # Humidity between 40 and 80
-    return temperature, humidity
-
-def insert_data(conn):
-    """Inserts data into the database."""
-    temperature, humidity = generate_sample_data()
-    insert_temperature_data(conn, "node1", temperature)
-    insert_humidity_data(conn, "node1", humidity)
-    
-    temperature, humidity = generate_sample_data()
-    insert_temperature_data(conn, "node2", temperature)
-    insert_humidity_data(conn, "node2", humidity)
-    
-    temperature, humidity = generate_sample_data()
-    insert_temperature_data(conn, "node3", temperature)
-    insert_humidity_data(conn, "node3", humidity)
-
-def insert_temperature_data(conn, node_name, temperature):
-    """Inserts data into the database."""
-    try:
-        cursor = conn.cursor()
-        now = datetime.datetime.now()
-        # Adapt this SQL query to your table structure
-        query = "INSERT INTO temperature (dTime, node, temperature) VALUES (?, ?, ?)"
-        data = (now, node_name, temperature)
-        cursor.execute(query, data)
-        conn.commit()  # Important: Commit the transaction
-
-    except mariadb.Error as e:
-        print(f"Error inserting data: {e}")
-        conn.rollback() # Rollback in case of error to maintain data integrity
-    finally:
-        cursor.close()
-        
-def insert_humidity_data(conn, node_name, humidity):
-    """Inserts data into the database."""
-    try:
-        cursor = conn.cursor()
-        now = datetime.datetime.now()
-        # Adapt this SQL query to your table structure
-        query = "INSERT INTO humidity (dTime, node, humidity) VALUES (?, ?, ?)"
-        data = (now, node_name, humidity)
-        cursor.execute(query, data)
-        conn.commit()  # Important: Commit the transaction
-
-    except mariadb.Error as e:
-        print(f"Error inserting data: {e}")
-        conn.rollback() # Rollback in case of error to maintain data integrity
-    finally:
-        cursor.close()
+from acquisition import AcquisitionEngine, simulate
+from batch_writer import BatchWriter
+from aggregator import Publisher
+from spool import Spool
+from alarms import AlarmEngine
+import metrics
+
+# Nodes to generate readings for; pass a node count on the command line to override
+NODES = ["node1", "node2", "node3"]
+
+# Batching thresholds: flush after this many queued readings or this many seconds
+BATCH_MAX_ROWS = 500
+BATCH_MAX_AGE = 1.0
+
+SAMPLE_PERIOD = 2  # seconds between readings of the same node (simulated sources)
+REPORT_INTERVAL = 60  # seconds between throughput reports
+PUBLISH_ADDRESS = None  # e.g. "localhost:7070" to push every reading to aggregator.py as it is taken
+
+# Readings that cannot be written are spooled to disk and replayed after reconnecting
+SPOOL_DIR = "spool"
+SPOOL_FSYNC_INTERVAL = 1.0  # seconds between fsyncs of the spool; 0 = every batch, None = never
+RECONNECT_INTERVAL = 5  # seconds between reconnect attempts
+REPLAY_STEP = 5000  # spooled rows replayed between sampling cycles
+ALARMS = True  # evaluate the alarm rules in alarms.py on every reading as it is taken
+STALE_CHECK_INTERVAL = 1.0  # seconds between checks for nodes that stopped reporting
+METRICS_PORT = None  # e.g. 9100 to serve ingest timings at http://127.0.0.1:9100/metrics
+
+
+def write_loop(readings, writer, stop, alarms=None):
+    """Moves acquired readings from the queue into the batch writer; runs on its own thread.
+
+    All database work happens here, so a slow or unreachable server never delays
+    acquisition: readings wait in the queue, or in the spool while disconnected.
+    Each drained batch also goes through the alarm engine, if there is one.
+    """
+    last_report = time.monotonic()
+    last_stale_check = last_report
+    next_connect = 0.0
+    while not (stop.is_set() and readings.empty()):
+        # (Re)connect without holding up sampling; until then readings go to the spool
+        if writer.conn is None and time.monotonic() >= next_connect:
+            try:
+                writer.conn = db.connect_writer()  # the primary; db.CONNECT_TIMEOUT keeps a dead server from stalling
+                print("Database connected.")
+            except mariadb.Error as e:
+                print(f"Database connection error: {e}; spooling to {writer.spool.directory}")
+                next_connect = time.monotonic() + RECONNECT_INTERVAL
+
+        batch = []
+        try:
+            batch.append(readings.get(timeout=BATCH_MAX_AGE / 4))
+            while True:
+                batch.append(readings.get_nowait())
+        except queue.Empty:
+            pass
+        for metric, node, dTime, value in batch:
+            writer.add(metric, node, value, dTime)
+
+        if alarms is not None:
+            alarms.feed(batch)
+            if time.monotonic() - last_stale_check >= STALE_CHECK_INTERVAL:
+                alarms.check_stale()
+                last_stale_check = time.monotonic()
+            metrics.gauge("alarms_active", alarms.active_count())
+
+        if writer.should_flush():
+            writer.flush()
+        elif writer.conn is not None and writer.spool.pending():
+            writer.replay(REPLAY_STEP)
+
+        metrics.gauge("queue_depth", readings.qsize())
+        metrics.gauge("pending_rows", writer.pending())
+        metrics.gauge("spool_bytes", writer.spool.pending())
+        if writer.publisher is not None:
+            metrics.gauge("publish_dropped", writer.publisher.dropped)
 
+        if time.monotonic() - last_report >= REPORT_INTERVAL:
+            writer.report()
+            last_report = time.monotonic()
 
+def mainLoop(nodes=NODES, publish_address=PUBLISH_ADDRESS, sources=None):
+    """Acquires from `sources` (default: one simulated source per node) and writes to the database."""
+    if sources is None:
+        sources = simulate(len(nodes), SAMPLE_PERIOD)
+        for source, node in zip(sources, nodes):
+            source.node = node
 
-def mainLoop():
+    readings = queue.SimpleQueue()
+    engine = AcquisitionEngine(sources, lambda metric, node, dTime, value: readings.put((metric, node, dTime, value)))
+    publisher = Publisher(publish_address) if publish_address else None
+    spool = Spool(SPOOL_DIR, fsync_interval=SPOOL_FSYNC_INTERVAL)
+    writer = BatchWriter(None, max_rows=BATCH_MAX_ROWS, max_age=BATCH_MAX_AGE,
+                         publisher=publisher, spool=spool)
+    alarms = AlarmEngine() if ALARMS else None
+    stop = threading.Event()
+    writer_thread = threading.Thread(target=write_loop, args=(readings, writer, stop, alarms), daemon=True)
+    writer_thread.start()
     try:
-        conn = mariadb.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
-
-        while True:
-            insert_data(conn)
-            time.sleep(2)  # Wait for 1 minute (60 seconds)
-
-    except mariadb.Error as e:
-        print(f"Database connection error: {e}")
+        asyncio.run(engine.run())
     except KeyboardInterrupt: # Handle Ctrl+C gracefully
         print("Script stopped by user.")
     finally:
-        if 'conn' in locals() and conn.is_connected(): # Check if connection exists before closing
-            conn.close()
+        stop.set()
+        writer_thread.join()
+        writer.flush()  # Don't lose readings still sitting in the queue; spooled if the database is down
+        engine.report()
+        writer.report()
+        spool.close()
+        if writer.conn is not None:
+            writer.conn.close()
             print("Database connection closed.")
 
 
 if __name__ == "__main__":
-    mainLoop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Insert sample sensor readings into the database.")
+    parser.add_argument("nodes", nargs="?", type=int, help="number of nodes to simulate (default: node1..node3)")
+    parser.add_argument("--publish", default=PUBLISH_ADDRESS, help="aggregator address to push readings to")
+    parser.add_argument("--period", type=float, default=SAMPLE_PERIOD, help="seconds between readings of each node")
+    parser.add_argument("--no-alarms", action="store_true", help="don't evaluate the alarm rules")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+    SAMPLE_PERIOD = args.period
+    ALARMS = ALARMS and not args.no_alarms
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    if args.nodes:
+        NODES = [f"node{i + 1}" for i in range(args.nodes)]
+    mainLoop(NODES, args.publish)
\ No newline at end of file
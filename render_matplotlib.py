@@ -0,0 +1,41 @@
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from blit_renderer import BlitRenderer
+from trend_figure import trend_axes, set_series, LINE_WIDTH
+
+ALARM_LINE_WIDTH = 4.0
+
+
+class Renderer:
+    """Matplotlib panel: one line per node, redrawn by blitting over a cached background."""
+
+    def __init__(self, title, ylabel, color):
+        self.color = color
+        self.figure = Figure()
+        self.widget = FigureCanvas(self.figure)
+        self.ax = trend_axes(self.figure, ylabel)
+        self.ax.set_title(title)
+        self.lines = {}
+        self.blit = BlitRenderer(self.widget, self.ax, [])
+
+    def line(self, node):
+        if node not in self.lines:
+            rgb = tuple(c / 255.0 for c in self.color(len(self.lines)))
+            line, = self.ax.plot([], [], label=node.replace('_', '-'), color=rgb, linewidth=LINE_WIDTH)
+            line.set_animated(True)
+            self.lines[node] = line
+            self.blit.lines.append(line)
+            self.ax.legend(loc='upper right')
+            self.blit.background = None  # the legend is part of the cached background
+        return self.lines[node]
+
+    def draw(self, series, alarmed):
+        """series is {node: (wall-clock epoch ms, values)}; alarmed is a set of node names."""
+        for node, (times, values) in series.items():
+            if not len(times):
+                continue
+            line = self.line(node)
+            set_series(line, times, values)
+            line.set_linewidth(ALARM_LINE_WIDTH if node in alarmed else LINE_WIDTH)
+        if self.lines:
+            self.blit.update()
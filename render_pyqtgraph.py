@@ -0,0 +1,41 @@
+import pyqtgraph as pg
+from series_store import unix_offset_ms
+
+PEN_WIDTH = 1
+ALARM_PEN_WIDTH = 4
+
+
+class Renderer:
+    """pyqtgraph panel: one persistent curve per node, refreshed with setData()."""
+
+    def __init__(self, title, ylabel, color):
+        self.color = color
+        self.widget = pg.PlotWidget(title=title, axisItems={'bottom': pg.DateAxisItem()})
+        self.widget.setLabel('left', ylabel)
+        self.widget.setLabel('bottom', 'Timestamp')
+        self.widget.addLegend()
+        self.widget.showGrid(x=True, y=True)
+        # Only draw what is visible, and decimate when there are more points than pixels
+        self.widget.setClipToView(True)
+        self.widget.setDownsampling(auto=True, mode='peak')
+        self.curves = {}
+
+    def curve(self, node):
+        if node not in self.curves:
+            pen = pg.mkPen(self.color(len(self.curves)), width=PEN_WIDTH)
+            self.curves[node] = self.widget.plot([], [], pen=pen, name=node.replace('_', '-'), skipFiniteCheck=True)
+        return self.curves[node]
+
+    def draw(self, series, alarmed):
+        """series is {node: (wall-clock epoch ms, values)}; alarmed is a set of node names."""
+        for node, (times, values) in series.items():
+            if not len(times):
+                continue
+            curve = self.curve(node)
+            curve.setData((times + unix_offset_ms(times[-1])) / 1000.0, values)
+
+            width = ALARM_PEN_WIDTH if node in alarmed else PEN_WIDTH
+            pen = pg.mkPen(curve.opts['pen'])
+            if pen.width() != width:
+                pen.setWidth(width)
+                curve.setPen(pen)
@@ -0,0 +1,69 @@
+from PySide6.QtCharts import QChart, QChartView, QLineSeries, QDateTimeAxis, QValueAxis
+from PySide6.QtCore import Qt, QPointF, QDateTime
+from PySide6.QtGui import QColor, QPainter, QPen
+from series_store import unix_offset_ms
+
+LINE_WIDTH = 1.5
+ALARM_LINE_WIDTH = 4.0
+USE_OPENGL = False  # let Qt draw the series with OpenGL; helps with many nodes where a GL context is available
+
+
+class Renderer:
+    """QtCharts panel: one QLineSeries per node, refreshed with a single replace() per tick."""
+
+    def __init__(self, title, ylabel, color):
+        self.color = color
+        self.chart = QChart()
+        self.chart.setTitle(title)
+        self.axis_x = QDateTimeAxis()
+        self.axis_x.setTickCount(7)
+        self.axis_x.setFormat("hh:mm:ss")
+        self.axis_x.setTitleText("Timestamp")
+        self.axis_y = QValueAxis()
+        self.axis_y.setTitleText(ylabel)
+        self.chart.addAxis(self.axis_x, Qt.AlignBottom)
+        self.chart.addAxis(self.axis_y, Qt.AlignLeft)
+        self.chart.legend().setAlignment(Qt.AlignRight)
+        self.widget = QChartView(self.chart)
+        self.widget.setRenderHint(QPainter.Antialiasing)
+        self.lines = {}
+
+    def line(self, node):
+        if node not in self.lines:
+            line = QLineSeries()
+            line.setName(node.replace('_', '-'))
+            line.setUseOpenGL(USE_OPENGL)
+            self.chart.addSeries(line)
+            line.attachAxis(self.axis_x)
+            line.attachAxis(self.axis_y)
+            line.setPen(QPen(QColor(*self.color(len(self.lines))), LINE_WIDTH))
+            self.lines[node] = line
+        return self.lines[node]
+
+    def draw(self, series, alarmed):
+        """series is {node: (wall-clock epoch ms, values)}; alarmed is a set of node names."""
+        t_min = t_max = y_min = y_max = None
+        for node, (times, values) in series.items():
+            if not len(times):
+                continue
+            line = self.line(node)
+            unix_ms = times + unix_offset_ms(times[-1])
+            # Replacing the whole point list is one model reset instead of an append/remove per point
+            line.replace([QPointF(t, v) for t, v in zip(unix_ms.tolist(), values.tolist())])
+
+            width = ALARM_LINE_WIDTH if node in alarmed else LINE_WIDTH
+            if line.pen().widthF() != width:
+                pen = line.pen()
+                pen.setWidthF(width)
+                line.setPen(pen)
+
+            t_min = unix_ms[0] if t_min is None else min(t_min, unix_ms[0])
+            t_max = unix_ms[-1] if t_max is None else max(t_max, unix_ms[-1])
+            y_min = values.min() if y_min is None else min(y_min, values.min())
+            y_max = values.max() if y_max is None else max(y_max, values.max())
+
+        if t_min is None:
+            return
+        self.axis_x.setRange(QDateTime.fromMSecsSinceEpoch(int(t_min)), QDateTime.fromMSecsSinceEpoch(int(t_max)))
+        margin = 0.05 * (y_max - y_min) or 0.5
+        self.axis_y.setRange(float(y_min - margin), float(y_max + margin))
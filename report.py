@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+import datetime
+import argparse
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import db
+import archive
+import tscodec
+from export import stream_node, stream_archived, list_nodes
+from series_store import datetime_to_ms
+from trend_figure import trend_axes, node_lines, set_series
+
+# Report panels, top to bottom, as in the pGraph window: (table, value column, y label)
+PANELS = [
+    ("temperature", "temperature", "Temperature"),
+    ("humidity", "humidity", "Humidity"),
+]
+
+# Production lines and their nodes; each line gets one report with all of its nodes
+LINES = {
+    "Cooler": ['Airflow', 'Cooler_Ambient', 'Cooler_Discharge'],
+}
+
+REPORT_DIR = "reports"
+FIGURE_SIZE = (18, 9)  # inches; at DPI this is the 1800x900 pGraph window
+DPI = 100
+IN_FLIGHT_PER_WORKER = 2  # fetched days queued per worker before fetching waits for rendering
+SHIP_ENCODED = True  # send series to the workers as tscodec blocks, about a third of the pickled arrays
+
+
+def fetch_day(conn, table, column, node, start, end, include_archive=False):
+    """(wall-clock epoch ms int64, float32 values) of one node between start and end, oldest first."""
+    sources = [stream_node(conn, table, column, node, start, end)]
+    if include_archive:
+        sources.insert(0, stream_archived(table, node, start, end))  # archived days are older
+    times, values = [], []
+    for source in sources:
+        for rows in source:
+            times.append(np.fromiter((datetime_to_ms(dTime) for dTime, _ in rows), dtype=np.int64, count=len(rows)))
+            values.append(np.fromiter((value for _, value in rows), dtype=np.float32, count=len(rows)))
+    if not times:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(times), np.concatenate(values)
+
+
+def render_report(path, title, series):
+    """Draws one report with Agg and writes it to path (PNG or PDF by extension).
+
+    Runs in a worker process. series is {table: {node: (times_ms, values)}}, or
+    {table: {node: tscodec block}}. Returns (path, build seconds, draw and write seconds).
+    """
+    start = time.perf_counter()
+    figure = Figure(figsize=FIGURE_SIZE, dpi=DPI)
+    FigureCanvasAgg(figure)
+    figure.suptitle(title)
+    nodes = sorted(set().union(*(panel.keys() for panel in series.values())))  # same colors in every panel
+    for i, (table, _, ylabel) in enumerate(PANELS):
+        ax = trend_axes(figure, ylabel, len(PANELS) * 100 + 11 + i)
+        for node, line in node_lines(ax, nodes).items():
+            if node in series.get(table, {}):
+                data = series[table][node]
+                set_series(line, *(tscodec.decode(data) if isinstance(data, bytes) else data))
+        ax.relim()
+        ax.autoscale_view()
+    figure.subplots_adjust(top=0.93, hspace=0.2)
+    built = time.perf_counter()
+
+    # Written under a temporary name, so a report that exists is always complete
+    fmt = os.path.splitext(path)[1][1:]
+    figure.savefig(path + ".tmp", format=fmt)
+    os.replace(path + ".tmp", path)
+    return path, built - start, time.perf_counter() - built
+
+
+def report_nodes(conn, include_archive=False):
+    nodes = set()
+    for table, _, _ in PANELS:
+        nodes.update(list_nodes(conn, table))
+        if include_archive:
+            nodes.update(archive.archived_nodes(table))
+    return sorted(nodes)
+
+
+def generate(conn, day, nodes, lines=LINES, out_dir=REPORT_DIR, fmt="png", workers=None, include_archive=False):
+    """Renders one report per node and per line for `day` into out_dir/<day>/. Returns the stage timings.
+
+    The main process fetches one node at a time while a process pool renders; at
+    most IN_FLIGHT_PER_WORKER fetched days per worker wait for a free worker, so
+    memory stays bounded. Each report is written as soon as it is rendered.
+    """
+    workers = workers or os.cpu_count()
+    start = datetime.datetime.combine(day, datetime.time())
+    end = start + datetime.timedelta(days=1)
+    directory = os.path.join(out_dir, f"{day:%Y-%m-%d}")
+    os.makedirs(directory, exist_ok=True)
+
+    line_nodes = {node for members in lines.values() for node in members}
+    kept = {}  # days of line members, until the line reports are submitted
+    stages = {"fetch": 0.0, "build": 0.0, "draw": 0.0}
+    counts = {"rows": 0, "reports": 0, "failed": 0}
+    started = time.perf_counter()
+    pending = set()
+
+    def collect(futures):
+        for future in futures:
+            try:
+                path, build, draw = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"Report failed: {e}", file=sys.stderr)
+                continue
+            stages["build"] += build
+            stages["draw"] += draw
+            counts["reports"] += 1
+            print(f"{path} ({counts['reports']} written, {time.perf_counter() - started:.1f} s)", file=sys.stderr)
+
+    def submit(pool, name, title, series):
+        nonlocal pending
+        path = os.path.join(directory, f"{quote(name, safe='')}.{fmt}")
+        if SHIP_ENCODED:
+            series = {table: {node: tscodec.encode(*arrays) for node, arrays in panel.items()}
+                      for table, panel in series.items()}
+        pending.add(pool.submit(render_report, path, title, series))
+        while len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for node in sorted(set(nodes) | line_nodes):
+            fetch_start = time.perf_counter()
+            series = {table: {node: fetch_day(conn, table, column, node, start, end, include_archive)}
+                      for table, column, _ in PANELS}
+            stages["fetch"] += time.perf_counter() - fetch_start
+            rows = sum(len(panel[node][0]) for panel in series.values())
+            counts["rows"] += rows
+            if not rows:
+                continue
+            if node in line_nodes:
+                kept[node] = series
+            if node in nodes:
+                submit(pool, f"node_{node}", f"{node} - {day}", series)
+
+        for name, members in lines.items():
+            series = {table: {node: kept[node][table][node] for node in members if node in kept}
+                      for table, _, _ in PANELS}
+            if any(series.values()):
+                submit(pool, f"line_{name}", f"Line {name} - {day}", series)
+        collect(wait(pending).done)
+
+    elapsed = time.perf_counter() - started
+    print(f"{counts['reports']} reports ({counts['failed']} failed, {counts['rows']} rows) in {elapsed:.1f} s "
+          f"with {workers} workers ({counts['reports'] / elapsed if elapsed > 0 else 0:.1f} reports/sec); "
+          f"fetch {stages['fetch']:.1f} s, build {stages['build']:.1f} s, draw+write {stages['draw']:.1f} s "
+          f"(build and draw summed over workers)", file=sys.stderr)
+    return dict(stages, total=elapsed, **counts)
+
+
+def parse_line(text):
+    name, _, members = text.partition("=")
+    if not members:
+        raise argparse.ArgumentTypeError("expected NAME=node1,node2,...")
+    return name, members.split(",")
+
+
+if __name__ == "__main__":
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Render daily trend reports per node and per line, without a display.")
+    parser.add_argument("day", nargs="?", type=datetime.date.fromisoformat, default=yesterday,
+                        help="day to report, e.g. 2024-01-31 (default: yesterday)")
+    parser.add_argument("-o", "--output", default=REPORT_DIR, help="reports go to OUTPUT/<day>/")
+    parser.add_argument("--format", choices=["png", "pdf"], default="png")
+    parser.add_argument("--node", action="append", help="repeatable; default: every node with readings")
+    parser.add_argument("--line", action="append", type=parse_line,
+                        help="NAME=node1,node2,...; repeatable; replaces the lines configured in report.py")
+    parser.add_argument("--workers", type=int, help="rendering processes (default: one per core)")
+    parser.add_argument("--archive", action="store_true", help="include days moved out by archive.py")
+    args = parser.parse_args()
+
+    conn = db.connect_reader()
+    try:
+        nodes = args.node or report_nodes(conn, args.archive)
+        lines = dict(args.line) if args.line else LINES
+        generate(conn, args.day, nodes, lines, args.output, args.format, args.workers, args.archive)
+    except KeyboardInterrupt:
+        print("Report generation stopped by user.", file=sys.stderr)
+    finally:
+        conn.close()
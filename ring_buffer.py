@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity NumPy buffer with O(1) append and zero-copy views of the newest values.
+
+    Every value is written twice, at i and i + capacity, so the newest n values always
+    form one contiguous slice of the backing array and can be handed out as a view.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=dtype)
+        self.end = 0  # next write position in [0, capacity)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, value):
+        self.data[self.end] = value
+        self.data[self.end + self.capacity] = value
+        self.end = (self.end + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        if len(values) > self.capacity:
+            values = values[-self.capacity:]
+        n = len(values)
+        if n == 0:
+            return
+        index = (self.end + np.arange(n)) % self.capacity
+        self.data[index] = values
+        self.data[index + self.capacity] = values
+        self.end = (self.end + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def view(self, n=None):
+        """Returns the newest n values (all of them by default), oldest first, without copying."""
+        if n is None or n > self.size:
+            n = self.size
+        stop = self.end + self.capacity
+        return self.data[stop - n:stop]
+
+    def last(self):
+        return self.data[self.end + self.capacity - 1] if self.size else None
+
+    def clear(self):
+        self.end = 0
+        self.size = 0
@@ -0,0 +1,155 @@
+import sys
+import time
+import datetime
+import mariadb
+import db
+from schema import TABLES
+
+# Rollup resolutions: table suffix, bucket width in seconds, SQL expression for the bucket start
+RESOLUTIONS = [
+    ("1m", 60, "TIMESTAMP(DATE(dTime), MAKETIME(HOUR(dTime), MINUTE(dTime), 0))"),
+    ("1h", 3600, "TIMESTAMP(DATE(dTime), MAKETIME(HOUR(dTime), 0, 0))"),
+    ("1d", 86400, "TIMESTAMP(DATE(dTime))"),
+]
+
+ROLLUP_INTERVAL = 30  # seconds between incremental runs
+SETTLE_SECONDS = 10  # rows younger than this are left for the next run, so late inserts are not skipped
+
+
+def rollup_table(table, suffix):
+    return f"{table}_{suffix}"
+
+
+def create_tables(conn):
+    """Creates the rollup and watermark tables if they do not exist yet."""
+    cursor = conn.cursor()
+    try:
+        for table in TABLES:
+            for suffix, _, _ in RESOLUTIONS:
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {rollup_table(table, suffix)} ("
+                               "bucket DATETIME NOT NULL, "
+                               "node VARCHAR(64) NOT NULL, "
+                               "vmin FLOAT NOT NULL, "
+                               "vmax FLOAT NOT NULL, "
+                               "vsum DOUBLE NOT NULL, "
+                               "cnt INT UNSIGNED NOT NULL, "
+                               "PRIMARY KEY (node, bucket))")
+        cursor.execute("CREATE TABLE IF NOT EXISTS rollup_watermark ("
+                       "source VARCHAR(64) NOT NULL PRIMARY KEY, "
+                       "last_dTime DATETIME(6) NOT NULL)")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def get_watermark(cursor, table):
+    cursor.execute("SELECT last_dTime FROM rollup_watermark WHERE source = ?", (table,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def merge_range(cursor, table, lo, hi):
+    """Aggregates raw rows with lo < dTime <= hi into every resolution, merging into existing buckets."""
+    column = TABLES[table]
+    lower = "dTime > ?" if lo is not None else "1 = 1"
+    params = (lo, hi) if lo is not None else (hi,)
+    for suffix, _, bucket_expr in RESOLUTIONS:
+        cursor.execute(f"INSERT INTO {rollup_table(table, suffix)} (bucket, node, vmin, vmax, vsum, cnt) "
+                       f"SELECT {bucket_expr} AS bucket, node, MIN({column}), MAX({column}), "
+                       f"SUM({column}), COUNT(*) FROM {table} "
+                       f"WHERE {lower} AND dTime <= ? GROUP BY bucket, node "
+                       "ON DUPLICATE KEY UPDATE vmin = LEAST(vmin, VALUES(vmin)), "
+                       "vmax = GREATEST(vmax, VALUES(vmax)), "
+                       "vsum = vsum + VALUES(vsum), cnt = cnt + VALUES(cnt)", params)
+
+
+def update_rollups(conn, table, now=None):
+    """Folds the raw rows added since the watermark into the rollups. Returns the new watermark.
+
+    Each raw row is aggregated exactly once: the merge and the watermark move commit together.
+    """
+    if now is None:
+        now = datetime.datetime.now()
+    cursor = conn.cursor()
+    try:
+        lo = get_watermark(cursor, table)
+        cursor.execute(f"SELECT MAX(dTime) FROM {table}")
+        latest = cursor.fetchone()[0]
+        if latest is None:
+            return lo
+        hi = min(latest, now - datetime.timedelta(seconds=SETTLE_SECONDS))
+        if lo is not None and hi <= lo:
+            return lo
+
+        merge_range(cursor, table, lo, hi)
+        cursor.execute("REPLACE INTO rollup_watermark (source, last_dTime) VALUES (?, ?)", (table, hi))
+        conn.commit()
+        return hi
+    except mariadb.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def rebuild(conn, table, since):
+    """Recomputes every rollup bucket from `since` up to the watermark, e.g. after a bulk backfill."""
+    cursor = conn.cursor()
+    try:
+        hi = get_watermark(cursor, table)
+        if hi is None:
+            return
+        day_start = datetime.datetime.combine(since.date(), datetime.time())
+        for suffix, _, _ in RESOLUTIONS:
+            cursor.execute(f"DELETE FROM {rollup_table(table, suffix)} WHERE bucket >= ?", (day_start,))
+        # The coarsest bucket touched starts at midnight, so re-aggregate from there
+        merge_range(cursor, table, day_start - datetime.timedelta(microseconds=1), hi)
+        conn.commit()
+    except mariadb.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def choose_rollup(bucket):
+    """Coarsest rollup whose buckets are no wider than `bucket` seconds, as (suffix, seconds).
+
+    Returns None when only raw rows are fine enough.
+    """
+    best = None
+    for suffix, seconds, _ in RESOLUTIONS:
+        if seconds <= bucket:
+            best = (suffix, seconds)
+    return best
+
+
+def mainLoop():
+    try:
+        conn = db.connect_writer()
+        create_tables(conn)
+        while True:
+            for table in TABLES:
+                start = time.perf_counter()
+                watermark = update_rollups(conn, table)
+                print(f"{table}: rolled up to {watermark} in {1000 * (time.perf_counter() - start):.1f} ms")
+            time.sleep(ROLLUP_INTERVAL)
+    except mariadb.Error as e:
+        print(f"Database error: {e}")
+    except KeyboardInterrupt:  # Handle Ctrl+C gracefully
+        print("Script stopped by user.")
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "rebuild":
+        # rollup.py rebuild YYYY-MM-DD
+        conn = db.connect_writer()
+        create_tables(conn)
+        for table in TABLES:
+            rebuild(conn, table, datetime.datetime.fromisoformat(sys.argv[2]))
+        conn.close()
+    else:
+        mainLoop()
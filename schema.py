@@ -0,0 +1,253 @@
+import sys
+import datetime
+import argparse
+import db
+from incremental_fetch import WatermarkFetcher
+
+# Reading tables and their value column
+TABLES = {
+    "temperature": "temperature",
+    "humidity": "humidity",
+}
+
+PARTITION_AHEAD_DAYS = 7  # daily partitions kept ready past today
+RETAIN_DAYS = None  # partitions older than this many days are dropped by rotate; None keeps everything
+
+
+def table_exists(cursor, table):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.TABLES "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ?", (table,))
+    return cursor.fetchone()[0] > 0
+
+
+def index_columns(cursor, table, index):
+    cursor.execute("SELECT COLUMN_NAME FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? AND INDEX_NAME = ? "
+                   "ORDER BY SEQ_IN_INDEX", (table, index))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_tables(cursor):
+    """Readings clustered by (node, dTime): a node's time range is one contiguous range scan."""
+    for table, column in TABLES.items():
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ("
+                       "node VARCHAR(64) NOT NULL, "
+                       "dTime DATETIME(3) NOT NULL, "
+                       f"{column} FLOAT NOT NULL, "
+                       "PRIMARY KEY (node, dTime), "
+                       "KEY idx_dTime (dTime)) ENGINE=InnoDB")
+
+
+def add_keys(cursor):
+    """Brings tables created before this tool to the same keys and column types.
+
+    ALTER IGNORE drops exact (node, dTime) duplicates, which the primary key cannot hold.
+    """
+    for table, column in TABLES.items():
+        changes = ["MODIFY node VARCHAR(64) NOT NULL",
+                   "MODIFY dTime DATETIME(3) NOT NULL",
+                   f"MODIFY {column} FLOAT NOT NULL"]
+        primary = index_columns(cursor, table, "PRIMARY")
+        if primary != ["node", "dTime"]:
+            if primary:
+                changes.append("DROP PRIMARY KEY")
+            changes.append("ADD PRIMARY KEY (node, dTime)")
+        changes.append("ADD INDEX IF NOT EXISTS idx_dTime (dTime)")
+        cursor.execute(f"ALTER IGNORE TABLE {table} " + ", ".join(changes))
+
+
+def drop_redundant_indexes(cursor):
+    """Single-column node indexes are a prefix of the primary key and only cost inserts."""
+    for table in TABLES:
+        cursor.execute("SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? AND INDEX_NAME <> 'PRIMARY'",
+                       (table,))
+        for (index,) in cursor.fetchall():
+            if index_columns(cursor, table, index) == ["node"]:
+                cursor.execute(f"ALTER TABLE {table} DROP INDEX {index}")
+
+
+# Applied in order, each at most once; append new steps, never edit applied ones
+MIGRATIONS = [
+    (1, "reading tables with (node, dTime) primary key", create_tables),
+    (2, "keys and compact types on pre-existing tables", add_keys),
+    (3, "drop indexes covered by the primary key", drop_redundant_indexes),
+]
+
+
+def current_version(cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS schema_version ("
+                   "version INT NOT NULL PRIMARY KEY, "
+                   "description VARCHAR(255) NOT NULL, "
+                   "applied DATETIME NOT NULL)")
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def migrate(conn):
+    """Applies the migrations newer than the recorded version. Returns the new version."""
+    cursor = conn.cursor()
+    try:
+        version = current_version(cursor)
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+            print(f"Applying migration {number}: {description}")
+            step(cursor)
+            # DDL commits implicitly in MariaDB, so a failed step is simply re-run next time
+            cursor.execute("INSERT INTO schema_version (version, description, applied) VALUES (?, ?, ?)",
+                           (number, description, datetime.datetime.now()))
+            conn.commit()
+            version = number
+        return version
+    finally:
+        cursor.close()
+
+
+# Partitioning
+
+def partition_name(day):
+    return f"p{day:%Y%m%d}"
+
+
+def partitions(cursor, table):
+    """Returns [(name, upper bound expression)] of a table's partitions, oldest first."""
+    cursor.execute("SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? AND PARTITION_NAME IS NOT NULL "
+                   "ORDER BY PARTITION_ORDINAL_POSITION", (table,))
+    return cursor.fetchall()
+
+
+def daily_partitions(first_day, last_day):
+    days = (last_day - first_day).days + 1
+    return [f"PARTITION {partition_name(first_day + datetime.timedelta(days=i))} "
+            f"VALUES LESS THAN ('{first_day + datetime.timedelta(days=i + 1):%Y-%m-%d}')"
+            for i in range(days)]
+
+
+def partition_tables(conn, ahead_days=PARTITION_AHEAD_DAYS):
+    """Converts unpartitioned reading tables to daily RANGE partitions on dTime.
+
+    Rebuilds the table, so run it in a maintenance window on large tables. Rows
+    older than the first partition boundary land in the first partition.
+    """
+    cursor = conn.cursor()
+    try:
+        today = datetime.date.today()
+        for table in TABLES:
+            if partitions(cursor, table):
+                continue
+            cursor.execute(f"SELECT MIN(dTime) FROM {table}")
+            oldest = cursor.fetchone()[0]
+            first_day = oldest.date() if oldest is not None else today
+            parts = daily_partitions(first_day, today + datetime.timedelta(days=ahead_days))
+            parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+            print(f"Partitioning {table} into {len(parts)} partitions")
+            cursor.execute(f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS(dTime) ({', '.join(parts)})")
+    finally:
+        cursor.close()
+
+
+def rotate_partitions(conn, ahead_days=PARTITION_AHEAD_DAYS, retain_days=RETAIN_DAYS):
+    """Adds daily partitions up to ahead_days past today and drops those older than retain_days.
+
+    New partitions are split off the empty pmax partition, which is a metadata-only
+    change. Dropping a partition removes a day of data in constant time.
+    """
+    cursor = conn.cursor()
+    try:
+        today = datetime.date.today()
+        for table in TABLES:
+            existing = [name for name, _ in partitions(cursor, table)]
+            if not existing:
+                continue
+            days = [datetime.datetime.strptime(name[1:], "%Y%m%d").date()
+                    for name in existing if name != "pmax"]
+            last_day = max(days) if days else today - datetime.timedelta(days=1)
+            until = today + datetime.timedelta(days=ahead_days)
+            if last_day < until:
+                parts = daily_partitions(last_day + datetime.timedelta(days=1), until)
+                parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+                cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({', '.join(parts)})")
+            if retain_days is not None:
+                cutoff = today - datetime.timedelta(days=retain_days)
+                expired = [partition_name(day) for day in days if day < cutoff]
+                # Keep at least one range partition ahead of pmax
+                expired = expired[:len(days) - 1]
+                if expired:
+                    print(f"Dropping {len(expired)} partitions of {table} before {cutoff}")
+                    cursor.execute(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}")
+    finally:
+        cursor.close()
+
+
+# Index check
+
+def viewer_queries(table, column):
+    """(label, sql, params) for every query shape the viewers send, with sample parameters."""
+    now = datetime.datetime.now()
+    fetcher = WatermarkFetcher(table, column, nodes=["n1", "n2"])
+    backfill_sql, backfill_params = fetcher.build_query(["n1", "n2"])
+    fetcher.watermarks = {"n1": now, "n2": now}
+    delta_sql, delta_params = fetcher.build_query(["n1", "n2"])
+    return [
+        ("backfill (LiveSource / WatermarkFetcher)", backfill_sql, backfill_params),
+        ("delta (LiveSource / WatermarkFetcher)", delta_sql, delta_params),
+        ("node discovery (aggregator WatermarkFetcher)", f"SELECT DISTINCT node FROM {table}", ()),
+        ("history chunk (history.load_chunk)",
+         f"SELECT dTime, {column} FROM {table} WHERE node = ? AND dTime >= ? AND dTime < ? ORDER BY dTime",
+         ("n1", now - datetime.timedelta(hours=1), now)),
+    ]
+
+
+def check_queries(conn):
+    """EXPLAINs the viewer queries; returns a list of problems (empty when every read is an index seek)."""
+    problems = []
+    cursor = conn.cursor()
+    try:
+        for table, column in TABLES.items():
+            for label, sql, params in viewer_queries(table, column):
+                cursor.execute("EXPLAIN " + sql, params)
+                names = [d[0].lower() for d in cursor.description]
+                for row in cursor.fetchall():
+                    plan = dict(zip(names, row))
+                    if plan.get("table") != table:
+                        continue  # derived tables are the already-limited subquery results
+                    extra = plan.get("extra") or ""
+                    if plan.get("type") == "ALL" or "filesort" in extra:
+                        problems.append(f"{table}: {label}: type={plan.get('type')} "
+                                        f"key={plan.get('key')} extra={extra}")
+    finally:
+        cursor.close()
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and maintain the sensor database schema.")
+    parser.add_argument("command", choices=["migrate", "partition", "rotate", "check", "status"])
+    parser.add_argument("--ahead", type=int, default=PARTITION_AHEAD_DAYS, help="days of partitions to keep ready")
+    parser.add_argument("--retain", type=int, default=RETAIN_DAYS, help="drop partitions older than this many days")
+    args = parser.parse_args()
+
+    conn = db.connect_writer()
+    try:
+        if args.command == "migrate":
+            print(f"Schema at version {migrate(conn)}")
+        elif args.command == "partition":
+            partition_tables(conn, args.ahead)
+        elif args.command == "rotate":
+            rotate_partitions(conn, args.ahead, args.retain)
+        elif args.command == "check":
+            problems = check_queries(conn)
+            for problem in problems:
+                print(problem)
+            print("All viewer queries use an index" if not problems else f"{len(problems)} queries scan or sort")
+            sys.exit(1 if problems else 0)
+        else:
+            cursor = conn.cursor()
+            print(f"Schema at version {current_version(cursor)} of {MIGRATIONS[-1][0]}")
+            for table in TABLES:
+                print(f"{table}: {len(partitions(cursor, table))} partitions")
+            cursor.close()
+    finally:
+        conn.close()
@@ -0,0 +1,108 @@
+import datetime
+import numpy as np
+from ring_buffer import RingBuffer
+
+DEFAULT_CAPACITY = 7200  # 4 hours of readings at a 2 s cadence
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_ONE_MS = datetime.timedelta(milliseconds=1)
+
+
+def datetime_to_ms(dTime):
+    """Converts a naive dTime to int epoch milliseconds, keeping the wall-clock reading.
+
+    Values viewed back as datetime64[ms] show the same time of day as the database.
+    """
+    return (dTime - _EPOCH) // _ONE_MS
+
+
+def ms_to_datetime(ms):
+    return _EPOCH + datetime.timedelta(milliseconds=int(ms))
+
+
+def unix_offset_ms(ms):
+    """Milliseconds to add to a wall-clock epoch-ms value to get the Unix time it stands for.
+
+    Charts whose time axis formats Unix time in the local zone (QtCharts, pyqtgraph)
+    need it to show the same time of day as the database.
+    """
+    return round(ms_to_datetime(ms).timestamp() * 1000) - int(ms)
+
+
+class Series:
+    """Epoch-ms timestamps (int64) and readings (float32) of one (metric, node) pair."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.times = RingBuffer(capacity, np.int64)
+        self.values = RingBuffer(capacity, np.float32)
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, time_ms, value):
+        self.times.append(time_ms)
+        self.values.append(value)
+
+    def extend(self, times_ms, values):
+        self.times.extend(times_ms)
+        self.values.extend(values)
+
+    def merge(self, times_ms, values):
+        """Adds readings that may be older than the newest one, keeping the series sorted by time."""
+        times = np.concatenate((self.times.view(), np.asarray(times_ms, dtype=np.int64)))
+        merged = np.concatenate((self.values.view(), np.asarray(values, dtype=np.float32)))
+        order = np.argsort(times, kind="stable")
+        self.times.clear()
+        self.values.clear()
+        self.extend(times[order], merged[order])
+
+    def window(self, n=None):
+        """Returns (times, values) views of the newest n readings, oldest first."""
+        return self.times.view(n), self.values.view(n)
+
+    def since(self, start_ms):
+        """Returns (times, values) views of the readings at or after start_ms."""
+        times = self.times.view()
+        first = np.searchsorted(times, start_ms, side="left")
+        return times[first:], self.values.view()[first:]
+
+    def last_time(self):
+        return self.times.last()
+
+
+class SeriesStore:
+    """In-memory time series keyed by (metric, node), each backed by fixed-capacity NumPy arrays."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.series = {}
+
+    def get(self, metric, node):
+        """Returns the series of (metric, node), creating an empty one if needed."""
+        key = (metric, node)
+        if key not in self.series:
+            self.series[key] = Series(self.capacity)
+        return self.series[key]
+
+    def __contains__(self, key):
+        return key in self.series
+
+    def nodes(self, metric):
+        return [node for m, node in self.series if m == metric]
+
+    def append(self, metric, node, dTime, value):
+        self.get(metric, node).append(datetime_to_ms(dTime), value)
+
+    def extend_rows(self, metric, node, rows):
+        """Appends [(dTime, value), ...] rows, oldest first."""
+        if not rows:
+            return
+        times = np.fromiter((datetime_to_ms(dTime) for dTime, _ in rows), dtype=np.int64, count=len(rows))
+        values = np.fromiter((value for _, value in rows), dtype=np.float32, count=len(rows))
+        self.get(metric, node).extend(times, values)
+
+    def window(self, metric, node, n=None):
+        """Returns (times, values) views of the newest n readings of (metric, node)."""
+        if (metric, node) not in self.series:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return self.series[(metric, node)].window(n)
@@ -0,0 +1,199 @@
+import os
+import time
+import struct
+import datetime
+import mariadb
+
+# Replay uses INSERT IGNORE so a batch replayed twice (a crash between its commit
+# and the checkpoint) is skipped by the unique key on (node, dTime) instead of duplicated
+REPLAY_QUERIES = {
+    "temperature": "INSERT IGNORE INTO temperature (dTime, node, temperature) VALUES (?, ?, ?)",
+    "humidity": "INSERT IGNORE INTO humidity (dTime, node, humidity) VALUES (?, ?, ?)",
+}
+METRIC_IDS = {"temperature": 0, "humidity": 1}
+METRIC_NAMES = {v: k for k, v in METRIC_IDS.items()}
+
+SPOOL_DIR = "spool"
+SEGMENT_BYTES = 16 * 1024 * 1024  # a new segment file is started past this size
+REPLAY_BATCH = 5000  # rows per replay transaction
+REPLAY_RECORD_BYTES = 64  # bytes read per row of a replay batch; a longer record makes that read grow
+FSYNC_INTERVAL = 1.0  # seconds between fsyncs; 0 syncs every append, None leaves it to the OS
+
+# Record: metric id, wall-clock microseconds since 1970-01-01, value, node name length; then the node name
+RECORD = struct.Struct("<BqdH")
+_EPOCH = datetime.datetime(1970, 1, 1)
+_US = datetime.timedelta(microseconds=1)
+
+
+def encode_record(metric, node_name, dTime, value):
+    node = node_name.encode()
+    return RECORD.pack(METRIC_IDS[metric], (dTime - _EPOCH) // _US, value, len(node)) + node
+
+
+def decode_records(data, limit=None):
+    """Yields (end offset, metric, node, dTime, value) for the complete records in data."""
+    offset = 0
+    count = 0
+    while offset + RECORD.size <= len(data) and (limit is None or count < limit):
+        metric, us, value, length = RECORD.unpack_from(data, offset)
+        end = offset + RECORD.size + length
+        if end > len(data):
+            break  # torn tail of a segment written when the process died
+        node = bytes(data[offset + RECORD.size:end]).decode()
+        yield end, METRIC_NAMES[metric], node, _EPOCH + datetime.timedelta(microseconds=us), value
+        offset = end
+        count += 1
+
+
+class Spool:
+    """Append-only on-disk queue of readings that could not be written to MariaDB.
+
+    Readings go into numbered segment files in `directory`. replay() writes them
+    back in order, in batched transactions, and records how far it got in a
+    checkpoint file, so a restart continues where the last replay stopped. Each
+    run appends to a fresh segment, so a record torn by a crash is never followed
+    by new data in the same file.
+    """
+
+    def __init__(self, directory=SPOOL_DIR, fsync_interval=FSYNC_INTERVAL, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.checkpoint_path = os.path.join(directory, "checkpoint")
+        self.checkpoint = self.read_checkpoint()
+        segments = self.segments()
+        self.active_seq = (segments[-1] if segments else self.checkpoint[0]) + 1
+        self.file = None
+        self.last_sync = time.monotonic()
+        self.rows_spooled = 0
+        self.rows_replayed = 0
+        self.pending_bytes = self.scan_pending()  # kept up to date by append() and replay()
+
+    def segment_path(self, seq):
+        return os.path.join(self.directory, f"{seq:08d}.spool")
+
+    def segments(self):
+        return sorted(int(name[:-6]) for name in os.listdir(self.directory) if name.endswith(".spool"))
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                seq, offset = f.read().split()
+            return int(seq), int(offset)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def write_checkpoint(self, seq, offset):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{seq} {offset}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        self.checkpoint = (seq, offset)
+
+    def pending(self):
+        """Bytes of spooled readings not yet replayed."""
+        return self.pending_bytes
+
+    def scan_pending(self):
+        """pending() from the segment files on disk."""
+        seq, offset = self.checkpoint
+        total = 0
+        for s in self.segments():
+            if s >= seq:
+                total += os.path.getsize(self.segment_path(s)) - (offset if s == seq else 0)
+        return total
+
+    def append(self, metric, rows):
+        """Spools (dTime, node, value) rows of one metric."""
+        if not rows:
+            return
+        if self.file is None:
+            self.file = open(self.segment_path(self.active_seq), "ab")
+        data = b"".join(encode_record(metric, node, dTime, value) for dTime, node, value in rows)
+        self.file.write(data)
+        self.file.flush()
+        self.pending_bytes += len(data)
+        self.rows_spooled += len(rows)
+        if self.fsync_interval is not None and time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+        if self.file.tell() >= self.segment_bytes:
+            self.close()
+            self.active_seq += 1
+
+    def sync(self):
+        if self.file is not None:
+            os.fsync(self.file.fileno())
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def replay(self, conn, batch_rows=REPLAY_BATCH, max_rows=None):
+        """Writes spooled readings to the database in order. Returns the number of rows replayed.
+
+        max_rows bounds the work done in one call (rounded up to whole batches), so
+        a long backlog can be drained between readings; each call reads the segment
+        from the checkpoint on, one batch at a time. A mariadb.Error rolls back the
+        current batch and propagates; the checkpoint still points at the last
+        committed batch.
+        """
+        if self.file is not None:
+            self.sync()  # nothing is checkpointed past what has reached the disk
+        replayed = 0
+        seq, offset = self.checkpoint
+        for s in self.segments():
+            if s < seq:
+                os.remove(self.segment_path(s))  # left behind by a crash after its checkpoint
+                continue
+            # Only about one batch of the segment is in memory at a time
+            pos = offset if s == seq else 0
+            read_bytes = batch_rows * REPLAY_RECORD_BYTES
+            with open(self.segment_path(s), "rb") as f:
+                while True:
+                    if max_rows is not None and replayed >= max_rows:
+                        return replayed
+                    f.seek(pos)
+                    data = f.read(read_bytes)
+                    rows = {metric: [] for metric in REPLAY_QUERIES}
+                    for end, metric, node, dTime, value in decode_records(data, batch_rows):
+                        rows[metric].append((dTime, node, value))
+                    batch = sum(len(r) for r in rows.values())
+                    if batch == 0:
+                        if len(data) < read_bytes:
+                            break  # end of the segment, or a torn tail
+                        read_bytes *= 2  # one record is longer than the read
+                        continue
+                    self.replay_batch(conn, rows)
+                    pos += end
+                    self.pending_bytes -= end
+                    replayed += batch
+                    self.rows_replayed += batch
+                    self.write_checkpoint(s, pos)
+
+            if s != self.active_seq:
+                # Fully replayed (or only a torn tail is left): the next segment takes over
+                self.pending_bytes -= os.path.getsize(self.segment_path(s)) - pos
+                os.remove(self.segment_path(s))
+                self.write_checkpoint(s + 1, 0)
+            seq, offset = self.checkpoint
+        return replayed
+
+    def replay_batch(self, conn, rows):
+        """Writes {metric: [(dTime, node, value), ...]} in one transaction."""
+        cursor = conn.cursor()
+        try:
+            for metric, metric_rows in rows.items():
+                if metric_rows:
+                    cursor.executemany(REPLAY_QUERIES[metric], metric_rows)
+            conn.commit()
+        except mariadb.Error:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
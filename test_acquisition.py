@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from acquisition import AcquisitionEngine, Source
+
+
+class FixedSource(Source):
+    """Answers after `latency` seconds; raises `error` or sleeps past the timeout on request."""
+
+    def __init__(self, node, period, latency=0.0, error=None, timeout=None):
+        super().__init__(node, period, timeout)
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+
+    async def read(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return {"temperature": 21.5, "humidity": 50}
+
+
+def run_for(engine, seconds):
+    async def main():
+        try:
+            await asyncio.wait_for(engine.run(), seconds)
+        except asyncio.TimeoutError:
+            pass
+    asyncio.run(main())
+
+
+def test_every_source_is_read_on_its_own_period():
+    received = []
+    fast, slow = FixedSource("fast", 0.02), FixedSource("slow", 0.1)
+    engine = AcquisitionEngine([fast, slow], lambda *reading: received.append(reading))
+    run_for(engine, 0.35)
+    assert 12 <= fast.calls <= 19
+    assert 3 <= slow.calls <= 4
+    assert engine.reads == fast.calls + slow.calls
+    assert {(metric, node) for metric, node, _, _ in received} == {
+        ("temperature", "fast"), ("humidity", "fast"), ("temperature", "slow"), ("humidity", "slow")}
+
+
+def test_a_slow_source_does_not_delay_the_others():
+    stuck = FixedSource("stuck", 0.05, latency=0.2, timeout=1.0)
+    healthy = FixedSource("healthy", 0.05)
+    engine = AcquisitionEngine([healthy, stuck], lambda *reading: None)
+    run_for(engine, 0.5)
+    assert healthy.calls >= 8
+    assert stuck.calls <= 3
+    assert engine.skipped > 0  # ticks the stuck source overran are skipped, not bunched up
+
+
+def test_timeouts_and_errors_are_counted():
+    engine = AcquisitionEngine([FixedSource("hung", 0.05, latency=1.0),
+                                FixedSource("broken", 0.05, error=OSError("bus error"))],
+                               lambda *reading: pytest.fail("no reading expected"))
+    run_for(engine, 0.3)
+    assert engine.timeouts >= 3
+    assert engine.errors >= 3
+    assert engine.reads == 0
@@ -0,0 +1,106 @@
+import json
+import time
+import asyncio
+import datetime
+import threading
+import pytest
+import metrics
+from aggregator import Aggregator, AggregatorClient, Publisher, Subscriber
+
+
+class Transport:
+    def get_write_buffer_size(self):
+        return 0
+
+
+class Writer:
+    def __init__(self):
+        self.transport = Transport()
+        self.messages = []
+
+    def write(self, data):
+        self.messages.append(json.loads(data))
+
+    def close(self):
+        pass
+
+
+def aggregator():
+    agg = Aggregator()
+    subscriber = Subscriber(Writer())
+    subscriber.interests["temperature"] = None
+    agg.subscribers.add(subscriber)
+    return agg, subscriber.writer.messages
+
+
+def test_readings_arriving_by_push_and_poll_are_forwarded_once():
+    agg, sent = aggregator()
+    agg.ingest("temperature", "node1", [1000, 2000], [20.0, 21.0])  # pushed
+    agg.ingest("temperature", "node1", [1000, 2000, 3000], [20.0, 21.0, 22.0])  # polled
+    assert [message["t"] for message in sent] == [[1000, 2000], [3000]]
+    assert agg.store.window("temperature", "node1")[0].tolist() == [1000, 2000, 3000]
+
+
+def test_readings_a_publisher_dropped_are_merged_by_time_and_counted():
+    agg, sent = aggregator()
+    late_before = metrics.registry.counters.get("late_readings", 0)
+    agg.ingest("temperature", "node1", [1000], [20.0])
+    agg.ingest("temperature", "node1", [4000], [23.0])  # 2000 and 3000 never pushed
+    agg.ingest("temperature", "node1", [1000, 2000, 3000, 4000, 5000], [20.0, 21.0, 22.0, 23.0, 24.0])
+    times, values = agg.store.window("temperature", "node1")
+    assert times.tolist() == [1000, 2000, 3000, 4000, 5000]
+    assert values.tolist() == [20.0, 21.0, 22.0, 23.0, 24.0]
+    assert metrics.registry.counters["late_readings"] == late_before + 2
+    assert sent[-1]["t"] == [5000]  # viewers only append
+
+
+def test_subscribe_backfills_from_the_store():
+    agg, _ = aggregator()
+    agg.ingest("temperature", "node1", [1000, 2000, 3000], [20.0, 21.0, 22.0])
+    agg.ingest("humidity", "node1", [1000], [50.0])
+    subscriber = Subscriber(Writer())
+    agg.subscribe(subscriber, {"op": "subscribe", "metric": "temperature", "nodes": None, "backfill": 2})
+    assert subscriber.writer.messages == [{"metric": "temperature", "node": "node1",
+                                           "t": [2000, 3000], "v": [21.0, 22.0]}]
+    assert subscriber.wants("temperature", "node2") and not subscriber.wants("humidity", "node1")
+
+
+@pytest.fixture
+def served(tmp_path):
+    """An Aggregator listening on a UNIX socket from a background event loop, without polling."""
+    agg = Aggregator()
+    path = str(tmp_path / "aggregator.sock")
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = asyncio.run_coroutine_threadsafe(asyncio.start_unix_server(agg.handle_client, path), loop).result(5)
+    yield agg, path
+    loop.call_soon_threadsafe(server.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def test_published_readings_are_pushed_to_subscribed_clients(served):
+    agg, path = served
+    client = AggregatorClient(path, {"temperature": ["node1"]}, backfill=0)
+    client.fetch()  # connects and subscribes
+    publisher = Publisher(path)
+    t0 = datetime.datetime(2025, 1, 1, 12, 0, 0)
+    publisher.publish("temperature", "node1", t0, 21.5)
+    publisher.publish("temperature", "node2", t0, 30.0)  # not subscribed
+    publisher.publish("humidity", "node1", t0, 50.0)
+    received = {}
+    deadline = time.monotonic() + 5
+    while not received and time.monotonic() < deadline:
+        received = client.fetch(timeout=0.1)
+    assert received == {"temperature": {"node1": [(t0, 21.5)]}}
+    assert publisher.published == 3 and publisher.dropped == 0
+    client.close()
+    publisher.close()
+
+
+def test_publisher_drops_readings_while_the_aggregator_is_down(tmp_path):
+    publisher = Publisher(str(tmp_path / "missing.sock"))
+    publisher.publish("temperature", "node1", datetime.datetime(2025, 1, 1), 21.5)
+    publisher.publish("temperature", "node1", datetime.datetime(2025, 1, 1), 21.5)
+    assert publisher.dropped == 2 and publisher.published == 0
@@ -0,0 +1,23 @@
+from alarms import AlarmEngine, Threshold
+
+
+def engine(rules):
+    return AlarmEngine(rules, on_alarm=None)
+
+
+def test_nodes_joining_after_the_first_batch_are_monitored():
+    alarms = engine([Threshold("temperature", high=40)])
+    alarms.process("temperature", ["node1"], [0.0], [25.0])
+    alarms.process("temperature", ["node2"], [1.0], [25.0])  # first seen in a later batch
+    changes = alarms.process("temperature", ["node1", "node2"], [2.0, 3.0], [50.0, 50.0])
+    assert sorted(alarm.node for alarm in changes) == ["node1", "node2"]
+    assert alarms.alarmed("temperature") == {"node1", "node2"}
+
+
+def test_late_nodes_outside_a_rules_node_list_stay_quiet():
+    alarms = engine([Threshold("temperature", high=40, nodes=["node2"])])
+    alarms.process("temperature", ["node1"], [0.0], [25.0])
+    for n in range(2, 40):  # past the initial row capacity
+        alarms.process("temperature", [f"node{n}"], [float(n)], [25.0])
+    changes = alarms.process("temperature", ["node1", "node2", "node39"], [50.0] * 3, [50.0] * 3)
+    assert [alarm.node for alarm in changes] == ["node2"]
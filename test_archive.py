@@ -0,0 +1,83 @@
+import os
+import datetime
+import numpy as np
+import pytest
+import archive
+from archive import archived_days, read_node_day, read_range, recover, write_day
+
+DAY = datetime.date(2025, 1, 1)
+T0 = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+class Cursor:
+    """Serves (node, dTime, value) readings to write_day's queries."""
+
+    def __init__(self, readings):
+        self.readings = readings
+
+    def execute(self, sql, params=()):
+        lo, hi = params[-2:]
+        if sql.startswith("SELECT DISTINCT node"):
+            self.rows = sorted({(node,) for node, dTime, _ in self.readings if lo <= dTime < hi})
+        else:
+            self.rows = [(dTime, value) for node, dTime, value in self.readings
+                         if node == params[0] and lo <= dTime < hi]
+
+    def fetchall(self):
+        return self.rows
+
+
+def readings(node, seconds, value=20.0):
+    return [(node, T0 + datetime.timedelta(seconds=s), value + s) for s in seconds]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_a_day_reads_back_exactly(tmp_path, compress):
+    root = str(tmp_path)
+    cursor = Cursor(readings("node1", [0, 1, 2]) + readings("node/2", [5]))
+    assert write_day(cursor, "temperature", "temperature", DAY, root, compress) == 4
+    t, v = read_node_day("temperature", "node1", DAY, root)
+    assert np.asarray(t).tolist() == [round((T0 + datetime.timedelta(seconds=s)).timestamp() * 1000) for s in (0, 1, 2)]
+    assert np.asarray(v).tolist() == [20.0, 21.0, 22.0]
+    assert archive.archived_nodes("temperature", root) == ["node/2", "node1"]
+    t, v = read_range("temperature", "node1", T0.timestamp() + 1, T0.timestamp() + 10, root)
+    assert v.tolist() == [21.0, 22.0]
+
+
+def test_rerunning_a_day_merges_late_readings(tmp_path):
+    root = str(tmp_path)
+    write_day(Cursor(readings("node1", [0, 2]) + readings("node2", [0])), "temperature", "temperature", DAY, root)
+    write_day(Cursor(readings("node1", [1, 2])), "temperature", "temperature", DAY, root)
+    assert np.asarray(read_node_day("temperature", "node1", DAY, root)[1]).tolist() == [20.0, 21.0, 22.0]
+    assert read_node_day("temperature", "node2", DAY, root) is not None  # no new rows, kept
+    assert sorted(os.listdir(os.path.join(root, "temperature"))) == ["2025-01-01"]
+
+
+def test_a_stale_tmp_directory_is_replaced(tmp_path):
+    root = str(tmp_path)
+    final = archive.day_dir("temperature", DAY, root)
+    os.makedirs(final + ".tmp")
+    open(os.path.join(final + ".tmp", "junk.t.npy"), "wb").close()  # a crash mid-write
+    write_day(Cursor(readings("node1", [0])), "temperature", "temperature", DAY, root)
+    assert sorted(os.listdir(final)) == ["node1.t.npy", "node1.v.npy"]
+    assert archived_days("temperature", root) == [DAY]
+
+
+def test_a_stranded_backup_is_moved_back(tmp_path):
+    root = str(tmp_path)
+    write_day(Cursor(readings("node1", [0])), "temperature", "temperature", DAY, root)
+    final = archive.day_dir("temperature", DAY, root)
+    os.replace(final, final + ".old")  # crash between the two renames of write_day
+    assert archived_days("temperature", root) == []
+    recover(root)
+    assert archived_days("temperature", root) == [DAY]
+    assert read_node_day("temperature", "node1", DAY, root) is not None
+
+
+def test_a_backup_next_to_a_complete_day_is_removed(tmp_path):
+    root = str(tmp_path)
+    write_day(Cursor(readings("node1", [0])), "temperature", "temperature", DAY, root)
+    final = archive.day_dir("temperature", DAY, root)
+    os.makedirs(final + ".old")  # crash after the new day was renamed into place
+    recover(root)
+    assert not os.path.exists(final + ".old") and os.path.isdir(final)
@@ -0,0 +1,102 @@
+import datetime
+import mariadb
+from batch_writer import BatchWriter
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def executemany(self, query, rows):
+        if self.conn.fail:
+            raise mariadb.Error("server has gone away")
+        self.conn.pending.append((query.split()[2], list(rows)))
+
+    def close(self):
+        pass
+
+
+class Connection:
+    """Records the rows of each committed transaction."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.pending = []
+        self.commits = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        self.commits.append(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+T0 = datetime.datetime(2025, 1, 1)
+
+
+def test_flushes_both_tables_in_one_transaction_at_max_rows():
+    conn = Connection()
+    writer = BatchWriter(conn, max_rows=3, max_age=3600)
+    writer.add("temperature", "node1", 25.0, T0)
+    writer.add("humidity", "node1", 50.0, T0)
+    assert conn.commits == []
+    writer.add("temperature", "node2", 26.0, T0)
+    assert conn.commits == [[("temperature", [(T0, "node1", 25.0), (T0, "node2", 26.0)]),
+                             ("humidity", [(T0, "node1", 50.0)])]]
+    assert writer.pending() == 0
+    assert writer.rows_written == 3
+
+
+def test_flushes_when_the_oldest_reading_is_older_than_max_age():
+    writer = BatchWriter(Connection(), max_rows=1000, max_age=0)
+    writer.add("temperature", "node1", 25.0, T0)
+    assert writer.pending() == 0
+    assert writer.rows_written == 1
+
+
+def test_failed_batch_without_spool_is_rolled_back_and_counted():
+    conn = Connection(fail=True)
+    writer = BatchWriter(conn, max_rows=1000, max_age=3600)
+    writer.add("temperature", "node1", 25.0, T0)
+    writer.add("temperature", "node2", 25.0, T0)
+    assert writer.flush() == 0
+    assert conn.commits == [] and conn.rollbacks == 1
+    assert writer.rows_failed == 2 and writer.pending() == 0
+
+
+def test_readings_stay_queued_without_a_connection_or_spool():
+    writer = BatchWriter(None, max_rows=1, max_age=3600)
+    writer.add("temperature", "node1", 25.0, T0)
+    assert writer.flush() == 0 and writer.pending() == 1
+    conn = Connection()
+    writer.conn = conn
+    assert writer.flush() == 1
+    assert conn.commits == [[("temperature", [(T0, "node1", 25.0)])]]
+
+
+def test_failed_batch_is_spooled_and_replayed_in_order(tmp_path):
+    from spool import Spool
+    spool = Spool(str(tmp_path))
+    writer = BatchWriter(Connection(fail=True), max_rows=1000, max_age=3600, spool=spool)
+    writer.add("temperature", "node1", 25.0, T0)
+    writer.flush()
+    assert writer.conn is None and writer.rows_spooled == 1
+    writer.add("temperature", "node1", 26.0, T0 + datetime.timedelta(seconds=1))
+    writer.flush()  # behind the backlog
+    assert writer.rows_spooled == 2 and spool.pending() > 0
+
+    writer.conn = Connection()
+    writer.add("temperature", "node1", 27.0, T0 + datetime.timedelta(seconds=2))
+    writer.flush()  # still behind the backlog
+    assert writer.replay() == 3
+    assert [row[2] for commit in writer.conn.commits for _, rows in commit for row in rows] == [25.0, 26.0, 27.0]
+    assert spool.pending() == 0
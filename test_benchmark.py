@@ -0,0 +1,40 @@
+import json
+import types
+import mariadb
+import pytest
+import benchmark
+from benchmark import compare, create_database, fill, result_key
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Restores mariadb.connect after install_stand_in() replaced it."""
+    monkeypatch.setattr(mariadb, "connect", mariadb.connect)
+
+
+def test_fill_spreads_rows_over_the_nodes():
+    db = create_database()
+    fill(db, 10, 3)
+    assert db.execute("SELECT COUNT(*) FROM temperature").fetchone()[0] == 10
+    assert db.execute("SELECT COUNT(DISTINCT node) FROM humidity").fetchone()[0] == 3
+
+
+def test_ingest_suite_reports_every_batch_size_and_writes_the_rows(stand_in):
+    results = benchmark.bench_ingest(types.SimpleNamespace(ingest_rows=200))
+    assert [(r["name"], r["batch_rows"]) for r in results] == [
+        ("BatchWriter", 1), ("BatchWriter", 100), ("BatchWriter", 500), ("BatchWriter", 5000),
+        ("insert_temperature_data", 1)]
+    assert all(r["rows"] == 200 and r["rows_per_sec"] > 0 for r in results)
+
+
+def test_results_are_matched_on_parameters_not_timings(tmp_path, capsys):
+    before = {"suite": "fetch", "name": "LiveSource delta", "nodes": 3, "median_ms": 2.0, "min_ms": 1.0}
+    after = dict(before, median_ms=3.0, min_ms=0.5)
+    other = dict(before, nodes=30, median_ms=1.0)
+    assert result_key(before) == result_key(after) != result_key(other)
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"results": [before]}))
+    compare([after, other, {"suite": "render", "name": "x", "skipped": "no Qt"}], str(path))
+    lines = capsys.readouterr().err.splitlines()
+    assert len(lines) == 1
+    assert "nodes=3" in lines[0] and "median_ms" in lines[0] and "(+50%)" in lines[0]
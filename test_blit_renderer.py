@@ -0,0 +1,36 @@
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from blit_renderer import BlitRenderer, nice_step, snapped_limits
+
+
+def test_nice_step():
+    assert [nice_step(x) for x in (0.3, 1, 1.5, 3, 7, 12)] == [0.5, 1, 2, 5, 10, 20]
+    assert nice_step(0) == 1.0 and nice_step(float("nan")) == 1.0
+
+
+def test_snapped_limits_contain_the_data_with_room_on_both_sides():
+    lower, upper = snapped_limits(21.3, 24.8)
+    assert lower < 21.3 and upper > 24.8
+    assert snapped_limits(21.4, 24.9) == (lower, upper)  # small moves keep the limits
+    assert snapped_limits(25.0, 25.0)[0] < 25.0 < snapped_limits(25.0, 25.0)[1]
+
+
+def renderer():
+    figure = Figure()
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    line, = ax.plot([0, 1, 2], [20.2, 21.0, 21.8])
+    return BlitRenderer(canvas, ax, [line]), line
+
+
+def test_blits_until_the_data_leaves_the_snapped_limits():
+    blit, line = renderer()
+    blit.update()
+    assert (blit.full_draws, blit.blits) == (1, 0)
+    line.set_data([0, 1, 2], [20.3, 21.0, 21.7])
+    blit.update()
+    assert (blit.full_draws, blit.blits) == (1, 1)
+    line.set_data([0, 1, 2], [20.0, 21.0, 80.0])
+    blit.update()
+    assert blit.full_draws == 2
+    assert blit.ax.get_ylim()[1] > 80.0
@@ -0,0 +1,52 @@
+import datetime
+import pytest
+from PySide6.QtWidgets import QApplication
+from dashboard import BACKENDS, load_backend, node_color
+from series_store import SeriesStore
+from trend_figure import LINE_WIDTH
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_node_colors_are_distinct_rgb_tuples():
+    colors = [node_color(i) for i in range(50)]
+    assert len(set(colors)) == 50
+    assert all(len(c) == 3 and all(0 <= x <= 255 for x in c) for c in colors)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="choose from qtcharts, pyqtgraph, matplotlib"):
+        load_backend("tkinter")
+
+
+def series():
+    store = SeriesStore(100)
+    t0 = datetime.datetime(2025, 1, 1, 12, 0, 0)
+    for node, base in (("node1", 20.0), ("node_2", 30.0)):
+        store.extend_rows("temperature", node, [(t0 + datetime.timedelta(seconds=2 * i), base + i) for i in range(10)])
+    return {node: store.window("temperature", node) for node in store.nodes("temperature")}
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_every_backend_draws_one_line_per_node_and_thickens_alarms(app, backend):
+    module = load_backend(backend)
+    panel = module.Renderer("Temperature Sensors", "Temperature (°C)", node_color)
+    data = series()
+    panel.draw(data, set())
+    panel.draw(data, {"node_2"})
+    if backend == "qtcharts":
+        lines = {node: line.pen().widthF() for node, line in panel.lines.items()}
+        assert [panel.lines["node1"].count(), panel.lines["node_2"].count()] == [10, 10]
+        assert lines == {"node1": module.LINE_WIDTH, "node_2": module.ALARM_LINE_WIDTH}
+    elif backend == "pyqtgraph":
+        assert len(panel.curves["node1"].getData()[0]) == 10
+        widths = {node: curve.opts["pen"].width() for node, curve in panel.curves.items()}
+        assert widths == {"node1": module.PEN_WIDTH, "node_2": module.ALARM_PEN_WIDTH}
+    else:
+        assert len(panel.lines["node1"].get_xdata()) == 10
+        widths = {node: line.get_linewidth() for node, line in panel.lines.items()}
+        assert widths == {"node1": LINE_WIDTH, "node_2": module.ALARM_LINE_WIDTH}
+
@@ -0,0 +1,146 @@
+import mariadb
+import pytest
+import db
+from db import Pool, PoolTimeout, Router
+
+
+class Server:
+    def __init__(self, host):
+        self.host = host
+        self.up = True
+        self.connects = 0
+        self.queries = 0
+
+    def check(self):
+        if not self.up:
+            raise mariadb.Error(f"Can't connect to server on '{self.host}'")
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        self.conn.check()
+        if sql == "bad":
+            raise mariadb.Error("You have an error in your SQL syntax")
+        self.conn.server.queries += 1
+        self.row = (self.conn.server.host,)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def check(self):
+        if self.closed:
+            raise mariadb.Error("connection closed")
+        self.server.check()
+
+    def cursor(self):
+        return Cursor(self)
+
+    def ping(self):
+        self.check()
+
+    def rollback(self):
+        self.check()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    servers = {host: Server(host) for host in ("primary", "replica1", "replica2")}
+
+    def connect(connect_timeout=None, **config):
+        server = servers[config["host"]]
+        server.check()
+        server.connects += 1
+        return Connection(server)
+    monkeypatch.setattr(mariadb, "connect", connect)
+    return servers
+
+
+def router(replicas=("replica1", "replica2")):
+    return Router({"host": "primary"}, [{"host": host} for host in replicas])
+
+
+def host(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT @@hostname")
+    return cursor.fetchone()[0]
+
+
+def test_reads_alternate_between_replicas_and_writes_go_to_the_primary(servers):
+    r = router()
+    assert sorted(r.read(host) for _ in range(4)) == ["replica1", "replica1", "replica2", "replica2"]
+    with r.writer() as conn:
+        assert host(conn) == "primary"
+    assert router(replicas=()).read(host) == "primary"
+
+
+def test_a_replica_refusing_connections_is_skipped_until_the_retry_time(servers, monkeypatch):
+    monkeypatch.setattr(db, "REPLICA_RETRY", 60.0)
+    servers["replica1"].up = False
+    r = router()
+    assert {r.read(host) for _ in range(4)} == {"replica2"}
+    servers["replica2"].up = False
+    assert r.read(host) == "primary"
+    servers["replica1"].up = servers["replica2"].up = True
+    assert r.read(host) == "primary"  # both still within REPLICA_RETRY
+    monkeypatch.setattr(db, "REPLICA_RETRY", 0.0)
+    assert r.read(host).startswith("replica")
+
+
+def test_a_replica_dying_between_reads_is_retried_on_the_next_server(servers, monkeypatch):
+    monkeypatch.setattr(db, "REPLICA_RETRY", 60.0)
+    r = router(replicas=("replica1",))
+    assert r.read(host) == "replica1"  # leaves a pooled connection to replica1
+    servers["replica1"].up = False
+    assert r.read(host) == "primary"
+    assert r.replicas[0].opened == 0  # its pooled connections were closed
+    assert r.read(host) == "primary"
+
+
+def test_a_query_error_on_a_live_replica_is_not_retried(servers):
+    r = router(replicas=("replica1",))
+
+    def bad(conn):
+        conn.cursor().execute("bad")
+    with pytest.raises(mariadb.Error, match="SQL syntax"):
+        r.read(bad)
+    assert servers["primary"].connects == 0
+    assert r.replicas[0].idle.qsize() == 1  # rolled back and reused
+
+
+def test_pool_is_bounded_and_replaces_connections_dropped_while_idle(servers, monkeypatch):
+    pool = Pool({"host": "primary"}, size=2)
+    a, b = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0.01)
+    pool.release(a)
+    pool.release(b)
+    monkeypatch.setattr(db, "HEALTH_CHECK_AFTER", 0.0)
+    b.closed = True  # the server dropped it while idle
+    assert pool.acquire() is a  # b, last released, fails its ping and is discarded
+    fresh = pool.acquire()
+    assert fresh is not b and not fresh.closed
+    assert servers["primary"].connects == 3
+
+
+def test_environment_overrides_the_configuration(monkeypatch):
+    monkeypatch.setenv("TH_DB_PRIMARY", "db1:3307")
+    monkeypatch.setenv("TH_DB_REPLICAS", "db2, db3:3308")
+    monkeypatch.setenv("TH_DB_USER", "reader")
+    primary, replicas = db.environment_config()
+    assert (primary["host"], primary["port"], primary["user"]) == ("db1", 3307, "reader")
+    assert [db.describe(config) for config in replicas] == ["db2:3306", "db3:3308"]
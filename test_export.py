@@ -0,0 +1,75 @@
+import csv
+import datetime
+import archive
+import export
+from export import CsvOutput, stream_node
+
+T0 = datetime.datetime(2025, 1, 2, 12, 0, 0)
+
+
+class Cursor:
+    def __init__(self, conn, buffered):
+        self.conn = conn
+        self.buffered = buffered
+        self.fetches = []
+
+    def execute(self, sql, params=()):
+        if sql.startswith("SELECT DISTINCT node"):
+            self.rows = [(node,) for node in sorted(self.conn.readings)]
+        else:
+            node, lo, hi = params
+            self.rows = [(dTime, value) for dTime, value in self.conn.readings.get(node, []) if lo <= dTime < hi]
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        self.fetches.append(len(batch))
+        return batch
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class Connection:
+    """Serves {node: [(dTime, value), ...]} and keeps the cursors it handed out."""
+
+    def __init__(self, readings):
+        self.readings = readings
+        self.cursors = []
+
+    def cursor(self, buffered=True):
+        self.cursors.append(Cursor(self, buffered))
+        return self.cursors[-1]
+
+
+def readings(start, count):
+    return [(start + datetime.timedelta(seconds=i), 20.0 + i) for i in range(count)]
+
+
+def test_a_node_is_streamed_in_batches_from_an_unbuffered_cursor():
+    conn = Connection({"node1": readings(T0, 25)})
+    batches = list(stream_node(conn, "temperature", "temperature", "node1",
+                               T0, T0 + datetime.timedelta(hours=1), batch_rows=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert conn.cursors[0].buffered is False
+    assert conn.cursors[0].fetches == [10, 10, 5, 0]
+
+
+def test_csv_export_puts_archived_days_before_database_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # archive.ARCHIVE_DIR is relative
+    day1 = T0 - datetime.timedelta(days=1)
+    archive.write_day(Connection({"node1": readings(day1, 3)}).cursor(), "temperature", "temperature", day1.date())
+    conn = Connection({"node1": readings(T0, 2)})
+    path = str(tmp_path / "out.csv")
+    output = CsvOutput(path)
+    written = export.export(conn, output, ["temperature"], None, day1.replace(hour=0),
+                            T0 + datetime.timedelta(hours=1), include_archive=True)
+    output.close()
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert written == 5
+    assert rows[0] == ["metric", "node", "dTime", "value"]
+    assert [row[2] for row in rows[1:]] == [dTime.isoformat(sep=" ") for dTime, _ in readings(day1, 3) + readings(T0, 2)]
+    assert [float(row[3]) for row in rows[1:]] == [20.0, 21.0, 22.0, 20.0, 21.0]
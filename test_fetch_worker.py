@@ -0,0 +1,68 @@
+import time
+import threading
+import pytest
+from PySide6.QtWidgets import QApplication
+from fetch_worker import BackgroundFetcher
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        QApplication.processEvents()
+        time.sleep(0.005)
+
+
+def test_submits_while_one_is_queued_are_coalesced(app):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(len(calls))
+        started.set()
+        release.wait(5)
+        return len(calls)
+
+    fetcher = BackgroundFetcher(fetch)
+    results = []
+    fetcher.finished.connect(results.append)
+    try:
+        assert fetcher.submit()
+        started.wait(5)
+        assert fetcher.submit()  # queued behind the running fetch
+        assert not fetcher.submit()  # coalesced into the queued one
+        release.set()
+        wait_for(lambda: len(results) == 2)
+        assert len(calls) == 2
+    finally:
+        release.set()
+        fetcher.stop()
+
+
+def test_failures_are_reported_and_retried(app):
+    attempts = []
+
+    def fetch():
+        attempts.append(threading.get_ident())
+        if len(attempts) < 3:
+            raise ConnectionError("server down")
+        return "rows"
+
+    fetcher = BackgroundFetcher(fetch, retry_delay=0.01)
+    errors, results = [], []
+    fetcher.failed.connect(errors.append)
+    fetcher.finished.connect(results.append)
+    try:
+        fetcher.submit()
+        wait_for(lambda: results)
+        assert results == ["rows"]
+        assert errors == ["ConnectionError: server down"] * 2
+        assert threading.get_ident() not in attempts  # fetched on the worker thread
+    finally:
+        fetcher.stop()
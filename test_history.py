@@ -0,0 +1,196 @@
+import time
+import datetime
+import numpy as np
+import mariadb
+import pytest
+import pyqtgraph as pg
+from PySide6.QtWidgets import QApplication
+import history
+import metrics
+from history import ChunkCache, HistoryView, chunk_indices, chunk_seconds, choose_level, decimate_minmax
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        if self.conn.fail:
+            raise mariadb.Error("lost connection")
+        self.rows = [("node1",), ("node2",)] if "DISTINCT node" in sql else []
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self, fail):
+        self.fail = fail
+        self.closed = False
+
+    def cursor(self):
+        return Cursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+def connections(*failures):
+    """connect() for HistoryView: the n-th connection fails if failures[n] is true."""
+    opened = []
+
+    def connect():
+        opened.append(Connection(failures[len(opened)] if len(opened) < len(failures) else False))
+        return opened[-1]
+    return connect, opened
+
+
+@pytest.fixture
+def no_archive(monkeypatch):
+    monkeypatch.setattr(history, "USE_ARCHIVE", False)
+
+
+@pytest.fixture
+def app(no_archive):
+    return QApplication.instance() or QApplication([])
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        QApplication.processEvents()
+        time.sleep(0.005)
+
+
+def test_level_buckets_fit_a_pixel():
+    assert choose_level(3600, 1800) == 0
+    level = choose_level(30 * 86400, 1000)
+    assert history.bucket_seconds(level) <= 30 * 86400 / 1000 < history.bucket_seconds(level + 1)
+    assert chunk_indices(0, 0, chunk_seconds(0) * 2.5) == [0, 1, 2]
+
+
+def test_decimation_keeps_the_extremes_of_each_pixel_column():
+    t = np.arange(100000, dtype=np.float64)
+    v = np.sin(t / 1000)
+    v[5000] = 10.0
+    x, y = decimate_minmax(t, v, v, 0, 100000, 200)
+    assert len(x) <= 2 * 202
+    assert y.max() == 10.0 and y.min() == v.min()
+
+
+def test_cache_is_bounded_by_bytes_and_evicts_least_recently_used():
+    chunk = (np.zeros(100), np.zeros(100), np.zeros(100))
+    cache = ChunkCache(max_bytes=2 * ChunkCache.chunk_bytes(chunk))
+    cache.put("a", chunk)
+    cache.put("b", chunk)
+    cache.get("a")
+    cache.put("c", chunk)
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+
+def test_expired_chunks_are_reloaded_but_still_drawn():
+    chunk = (np.zeros(1), np.zeros(1), np.zeros(1))
+    cache = ChunkCache()
+    cache.put("live", chunk, expires=time.monotonic() - 1)
+    cache.put("past", chunk)
+    assert "live" not in cache and cache.get("live") is chunk
+    assert "past" in cache
+
+
+def test_chunk_reaching_past_now_expires(app):
+    view = HistoryView(pg.PlotWidget(), "temperature", "temperature", connections()[0], nodes=[])
+    try:
+        chunk = (np.zeros(1), np.zeros(1), np.zeros(1))
+        now_index = int(time.time() // chunk_seconds(0))
+        view.on_chunk(("node1", 0, now_index), chunk)
+        view.on_chunk(("node1", 0, now_index - 2), chunk)
+        assert view.cache.expires.keys() == {("node1", 0, now_index)}
+        assert ("node1", 0, now_index - 2) in view.cache
+    finally:
+        view.close()
+
+
+def test_failed_discovery_closes_the_connection_and_retries(app, monkeypatch):
+    monkeypatch.setattr(history, "DISCOVER_RETRY_MS", 10)
+    connect, opened = connections(True)
+    errors_before = metrics.registry.counters.get("history_load_errors", 0)
+    view = HistoryView(pg.PlotWidget(), "temperature", "temperature", connect, nodes=[])
+    errors = []
+    view.failed.connect(errors.append)  # before the worker can report
+    try:
+        view.discover()
+        wait_for(lambda: view.nodes == ["node1", "node2"])
+        assert opened[0].closed and not opened[1].closed
+        assert metrics.registry.counters["history_load_errors"] == errors_before + 1
+        assert errors == ["Error listing temperature nodes: lost connection"]
+    finally:
+        view.close()
+
+
+def test_failed_chunk_load_closes_the_connection(app):
+    connect, opened = connections(True)
+    view = HistoryView(pg.PlotWidget(), "temperature", "temperature", connect, nodes=[])
+    try:
+        view._load(("node1", 0, 0))
+        assert opened[0].closed
+        view._load(("node1", 0, 0))  # reconnects
+        assert len(opened) == 2 and not opened[1].closed
+    finally:
+        view.close()
+
+
+class RollupCursor:
+    """Answers load_chunk's queries from canned rows and records the tables it reads."""
+
+    def __init__(self, watermark=None, rollup_tables=True):
+        self.watermark = watermark
+        self.rollup_tables = rollup_tables
+        self.queries = []
+
+    def execute(self, sql, params=()):
+        if "information_schema" in sql:
+            self.rows = [(1 if self.rollup_tables else 0,)]
+        elif "rollup_watermark" in sql:
+            self.rows = [(self.watermark,)] if self.watermark is not None else []
+        else:
+            source = sql.split(" FROM ")[1].split()[0]
+            lo, hi = params[2].timestamp(), params[3].timestamp()
+            self.queries.append((source, lo, hi))
+            bucket = params[0]
+            self.rows = [(lo // bucket, 1.0, 2.0)] if hi > lo else []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+LEVEL = 5  # 64 s buckets, read from the 1m rollups
+
+
+def test_coarse_chunks_read_raw_rows_until_rollup_py_has_run(no_archive):
+    cursor = RollupCursor(rollup_tables=False)
+    t, vmin, vmax = history.load_chunk(cursor, "temperature", "temperature", "node1", LEVEL, 100)
+    start, end = 100 * chunk_seconds(LEVEL), 101 * chunk_seconds(LEVEL)
+    assert cursor.queries == [("temperature", start, end)]
+    assert len(t) == 1
+
+
+def test_coarse_chunks_read_rollups_up_to_the_watermark_and_raw_rows_after_it(no_archive):
+    start, end = 100 * chunk_seconds(LEVEL), 101 * chunk_seconds(LEVEL)
+    bucket = history.bucket_seconds(LEVEL)
+    covered = RollupCursor(watermark=datetime.datetime.fromtimestamp(end + 40))
+    history.load_chunk(covered, "temperature", "temperature", "node1", LEVEL, 100)
+    assert covered.queries == [("temperature_1m", start, end)]
+
+    watermark = start + 10 * bucket + 30
+    partial = RollupCursor(watermark=datetime.datetime.fromtimestamp(watermark))
+    t, _, _ = history.load_chunk(partial, "temperature", "temperature", "node1", LEVEL, 100)
+    split = start + 10 * bucket
+    assert partial.queries == [("temperature_1m", start, split), ("temperature", split, end)]
+    assert t.tolist() == [start, split]
@@ -0,0 +1,58 @@
+import sqlite3
+import datetime
+from incremental_fetch import WatermarkFetcher
+
+T0 = datetime.datetime(2025, 1, 1)
+
+
+def database(nodes=("node1", "node2"), readings=20):
+    conn = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.execute("CREATE TABLE temperature (node TEXT, dTime TIMESTAMP, temperature REAL, PRIMARY KEY (node, dTime))")
+    for i in range(readings):
+        insert(conn, [(node, T0 + datetime.timedelta(seconds=2 * i), float(i)) for node in nodes])
+    return conn
+
+
+def insert(conn, rows):
+    conn.executemany("INSERT INTO temperature VALUES (?, ?, ?)", rows)
+
+
+def test_first_fetch_backfills_the_newest_rows_oldest_first():
+    cursor = database().cursor()
+    delta = WatermarkFetcher("temperature", "temperature", ["node1", "node2"], backfill=3).fetch(cursor)
+    assert sorted(delta) == ["node1", "node2"]
+    assert [value for _, value in delta["node1"]] == [17.0, 18.0, 19.0]
+
+
+def test_later_fetches_return_only_rows_past_the_watermark():
+    conn = database()
+    cursor = conn.cursor()
+    fetcher = WatermarkFetcher("temperature", "temperature", ["node1", "node2"], backfill=3)
+    fetcher.fetch(cursor)
+    assert fetcher.fetch(cursor) == {}
+    late = T0 + datetime.timedelta(seconds=100)
+    insert(conn, [("node2", late, 50.0)])
+    assert fetcher.fetch(cursor) == {"node2": [(late, 50.0)]}
+    assert fetcher.watermarks["node2"] == late
+
+
+def test_catches_up_in_steps_of_max_rows_per_node_without_gaps():
+    conn = database(nodes=("node1",), readings=1)
+    cursor = conn.cursor()
+    fetcher = WatermarkFetcher("temperature", "temperature", ["node1"], backfill=1, max_rows_per_node=4)
+    fetcher.fetch(cursor)
+    insert(conn, [("node1", T0 + datetime.timedelta(seconds=2 * i), float(i)) for i in range(1, 11)])
+    values = []
+    for _ in range(3):
+        values += [value for _, value in fetcher.fetch(cursor).get("node1", [])]
+    assert values == [float(i) for i in range(1, 11)]
+
+
+def test_discovers_nodes_when_none_are_given():
+    conn = database(nodes=("node1",))
+    cursor = conn.cursor()
+    fetcher = WatermarkFetcher("temperature", "temperature", backfill=1, discover_every=2)
+    assert list(fetcher.fetch(cursor)) == ["node1"]
+    insert(conn, [("node2", T0, 1.0)])
+    fetcher.fetch(cursor)  # not a discovery tick
+    assert list(fetcher.fetch(cursor)) == ["node2"]
@@ -0,0 +1,59 @@
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from metrics import Registry, Timer, serve
+
+
+def test_quantiles_come_from_the_most_recent_window():
+    timer = Timer(window=100)
+    for i in range(1000):
+        timer.observe(i / 1000)
+    assert timer.count == 1000
+    assert timer.total == pytest.approx(sum(range(1000)) / 1000)
+    assert timer.quantiles((0.5, 0.99)) == {0.5: 0.95, 0.99: 0.999}
+    assert Timer().quantiles((0.5,)) == {0.5: 0.0}
+
+
+def test_counts_from_several_threads_are_not_lost():
+    registry = Registry()
+
+    def work():
+        for _ in range(10000):
+            registry.count("reads")
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.counters["reads"] == 40000
+
+
+def test_prometheus_text_format():
+    registry = Registry()
+    with registry.timer("fetch"):
+        pass
+    registry.count("rows_written", 3)
+    registry.gauge("pending_rows", 7)
+    lines = registry.prometheus().splitlines()
+    assert "# TYPE th_monitoring_fetch_seconds summary" in lines
+    assert 'th_monitoring_fetch_seconds{quantile="0.99"}' in registry.prometheus()
+    assert "th_monitoring_fetch_seconds_count 1" in lines
+    assert lines[-4:] == ["# TYPE th_monitoring_rows_written_total counter", "th_monitoring_rows_written_total 3",
+                          "# TYPE th_monitoring_pending_rows gauge", "th_monitoring_pending_rows 7"]
+
+
+def test_metrics_are_served_over_http():
+    registry = Registry()
+    registry.count("reads", 2)
+    server = serve(0, registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "th_monitoring_reads_total 2" in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,110 @@
+import os
+import time
+import random
+import datetime
+import numpy as np
+import pytest
+from ring_buffer import RingBuffer
+from plotGraph import pivot_readings, pivot_columns, pivot_buffers, to_epoch_us
+
+
+def process_data(data):
+    """SensorPlotter.process_data as it was before pivot_readings, kept as the reference."""
+    timestamps = sorted(set(dTime for dTime, _, _ in data))  # Unique, sorted timestamps
+    sensor_data = {}
+
+    # Convert timestamps to datetime only if they are strings
+    if isinstance(timestamps[0], str):
+        timestamps_dt = [datetime.datetime.strptime(t, "%Y-%m-%d %H:%M:%S") for t in timestamps]
+    else:
+        timestamps_dt = timestamps  # Already in datetime format
+
+    # Convert to float (Unix timestamps)
+    timestamps_numeric = np.array([t.timestamp() for t in timestamps_dt], dtype=np.float64)
+
+    # Initialize sensor_data with NaN values
+    for _, node, _ in data:
+        if node not in sensor_data:
+            sensor_data[node] = np.full(len(timestamps), np.nan, dtype=np.float64)
+
+    # Fill actual values
+    for dTime, node, value in data:
+        index = timestamps.index(dTime)  # Find correct timestamp index
+        sensor_data[node][index] = np.float64(value)  # Ensure numerical values
+
+    return timestamps_numeric, sensor_data
+
+
+@pytest.fixture
+def berlin_time():
+    """Local time with DST changes, so crossing windows are meaningful on any host."""
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset is not available")
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "Europe/Berlin"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def readings(start, count, nodes=("Airflow", "Cooler_Ambient", "Cooler_Discharge"), seed=0):
+    """(dTime, node, value) rows every 2 s with some readings missing, shuffled."""
+    rng = random.Random(seed)
+    rows = [(start + datetime.timedelta(seconds=2 * i), node, round(rng.uniform(20, 35), 2))
+            for i in range(count) for node in nodes if rng.random() > 0.2]
+    rng.shuffle(rows)
+    return rows
+
+
+def assert_same(expected, actual):
+    expected_times, expected_data = expected
+    actual_times, actual_data = actual
+    assert np.array_equal(expected_times, actual_times)
+    assert list(expected_data) == list(actual_data)
+    for node in expected_data:
+        assert np.array_equal(expected_data[node], actual_data[node], equal_nan=True)
+
+
+def test_datetime_rows(berlin_time):
+    data = readings(datetime.datetime(2024, 6, 1, 12, 0), 50)
+    assert_same(process_data(data), pivot_readings(data))
+
+
+def test_string_rows(berlin_time):
+    data = [(f"{dTime:%Y-%m-%d %H:%M:%S}", node, value)
+            for dTime, node, value in readings(datetime.datetime(2024, 6, 1, 23, 59), 50, seed=1)]
+    assert_same(process_data(data), pivot_readings(data))
+
+
+@pytest.mark.parametrize("start", [datetime.datetime(2024, 3, 31, 1, 58), datetime.datetime(2024, 10, 27, 1, 58)])
+def test_window_crossing_dst(berlin_time, start):
+    data = readings(start, 3700, seed=2)  # a bit over two hours across the change
+    assert_same(process_data(data), pivot_readings(data))
+
+
+def test_columns(berlin_time):
+    data = readings(datetime.datetime(2024, 10, 27, 1, 30), 2000, seed=3)
+    times = np.array([dTime for dTime, _, _ in data], dtype="datetime64[us]")
+    nodes = np.array([node for _, node, _ in data])
+    values = np.array([value for _, _, value in data])
+    assert_same(process_data(data), pivot_columns(times, nodes, values))
+
+
+def test_single_row(berlin_time):
+    data = [(datetime.datetime(2024, 1, 1), "Airflow", 21.5)]
+    assert_same(process_data(data), pivot_readings(data))
+
+
+def test_buffered_columns(berlin_time):
+    """The non-live viewer path: per-node ring buffers stacked into columns."""
+    data = sorted(readings(datetime.datetime(2024, 3, 31, 1, 30), 2000, seed=4), key=lambda row: row[0])
+    buffers = {}
+    for dTime, node, value in data:
+        times, values = buffers.setdefault(node, (RingBuffer(len(data), dtype=np.int64), RingBuffer(len(data))))
+        times.extend(to_epoch_us([dTime]))
+        values.extend([value])
+    assert_same(process_data(data), pivot_buffers(buffers))
@@ -0,0 +1,46 @@
+import os
+import argparse
+import datetime
+import pytest
+import report
+from benchmark import StandInConnection, create_database
+from report import fetch_day, generate, parse_line
+
+DAY = datetime.date(2025, 1, 1)
+
+
+@pytest.fixture
+def conn():
+    db = create_database()
+    t0 = datetime.datetime.combine(DAY, datetime.time())
+    for table in ("temperature", "humidity"):
+        db.executemany(f"INSERT INTO {table} VALUES (?, ?, ?)",
+                       [(node, t0 + datetime.timedelta(minutes=i), 20.0 + i)
+                        for node in ("node1", "node2", "node3") for i in range(30)])
+        db.execute(f"INSERT INTO {table} VALUES ('node1', ?, 99.0)", (t0 + datetime.timedelta(days=1),))
+    db.commit()
+    return StandInConnection(db)
+
+
+def test_fetch_day_is_bounded_by_the_day(conn):
+    start = datetime.datetime.combine(DAY, datetime.time())
+    t, v = fetch_day(conn, "temperature", "temperature", "node1", start, start + datetime.timedelta(days=1))
+    assert len(t) == 30 and t.dtype.name == "int64" and v.dtype.name == "float32"
+    assert v[-1] == 49.0
+
+
+@pytest.mark.parametrize("ship_encoded", [True, False])
+def test_one_report_per_node_and_per_line(conn, tmp_path, monkeypatch, ship_encoded):
+    monkeypatch.setattr(report, "SHIP_ENCODED", ship_encoded)
+    stats = generate(conn, DAY, ["node1", "node2"], {"Line1": ["node2", "node3", "missing"]},
+                     out_dir=str(tmp_path), workers=1)
+    directory = tmp_path / "2025-01-01"
+    assert sorted(os.listdir(directory)) == ["line_Line1.png", "node_node1.png", "node_node2.png"]
+    assert stats["reports"] == 3 and stats["failed"] == 0
+    assert stats["rows"] == 3 * 2 * 30  # node3 is fetched once for its line
+
+
+def test_line_option():
+    assert parse_line("Cooler=Airflow,Cooler_Ambient") == ("Cooler", ["Airflow", "Cooler_Ambient"])
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_line("Cooler")
@@ -0,0 +1,36 @@
+import numpy as np
+from ring_buffer import RingBuffer
+
+
+def test_view_is_the_newest_values_oldest_first_after_wrapping():
+    buffer = RingBuffer(4)
+    for value in range(10):
+        buffer.append(value)
+    assert len(buffer) == 4
+    assert buffer.view().tolist() == [6, 7, 8, 9]
+    assert buffer.view(2).tolist() == [8, 9]
+    assert buffer.last() == 9
+
+
+def test_view_shares_memory_with_the_buffer():
+    buffer = RingBuffer(4)
+    buffer.extend([1, 2, 3, 4, 5])
+    assert np.shares_memory(buffer.view(), buffer.data)
+
+
+def test_extend_across_the_end_and_past_capacity():
+    buffer = RingBuffer(5, dtype=np.int64)
+    buffer.extend([1, 2, 3])
+    buffer.extend([4, 5, 6, 7])
+    assert buffer.view().tolist() == [3, 4, 5, 6, 7]
+    buffer.extend(range(100, 112))  # more than the capacity at once
+    assert buffer.view().tolist() == [107, 108, 109, 110, 111]
+    buffer.extend([])
+    assert len(buffer) == 5
+
+
+def test_clear():
+    buffer = RingBuffer(3)
+    buffer.extend([1, 2])
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.last() is None and buffer.view().tolist() == []
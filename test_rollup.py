@@ -0,0 +1,64 @@
+import datetime
+import rollup
+from rollup import choose_rollup, update_rollups
+
+NOW = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append((sql.split()[0], params))
+        if sql.startswith("SELECT last_dTime"):
+            self.rows = [(self.conn.watermark,)] if self.conn.watermark is not None else []
+        elif sql.startswith("SELECT MAX(dTime)"):
+            self.rows = [(self.conn.latest,)]
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self, watermark, latest):
+        self.watermark = watermark
+        self.latest = latest
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def test_choose_rollup():
+    assert choose_rollup(30) is None
+    assert choose_rollup(64) == ("1m", 60)
+    assert choose_rollup(7200) == ("1h", 3600)
+    assert choose_rollup(10 ** 6) == ("1d", 86400)
+
+
+def test_rows_younger_than_the_settle_time_are_left_for_the_next_run():
+    conn = Connection(watermark=NOW - datetime.timedelta(minutes=1), latest=NOW)
+    hi = update_rollups(conn, "temperature", now=NOW)
+    assert hi == NOW - datetime.timedelta(seconds=rollup.SETTLE_SECONDS)
+    merges = [params for verb, params in conn.statements if verb == "INSERT"]
+    assert merges == [(NOW - datetime.timedelta(minutes=1), hi)] * len(rollup.RESOLUTIONS)
+    assert ("REPLACE", ("temperature", hi)) in conn.statements and conn.commits == 1
+
+
+def test_nothing_new_past_the_watermark_is_a_no_op():
+    watermark = NOW - datetime.timedelta(seconds=rollup.SETTLE_SECONDS)
+    conn = Connection(watermark=watermark, latest=NOW)
+    assert update_rollups(conn, "temperature", now=NOW) == watermark
+    assert conn.commits == 0
+    assert not [verb for verb, _ in conn.statements if verb in ("INSERT", "REPLACE")]
@@ -0,0 +1,85 @@
+import datetime
+import schema
+from schema import daily_partitions, migrate, partition_name, rotate_partitions
+
+
+class Cursor:
+    """Answers the information_schema and schema_version queries; records everything else."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append(sql)
+        if "MAX(version)" in sql:
+            self.rows = [(self.conn.version,)]
+        elif "information_schema.PARTITIONS" in sql:
+            self.rows = [(name, None) for name in self.conn.partitions.get(params[0], [])]
+        else:
+            self.rows = []
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self, version=0, partitions=None):
+        self.version = version
+        self.partitions = partitions or {}
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+def ddl(conn, prefix):
+    return [sql for sql in conn.statements if sql.startswith(prefix)]
+
+
+def test_only_migrations_newer_than_the_recorded_version_run(monkeypatch):
+    applied = []
+    monkeypatch.setattr(schema, "MIGRATIONS", [(n, f"step {n}", lambda cursor, n=n: applied.append(n))
+                                               for n in (1, 2, 3)])
+    conn = Connection(version=1)
+    assert migrate(conn) == 3
+    assert applied == [2, 3]
+    assert len(ddl(conn, "INSERT INTO schema_version")) == 2 and conn.commits == 2
+
+
+def test_daily_partitions_are_named_by_day_and_bounded_by_the_next():
+    parts = daily_partitions(datetime.date(2024, 12, 31), datetime.date(2025, 1, 1))
+    assert parts == ["PARTITION p20241231 VALUES LESS THAN ('2025-01-01')",
+                     "PARTITION p20250101 VALUES LESS THAN ('2025-01-02')"]
+
+
+def test_rotate_splits_pmax_up_to_ahead_days_and_drops_expired_days():
+    today = datetime.date.today()
+    days = [today - datetime.timedelta(days=i) for i in (3, 2, 1, 0)]
+    conn = Connection(partitions={"temperature": [partition_name(day) for day in days] + ["pmax"]})
+    rotate_partitions(conn, ahead_days=2, retain_days=2)
+    reorganize, = ddl(conn, "ALTER TABLE temperature REORGANIZE")
+    tomorrow, after = today + datetime.timedelta(days=1), today + datetime.timedelta(days=2)
+    assert f"PARTITION {partition_name(tomorrow)} " in reorganize
+    assert f"PARTITION {partition_name(after)} " in reorganize
+    assert reorganize.endswith("PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+    assert ddl(conn, "ALTER TABLE temperature DROP") == [
+        f"ALTER TABLE temperature DROP PARTITION {partition_name(days[0])}"]
+    assert not ddl(conn, "ALTER TABLE humidity")  # not partitioned yet
+
+
+def test_rotate_keeps_one_range_partition_ahead_of_pmax():
+    old = datetime.date.today() - datetime.timedelta(days=30)
+    conn = Connection(partitions={"temperature": [partition_name(old), "pmax"]})
+    rotate_partitions(conn, ahead_days=0, retain_days=1)
+    assert not ddl(conn, "ALTER TABLE temperature DROP")
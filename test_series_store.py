@@ -0,0 +1,44 @@
+import datetime
+import numpy as np
+from series_store import SeriesStore, datetime_to_ms, ms_to_datetime
+
+T0 = datetime.datetime(2025, 3, 30, 1, 59, 58)  # wall-clock values are kept as read, DST or not
+
+
+def rows(start, count):
+    return [(T0 + datetime.timedelta(seconds=2 * i), float(i)) for i in range(start, start + count)]
+
+
+def test_datetime_ms_round_trip():
+    assert ms_to_datetime(datetime_to_ms(T0)) == T0
+    assert datetime_to_ms(T0 + datetime.timedelta(milliseconds=1)) - datetime_to_ms(T0) == 1
+
+
+def test_oldest_readings_are_evicted_at_capacity():
+    store = SeriesStore(capacity=5)
+    store.extend_rows("temperature", "node1", rows(0, 4))
+    store.extend_rows("temperature", "node1", rows(4, 4))
+    times, values = store.window("temperature", "node1")
+    assert values.tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert times.tolist() == [datetime_to_ms(dTime) for dTime, _ in rows(3, 5)]
+    assert values.dtype == np.float32 and times.dtype == np.int64
+
+
+def test_window_and_since():
+    store = SeriesStore(capacity=10)
+    store.extend_rows("humidity", "node1", rows(0, 6))
+    series = store.get("humidity", "node1")
+    assert series.window(2)[1].tolist() == [4.0, 5.0]
+    times, values = series.since(datetime_to_ms(T0 + datetime.timedelta(seconds=7)))
+    assert values.tolist() == [4.0, 5.0]
+    assert series.last_time() == times[-1]
+
+
+def test_series_are_kept_per_metric_and_node():
+    store = SeriesStore(capacity=3)
+    store.append("temperature", "node1", T0, 20.0)
+    store.append("humidity", "node2", T0, 50.0)
+    assert store.nodes("temperature") == ["node1"]
+    assert ("humidity", "node2") in store and ("humidity", "node1") not in store
+    times, values = store.window("humidity", "node1")
+    assert len(times) == 0 and len(values) == 0
@@ -0,0 +1,121 @@
+import os
+import datetime
+import pytest
+import mariadb
+import spool
+from spool import Spool
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def executemany(self, query, rows):
+        if self.conn.fail:
+            raise mariadb.Error("server has gone away")
+        self.conn.pending.extend((query.split()[3], row) for row in rows)
+
+    def close(self):
+        pass
+
+
+class Connection:
+    """Records the (table, row) pairs of committed transactions."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.pending = []
+        self.rows = []
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        self.rows.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+T0 = datetime.datetime(2025, 1, 1, 12, 0, 0, 123456)
+
+
+def readings(n, start=0):
+    return [(T0 + datetime.timedelta(seconds=i), f"node{i % 3}", 20.0 + i) for i in range(start, start + n)]
+
+
+def test_replay_writes_readings_back_in_order_and_empties_the_spool(tmp_path):
+    s = Spool(str(tmp_path))
+    s.append("temperature", readings(3))
+    s.append("humidity", readings(2, start=3))
+    assert s.pending() > 0
+    conn = Connection()
+    assert s.replay(conn) == 5
+    assert conn.rows == [("temperature", r) for r in readings(3)] + [("humidity", r) for r in readings(2, start=3)]
+    assert s.pending() == 0 and s.scan_pending() == 0
+
+
+def test_a_new_spool_resumes_from_the_checkpoint(tmp_path):
+    first = Spool(str(tmp_path))
+    first.append("temperature", readings(10))
+    conn = Connection()
+    assert first.replay(conn, batch_rows=4, max_rows=4) == 4
+    first.close()
+
+    second = Spool(str(tmp_path))  # a restart
+    assert second.pending() == second.scan_pending() > 0
+    assert second.replay(conn, batch_rows=4) == 6
+    assert [row for _, row in conn.rows] == readings(10)
+    assert second.pending() == 0 and os.listdir(tmp_path) == ["checkpoint"]
+
+
+def test_a_failed_batch_is_replayed_again(tmp_path):
+    s = Spool(str(tmp_path))
+    s.append("temperature", readings(4))
+    checkpoint, pending = s.checkpoint, s.pending()
+    with pytest.raises(mariadb.Error):
+        s.replay(Connection(fail=True), batch_rows=2)
+    assert s.checkpoint == checkpoint and s.pending() == pending
+    conn = Connection()
+    assert s.replay(conn, batch_rows=2) == 4
+    assert [row for _, row in conn.rows] == readings(4)
+
+
+def test_torn_tail_is_skipped_and_its_segment_removed(tmp_path):
+    s = Spool(str(tmp_path))
+    s.append("temperature", readings(2))
+    s.close()
+    with open(s.segment_path(s.active_seq), "ab") as f:
+        f.write(spool.encode_record("temperature", "node9", T0, 1.0)[:-3])  # process died mid-record
+
+    restarted = Spool(str(tmp_path))
+    assert restarted.pending() == restarted.scan_pending()
+    conn = Connection()
+    assert restarted.replay(conn) == 2
+    assert [row for _, row in conn.rows] == readings(2)
+    assert restarted.pending() == 0 and restarted.segments() == []
+
+
+def test_pending_tracks_appends_replays_and_segment_rollover(tmp_path):
+    s = Spool(str(tmp_path), segment_bytes=200)
+    for i in range(10):
+        s.append("temperature", readings(3, start=3 * i))
+        assert s.pending() == s.scan_pending()
+    assert len(s.segments()) > 1
+    conn = Connection()
+    s.replay(conn, batch_rows=5, max_rows=12)
+    assert s.pending() == s.scan_pending()
+    s.replay(conn, batch_rows=5)
+    assert s.pending() == s.scan_pending() == 0
+    assert [row for _, row in conn.rows] == readings(30)
+
+
+def test_records_longer_than_the_read_are_replayed(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, "REPLAY_RECORD_BYTES", 8)
+    s = Spool(str(tmp_path))
+    rows = [(T0, "a-rather-long-node-name-" * 4, 21.5)]
+    s.append("temperature", rows)
+    conn = Connection()
+    assert s.replay(conn, batch_rows=1) == 1
+    assert conn.rows == [("temperature", rows[0])]
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import tscodec
+from tscodec import decode, encode, pack, unpack, unzigzag, zigzag
+
+T0 = 1735732800000  # 2025-01-01 12:00 UTC in ms
+
+
+def regular(n, rng, period=2000, jitter=3):
+    t = T0 + np.arange(n, dtype=np.int64) * period + rng.integers(-jitter, jitter + 1, n)
+    v = (21.0 + np.cumsum(rng.normal(0, 0.05, n))).round(2).astype(np.float32)
+    return np.sort(t), v
+
+
+def assert_round_trip(t, v, step=None):
+    t2, v2 = decode(encode(t, v, step))
+    assert t2.dtype == np.int64 and v2.dtype == np.float32
+    assert np.array_equal(t2, t)
+    if step is None:
+        assert np.array_equal(v2.view(np.uint32), np.asarray(v, dtype=np.float32).view(np.uint32))
+    else:
+        assert np.abs(v2 - v).max() <= step / 2 + 1e-4
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 1000])
+def test_xor_round_trip_is_bit_exact(n):
+    assert_round_trip(*regular(n, np.random.default_rng(n)))
+
+
+def test_quantized_round_trip_and_size():
+    t, v = regular(43200, np.random.default_rng(1))
+    assert_round_trip(t, v, step=0.01)
+    assert len(encode(t, v, step=0.01)) < len(encode(t, v)) < 12 * len(t) / 3  # raw: 12 bytes per point
+
+
+def test_gaps_spikes_and_special_values():
+    rng = np.random.default_rng(2)
+    t, v = regular(5000, rng)
+    t[2500:] += 3600 * 1000  # an hour-long gap
+    v[100] = 1e30
+    v[200] = -0.0
+    v[300] = np.nan
+    v[400] = np.inf
+    assert_round_trip(t, v)
+
+
+def test_constant_series_packs_to_zero_width_streams():
+    t = T0 + np.arange(1000, dtype=np.int64) * 2000
+    v = np.full(1000, 21.5, dtype=np.float32)
+    assert_round_trip(t, v)
+    assert len(encode(t, v)) < 64
+
+
+@pytest.mark.parametrize("bits", [1, 7, 13, 32, 57, 58, 64])
+def test_pack_round_trips_every_width(bits):
+    rng = np.random.default_rng(bits)
+    u = rng.integers(0, 2 ** 64 - 1, 777, dtype=np.uint64, endpoint=True) >> np.uint64(64 - bits)
+    u[::50] = np.uint64(2 ** 63 + 5)  # exceptions
+    data = b"x" + pack(u) + b"y"
+    out, end = unpack(data, 1, len(u))
+    assert np.array_equal(out, u) and data[end:] == b"y"
+
+
+def test_zigzag_keeps_small_magnitudes_small():
+    x = np.array([0, -1, 1, -2, 2, np.iinfo(np.int64).min, np.iinfo(np.int64).max], dtype=np.int64)
+    assert zigzag(x)[:5].tolist() == [0, 1, 2, 3, 4]
+    assert np.array_equal(unzigzag(zigzag(x)), x)
+
+
+def test_other_data_is_rejected():
+    with pytest.raises(ValueError):
+        decode(b"NOPE" + bytes(tscodec._HEADER.size))
@@ -0,0 +1,28 @@
+from blit_renderer import date_axis
+
+# Figure layout shared by the pGraph window and the headless reports; no Qt imports here
+MARGINS = dict(left=0.05, right=0.95, bottom=0.1, top=0.9)
+LINE_WIDTH = 1.5
+
+
+def trend_axes(figure, ylabel, position=111):
+    """One trend panel: value axis label, bounded date ticks, pGraph's margins."""
+    ax = figure.add_subplot(position)
+    ax.set_ylabel(ylabel)
+    date_axis(ax)
+    figure.subplots_adjust(**MARGINS)
+    return ax
+
+
+def node_lines(ax, nodes, linewidth=LINE_WIDTH):
+    """One empty line per node, labelled as in the legend of pGraph; returns {node: line}."""
+    lines = {}
+    for node in nodes:
+        lines[node], = ax.plot([], [], label=node.replace('_', '-'), linewidth=linewidth)
+    ax.legend(loc='upper right')  # legend on top of the plot
+    return lines
+
+
+def set_series(line, times_ms, values):
+    """Wall-clock epoch-ms times, as kept by SeriesStore, shown as the same time of day."""
+    line.set_data(times_ms.view('datetime64[ms]'), values)
@@ -0,0 +1,207 @@
+import struct
+import numpy as np
+
+# Compact block encoding of one series: int64 epoch-ms timestamps and float32 values.
+#
+# Timestamps are stored as delta-of-deltas, which are 0 or a few ms of jitter at a
+# regular cadence. Values are either XORed with the previous value's bits (lossless)
+# or quantized to a step and delta-coded (lossy by at most step / 2). Each of the
+# two integer streams is zigzag-coded and bit-packed at one width per block; the
+# few values wider than that are stored separately as exceptions, so a single gap
+# or spike does not widen the whole block. Everything is whole-array NumPy.
+#
+# Block: header, value header, time stream, value stream
+#   header        "<4sBIqq"  magic, value mode, point count, first time, first delta
+#   value header  "<I" first value bits (XOR) or "<dq" step, first quantized value (QUANTIZED)
+#   stream        "<BBI" width, shift, exception count; packed bits; exception
+#                 indices (uint32); exception values (uint64)
+
+MAGIC = b"TSC1"
+XOR = 0
+QUANTIZED = 1
+
+_HEADER = struct.Struct("<4sBIqq")
+_XOR_HEADER = struct.Struct("<I")
+_QUANTIZED_HEADER = struct.Struct("<dq")
+_STREAM = struct.Struct("<BBI")
+_EXCEPTION_BITS = 96  # uint32 index + uint64 value
+MAX_WINDOW_WIDTH = 57  # widest value that fits 8 bytes at any bit offset
+_ONE = np.uint64(1)
+
+
+def zigzag(x):
+    """Signed int64 to uint64 with small magnitudes near 0: 0, -1, 1, -2 -> 0, 1, 2, 3."""
+    x = np.asarray(x, dtype=np.int64)
+    return ((x << 1) ^ (x >> 63)).view(np.uint64)
+
+
+def unzigzag(u):
+    return (u >> _ONE).view(np.int64) ^ -(u & _ONE).view(np.int64)
+
+
+def bit_length(u):
+    """Bits needed for each uint64 value (0 for 0)."""
+    # frexp is exact on each 32-bit half; its exponent is the bit length
+    high = np.frexp((u >> np.uint64(32)).astype(np.float64))[1]
+    low = np.frexp((u & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+    return np.where(high > 0, high + 32, low)
+
+
+def _low_bits(u, width):
+    if width == 64:
+        return u.copy()
+    return u & ((_ONE << np.uint64(width)) - _ONE)
+
+
+def _windows(buf):
+    """Unaligned little-endian uint64 view starting at every byte of buf."""
+    return np.ndarray((len(buf) - 7,), dtype="<u8", buffer=buf, strides=(1,))
+
+
+def _positions(n, width):
+    bit = np.arange(n, dtype=np.int64) * width
+    return bit >> 3, (bit & 7).astype(np.uint64)
+
+
+def pack(u, shift=0):
+    """Bit-packs uint64 values (already shifted right by `shift`) at the cheapest single width.
+
+    Widths up to MAX_WINDOW_WIDTH are packed so that every value sits inside the
+    8 bytes starting at its first byte, which makes both directions one gather or
+    scatter; wider blocks are stored as plain uint64.
+    """
+    n = len(u)
+    lengths = bit_length(u)
+    # Bits spent at each width 0..64: n * width plus one exception per value that does not fit
+    wider = n - np.cumsum(np.bincount(lengths, minlength=65))
+    cost = np.arange(65) * n + _EXCEPTION_BITS * wider
+    cost[MAX_WINDOW_WIDTH + 1:64] = np.iinfo(np.int64).max
+    width = int(np.argmin(cost))
+
+    exceptions = np.flatnonzero(lengths > width).astype(np.uint32)
+    parts = [_STREAM.pack(width, shift, len(exceptions))]
+    low = _low_bits(u, width)
+    low[exceptions] = 0
+    if width == 64:
+        parts.append(low.astype("<u8").tobytes())
+    elif width:
+        nbytes = (n * width + 7) // 8
+        buf = np.zeros(nbytes + 8, dtype=np.uint8)
+        windows = _windows(buf)
+        first_byte, offset = _positions(n, width)
+        shifted = low << offset
+        # Values this far apart never share a window, so each phase is one scatter
+        stride = -(-(64 + 8) // width)
+        for phase in range(min(stride, n)):
+            at = first_byte[phase::stride]
+            windows[at] |= shifted[phase::stride]
+        parts.append(buf[:nbytes].tobytes())
+    parts.append(exceptions.tobytes())
+    parts.append(u[exceptions].astype("<u8").tobytes())
+    return b"".join(parts)
+
+
+def unpack(data, offset, n):
+    """Inverse of pack(); returns (uint64 values shifted back left, offset past the stream)."""
+    width, shift, count = _STREAM.unpack_from(data, offset)
+    offset += _STREAM.size
+    if width == 64:
+        u = np.frombuffer(data, "<u8", n, offset).astype(np.uint64)
+        offset += 8 * n
+    elif width:
+        nbytes = (n * width + 7) // 8
+        buf = np.zeros(nbytes + 8, dtype=np.uint8)
+        buf[:nbytes] = np.frombuffer(data, np.uint8, nbytes, offset)
+        first_byte, bit = _positions(n, width)
+        u = (_windows(buf)[first_byte] >> bit) & ((_ONE << np.uint64(width)) - _ONE)
+        offset += nbytes
+    else:
+        u = np.zeros(n, dtype=np.uint64)
+    indices = np.frombuffer(data, "<u4", count, offset)
+    offset += 4 * count
+    u[indices] = np.frombuffer(data, "<u8", count, offset)
+    offset += 8 * count
+    if shift:
+        u <<= np.uint64(shift)
+    return u, offset
+
+
+def trailing_zeros(u):
+    """Trailing zero bits shared by every nonzero value (0 if all are zero)."""
+    nonzero = u[u != 0]
+    if not len(nonzero):
+        return 0
+    lowest = nonzero & (~nonzero + _ONE)  # lowest set bit of each value
+    return int(bit_length(lowest).min()) - 1
+
+
+def encode(times_ms, values, step=None):
+    """Encodes one series to bytes. times_ms must be sorted.
+
+    With step=None values are XOR-coded and decode bit for bit. With a step (e.g.
+    0.01 for readings rounded to two decimals) they are stored as multiples of it,
+    which is far smaller and exact when the readings are already on that grid.
+    """
+    t = np.asarray(times_ms, dtype=np.int64)
+    v = np.asarray(values, dtype=np.float32)
+    n = len(t)
+    first = int(t[0]) if n else 0
+    first_delta = int(t[1] - t[0]) if n > 1 else 0
+    mode = XOR if step is None else QUANTIZED
+    parts = [_HEADER.pack(MAGIC, mode, n, first, first_delta)]
+
+    if mode == XOR:
+        bits = v.view(np.uint32).astype(np.uint64)
+        parts.append(_XOR_HEADER.pack(int(bits[0]) if n else 0))
+        value_stream = bits[1:] ^ bits[:-1]
+    else:
+        q = np.round(v.astype(np.float64) / step).astype(np.int64)
+        parts.append(_QUANTIZED_HEADER.pack(step, int(q[0]) if n else 0))
+        value_stream = zigzag(np.diff(q))
+
+    parts.append(pack(zigzag(np.diff(t, n=2)) if n > 2 else np.zeros(0, dtype=np.uint64)))
+    shift = trailing_zeros(value_stream) if mode == XOR else 0
+    parts.append(pack(value_stream >> np.uint64(shift), shift))
+    return b"".join(parts)
+
+
+def decode(data):
+    """Returns (int64 epoch-ms times, float32 values) of an encoded series."""
+    magic, mode, n, first, first_delta = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a tscodec block")
+    offset = _HEADER.size
+    if mode == XOR:
+        (first_value,) = _XOR_HEADER.unpack_from(data, offset)
+        offset += _XOR_HEADER.size
+    else:
+        step, first_value = _QUANTIZED_HEADER.unpack_from(data, offset)
+        offset += _QUANTIZED_HEADER.size
+
+    dod, offset = unpack(data, offset, max(n - 2, 0))
+    value_stream, offset = unpack(data, offset, max(n - 1, 0))
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    deltas = np.empty(n - 1, dtype=np.int64)
+    if n > 1:
+        deltas[0] = first_delta
+        np.cumsum(unzigzag(dod), out=deltas[1:])
+        deltas[1:] += first_delta
+    t = np.empty(n, dtype=np.int64)
+    t[0] = first
+    np.cumsum(deltas, out=t[1:])
+    t[1:] += first
+
+    if mode == XOR:
+        bits = np.empty(n, dtype=np.uint32)
+        bits[0] = first_value
+        bits[1:] = value_stream
+        v = np.bitwise_xor.accumulate(bits).view(np.float32)
+    else:
+        q = np.empty(n, dtype=np.int64)
+        q[0] = first_value
+        np.cumsum(unzigzag(value_stream), out=q[1:])
+        q[1:] += first_value
+        v = (q * step).astype(np.float32)
+    return t, v